@@ -0,0 +1,96 @@
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sentiment_backends import BACKENDS
+from sentiment_engine import MODEL_NAME, SentimentEngine
+
+try:
+    import psutil
+except ImportError:  # RSS is read from /proc without it
+    psutil = None
+
+# Benchmark of the sentiment backends on the player bios (or any text column of a CSV).
+# Every backend runs in its own fresh process so the resident memory is its own. Reported:
+# batched throughput (docs/sec), single-text latency (p50/p99), RSS after scoring (in total and
+# above the process with the libraries imported) and the agreement of the star ratings and scores with the fp32 PyTorch backend.
+
+BIO_PATH = "NFL Player Bio and Grade Data.csv"
+
+
+def rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return float('nan')
+
+
+def run_backend(backend, model_name, texts, latency_samples, num_threads):
+    # Runs in a child process, returns the measurements and the scores
+    baseline_rss = rss_mb()  # torch, transformers and onnxruntime are imported at this point
+    start = time.perf_counter()
+    engine = SentimentEngine(model_name, num_threads=num_threads, backend=backend)
+    load_seconds = time.perf_counter() - start
+    engine.score(texts[:8])  # warm up
+
+    start = time.perf_counter()
+    scores = engine.score(texts)
+    docs_per_sec = len(texts) / (time.perf_counter() - start)
+
+    latencies = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        engine.score([text])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'backend': backend,
+        'load_sec': round(load_seconds, 1),
+        'docs_per_sec': round(docs_per_sec, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 1),
+        'rss_mb': round(rss_mb()),
+        'model_rss_mb': round(rss_mb() - baseline_rss),
+    }, scores
+
+
+def run_benchmark(texts, backends, model_name=MODEL_NAME, latency_samples=100, num_threads=None):
+    context = multiprocessing.get_context('spawn')
+    results = []
+    reference = None
+    # fp32 first, it is the reference for the agreement columns
+    for backend in ['torch'] + [name for name in backends if name != 'torch']:
+        with context.Pool(1) as pool:
+            result, scores = pool.apply(run_backend, (backend, model_name, texts, latency_samples, num_threads))
+        if reference is None:
+            reference = scores
+        result['star_agreement'] = round(float(((scores.argmax(axis=1)) == reference.argmax(axis=1)).mean()), 4)
+        result['max_score_diff'] = round(float(np.abs(scores - reference).max()), 4)
+        results.append(result)
+        print(result)
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Compare speed, memory and accuracy of the sentiment backends.")
+    argument_parser.add_argument('--data', default=BIO_PATH, help="CSV with the texts to score")
+    argument_parser.add_argument('--column', default='Player Bio')
+    argument_parser.add_argument('--model', default=MODEL_NAME)
+    argument_parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    argument_parser.add_argument('--limit', type=int, help="Score only the first N texts")
+    argument_parser.add_argument('--latency-samples', type=int, default=100)
+    argument_parser.add_argument('--threads', type=int, help="Threads per backend, all cores by default")
+    args = argument_parser.parse_args()
+
+    texts = pd.read_csv(args.data)[args.column].fillna('').tolist()
+    if args.limit:
+        texts = texts[:args.limit]
+    results = run_benchmark(texts, args.backends, args.model, args.latency_samples, args.threads)
+    print(results.to_string(index=False))
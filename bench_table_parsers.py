@@ -0,0 +1,82 @@
+import argparse
+import glob
+import html
+import os
+import time
+
+import pandas as pd
+
+from nfl_table_parsers import PARSERS, lxml
+
+# Micro-benchmark of the stats table parser backends (rows per second).
+# Uses saved NFL.com pages (*.html) when a directory of them is given. Otherwise the
+# scraped CSVs in dat/player/2023 are rendered back into NFL.com stats page markup,
+# including the navigation and script boilerplate every real page carries.
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en"><head><title>NFL Stats</title>{scripts}</head>
+<body><header><nav><ul class="d3-o-tabs">{navigation}</ul></nav></header>
+<main><section class="d3-l-grid--outer d3-l-full-width">
+<div class="d3-o-table--horizontal-scroll">
+<table class="d3-o-table d3-o-table--detailed d3-o-{level}-stats--detailed d3-o-table--sortable">
+<thead><tr>{header}</tr></thead>
+<tbody>{body}</tbody>
+</table></div>
+<div class="nfl-o-table-pagination"><a class="nfl-o-table-pagination__next" href="/stats/{level}-stats/category/next/2023/reg/all/aftercursor=abc&amp;page=2">Next Page</a></div>
+</section></main><footer>{navigation}</footer></body></html>"""
+
+
+def render_page(df, level='player'):
+    header = ''.join(f'<th scope="col">{html.escape(str(column))}</th>' for column in df.columns)
+    rows = []
+    for values in df.itertuples(index=False):
+        first, *rest = values
+        cells = [
+            '<td><div class="d3-o-player-fullname nfl-o-cta--link">'
+            f'<a class="d3-o-player-fullname nfl-o-cta--link" href="/players/x/">{html.escape(str(first))}</a></div></td>'
+        ]
+        cells += [f'<td>\n  {html.escape(str(value))}\n</td>' for value in rest]
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    navigation = ''.join(f'<li class="d3-o-tabs__list-item"><a href="/stats/{i}/">Item {i}</a></li>' for i in range(200))
+    scripts = '<script>' + 'window.__INITIAL_DATA__ = {"key": "value"};\n' * 2000 + '</script>'
+    return PAGE_TEMPLATE.format(scripts=scripts, navigation=navigation, level=level, header=header, body=''.join(rows))
+
+
+def load_pages(pages_dir, csv_dir):
+    if pages_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+            with open(path, 'rb') as f:
+                pages.append((os.path.basename(path), f.read()))
+        return pages
+    return [(os.path.basename(path), render_page(pd.read_csv(path, dtype=str)).encode('utf-8'))
+            for path in sorted(glob.glob(os.path.join(csv_dir, '*.csv')))]
+
+
+def run_benchmark(pages, level, parsers, repeat):
+    results = []
+    for name in parsers:
+        parser = PARSERS[name]
+        rows = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for _, page in pages:
+                rows += len(parser(page, level))
+        elapsed = time.perf_counter() - start
+        results.append({'parser': name, 'rows': rows, 'seconds': round(elapsed, 3), 'rows_per_sec': round(rows / elapsed)})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Compare rows per second of the stats table parser backends.")
+    argument_parser.add_argument('--pages', help="Directory of saved NFL.com stats pages (*.html)")
+    argument_parser.add_argument('--csv-dir', default=os.path.join('dat', 'player', '2023', 'player'),
+                                 help="Scraped CSVs to render into pages when no saved pages are given")
+    argument_parser.add_argument('--level', default='player', choices=['player', 'team'])
+    argument_parser.add_argument('--repeat', type=int, default=5)
+    args = argument_parser.parse_args()
+
+    parsers = [name for name in PARSERS if name != 'lxml' or lxml is not None]
+    pages = load_pages(args.pages, args.csv_dir)
+    print(f"Benchmarking {len(pages)} pages x {args.repeat} repeats")
+    print(run_benchmark(pages, args.level, parsers, args.repeat).to_string(index=False))
@@ -0,0 +1,150 @@
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+
+import requests
+from bs4 import BeautifulSoup
+
+from nfl_fetcher import AdaptiveRateLimiter, PageFetcher
+from nfl_http_cache import ResponseCache
+from nfl_jsonl_store import JsonlStore, migrate_json_array
+
+# === Phase 2: Download the article bodies for the links collected by nfl_news_batch_link.py ===
+# Bodies are fetched concurrently through one pooled session. The request rate adapts to the
+# server (it backs off on 429/503), failed pages are retried with exponential backoff and every
+# article is appended to a JSONL store as soon as it is downloaded (the ones finishing together share
+# one write), so a crash loses nothing and the store's URL index lets a rerun continue where it stopped.
+
+LINKS_PATH = "dat/nfl_news_links_2025_to_2018.jsonl"
+LEGACY_LINKS_PATH = "dat/nfl_news_links_2025_to_2018.json"
+ARTICLES_PATH = "dat/nfl_news_articles_2025_to_2018.jsonl"
+ERROR_LOG_PATH = "dat/article_downloader_errors.txt"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+MAX_WORKERS = 16
+START_RATE = 4  # requests per second, adjusted while running
+MAX_RATE = 20
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 2
+PROGRESS_EVERY = 100  # articles between progress lines
+THROTTLE_STATUS = {429, 503}
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_article_text(html):
+    # Article body: every non-empty <p> inside the main "d3-l-col__col-8" columns
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = []
+    for section in soup.find_all("div", class_="d3-l-col__col-8"):
+        paragraphs.extend([p.text.strip() for p in section.find_all("p") if p.text.strip()])
+    return "\n\n".join(paragraphs)
+
+
+def log_error(message):
+    with open(ERROR_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}\n")
+
+
+def load_links(path=LINKS_PATH, legacy_path=LEGACY_LINKS_PATH):
+    # Links of the JSONL store, a links file from before the switch is imported on the first load
+    missing = not os.path.exists(path)
+    store = JsonlStore(path)
+    if missing:
+        migrated = migrate_json_array(legacy_path, store)
+        if migrated:
+            print(f"📦 Imported {migrated} links from {legacy_path}")
+    return list(store)
+
+
+def retry_after(response, attempt):
+    # Honors the server's Retry-After header, otherwise exponential backoff with jitter
+    header = response.headers.get("Retry-After") if response is not None else None
+    if header and header.isdigit():
+        return float(header)
+    return BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def download_article(fetcher, link):
+    # Runs on a worker thread: fetches one article with retries and returns its record
+    limiter = fetcher.rate_limiter
+    error = None
+    for attempt in range(MAX_RETRIES):
+        response = None
+        try:
+            response = fetcher.get(link["url"])
+            if response.status_code == 200:
+                if not getattr(response, "from_cache", False):
+                    limiter.on_success()
+                return {"url": link["url"], "date": link.get("date"), "content": parse_article_text(response.text)}
+            error = f"HTTP {response.status_code}"
+            if response.status_code in THROTTLE_STATUS:
+                limiter.on_throttle()
+            if response.status_code not in RETRY_STATUS:
+                break
+        except requests.RequestException as e:
+            error = str(e)
+        time.sleep(retry_after(response, attempt))
+    raise RuntimeError(f"{link['url']} failed after {attempt + 1} attempts: {error}")
+
+
+def download_articles(links_path=LINKS_PATH, output_path=ARTICLES_PATH, max_workers=MAX_WORKERS,
+                      start_rate=START_RATE, max_rate=MAX_RATE, use_cache=True):
+    links = load_links(links_path)
+    store = JsonlStore(output_path)
+    pending_links = [link for link in links if link["url"] not in store]
+    print(f"📄 {len(links)} links, {len(store)} already downloaded, {len(pending_links)} to go")
+
+    limiter = AdaptiveRateLimiter(start_rate, max_rate=max_rate)
+    fetcher = PageFetcher(max_workers=max_workers, headers=HEADERS, rate_limiter=limiter,
+                          cache=ResponseCache() if use_cache else None)
+    saved = 0
+    failed = 0
+    start = time.monotonic()
+    link_iter = iter(pending_links)
+    running = set()
+    batch = []
+
+    with fetcher:
+        try:
+            while True:
+                # Keep a bounded window of downloads in flight instead of queueing every link at once
+                while len(running) < max_workers * 2:
+                    link = next(link_iter, None)
+                    if link is None:
+                        break
+                    running.add(fetcher.executor.submit(download_article, fetcher, link))
+                if not running:
+                    break
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    try:
+                        article = future.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"❌ {e}")
+                        log_error(str(e))
+                        continue
+                    batch.append(article)
+                # Written right away, a crash or Ctrl-C only loses the downloads still in flight
+                store.append(batch)
+                previous, saved = saved, saved + len(batch)
+                batch = []
+                if saved // PROGRESS_EVERY > previous // PROGRESS_EVERY:
+                    elapsed = time.monotonic() - start
+                    print(f"💾 {saved}/{len(pending_links)} saved, {saved / elapsed:.1f} articles/sec, "
+                          f"rate {limiter.requests_per_second:.1f} req/sec")
+        finally:
+            store.append(batch)
+            for future in running:
+                future.cancel()
+
+    print(f"✅ Finished: {saved} saved, {failed} failed, {time.monotonic() - start:.0f}s")
+    return saved, failed
+
+
+if __name__ == "__main__":
+    os.makedirs("dat", exist_ok=True)
+    download_articles()
@@ -0,0 +1,183 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+
+from nfl_game_logs import load_game_log
+from nfl_model_eval import DROP_COLUMNS, TARGET, feature_frame
+
+try:
+    import xgboost
+except ImportError:  # only needed for the xgb model
+    xgboost = None
+
+# Walk-forward backtest of the EPA models: for every (season, week) cutoff the model is trained on all
+# games before that week and predicts the games of that week.
+# The features are built once for the whole game log, sorted by (season, week), so the training set of
+# a cutoff is a prefix slice of the same float32 matrix, never a rebuilt frame or a copy.
+# Models are updated instead of refitted where the estimator allows it:
+#   rf       RandomForest with warm_start, each cutoff adds trees fitted on the grown training set and
+#            the oldest trees are dropped beyond max_trees, so the forest follows the newest data
+#   xgb      XGBoost continues boosting from the previous booster with a few rounds per cutoff
+#   refit    any sklearn estimator fitted from scratch at every cutoff (the reference)
+
+BACKTEST_DIRECTORY = 'dat'
+MODELS = ['rf', 'xgb', 'refit']
+
+
+def require_xgboost():
+    if xgboost is None:
+        raise ImportError("The xgb backtest requires the xgboost package.")
+
+
+def game_keys(df):
+    # season * 100 + week, ordered like (season, week)
+    return df['season'].to_numpy(dtype=np.int64) * 100 + df['week'].to_numpy(dtype=np.int64)
+
+
+def backtest_matrix(df, target=TARGET, drop_columns=DROP_COLUMNS, team_encoding='onehot'):
+    # (X float32, y, keys, columns) of the whole game log, rows sorted by (season, week)
+    df = df.iloc[np.argsort(game_keys(df), kind='stable')]
+    features = feature_frame(df, drop_columns, team_encoding=team_encoding)
+    X = np.ascontiguousarray(features.to_numpy(dtype=np.float32))
+    y = df.loc[features.index, target].to_numpy(dtype=np.float64)
+    return X, y, game_keys(df.loc[features.index]), list(features.columns)
+
+
+class ForestUpdater:
+    def __init__(self, trees_per_step=10, max_trees=100, random_state=42, **params):
+        self.trees_per_step = trees_per_step
+        self.max_trees = max_trees
+        # A RandomState instance keeps advancing, so dropped trees never hand their seeds to new ones
+        self.model = RandomForestRegressor(n_estimators=trees_per_step, warm_start=True,
+                                           random_state=np.random.RandomState(random_state), **params)
+
+    def update(self, X, y):
+        if hasattr(self.model, 'estimators_'):
+            self.model.set_params(n_estimators=len(self.model.estimators_) + self.trees_per_step)
+        self.model.fit(X, y)
+        if len(self.model.estimators_) > self.max_trees:
+            del self.model.estimators_[:-self.max_trees]  # the oldest trees saw the fewest games
+            self.model.set_params(n_estimators=self.max_trees)
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class BoosterUpdater:
+    def __init__(self, rounds_per_step=10, random_state=42, **params):
+        require_xgboost()
+        self.rounds_per_step = rounds_per_step
+        self.params = {'learning_rate': 0.1, 'max_depth': 6, 'random_state': random_state, 'n_jobs': os.cpu_count(),
+                       **params}
+        self.model = None
+
+    def update(self, X, y):
+        # Adds rounds_per_step trees on top of the previous booster, fitted to the grown training set
+        model = xgboost.XGBRegressor(n_estimators=self.rounds_per_step, **self.params)
+        model.fit(X, y, xgb_model=self.model.get_booster() if self.model is not None else None)
+        self.model = model
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class RefitUpdater:
+    def __init__(self, estimator=None):
+        self.estimator = estimator if estimator is not None else RandomForestRegressor(n_estimators=100, random_state=42)
+        self.model = None
+
+    def update(self, X, y):
+        self.model = clone(self.estimator).fit(X, y)
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+def make_updater(name, **params):
+    if name == 'rf':
+        return ForestUpdater(**params)
+    if name == 'xgb':
+        return BoosterUpdater(**params)
+    if name == 'refit':
+        return RefitUpdater(**params)
+    raise ValueError(f"Unknown backtest model {name!r}, expected one of {MODELS}")
+
+
+def walk_forward(X, y, keys, updater, start_key=None, end_key=None, min_train_rows=200):
+    # Trains on every game before each week and scores the week. Returns (per week scores, predictions):
+    # the predictions array is NaN for rows that were never in a test week
+    cutoffs = np.unique(keys)
+    if start_key is not None:
+        cutoffs = cutoffs[cutoffs >= start_key]
+    if end_key is not None:
+        cutoffs = cutoffs[cutoffs <= end_key]
+    starts = np.searchsorted(keys, cutoffs, side='left')
+    ends = np.searchsorted(keys, cutoffs, side='right')
+    predictions = np.full(len(y), np.nan)
+    rows = []
+    for cutoff, start, end in zip(cutoffs, starts, ends):
+        if start < min_train_rows:
+            continue
+        step_start = time.perf_counter()
+        updater.update(X[:start], y[:start])
+        predictions[start:end] = updater.predict(X[start:end])
+        rows.append({
+            'season': int(cutoff // 100),
+            'week': int(cutoff % 100),
+            'train_rows': int(start),
+            'test_rows': int(end - start),
+            'rmse': float(np.sqrt(mean_squared_error(y[start:end], predictions[start:end]))),
+            'r2': r2_score(y[start:end], predictions[start:end]) if end - start > 1 else np.nan,
+            'seconds': time.perf_counter() - step_start,
+        })
+    return pd.DataFrame(rows), predictions
+
+
+def season_summary(scores, y, predictions, keys):
+    # Pooled RMSE and R² of every predicted game per season, plus the fitting time
+    predicted = ~np.isnan(predictions)
+    games = pd.DataFrame({'season': keys[predicted] // 100, 'y': y[predicted], 'prediction': predictions[predicted]})
+    summary = games.groupby('season').apply(lambda season: pd.Series({
+        'games': len(season),
+        'rmse': np.sqrt(mean_squared_error(season['y'], season['prediction'])),
+        'r2': r2_score(season['y'], season['prediction']),
+    }), include_groups=False)
+    summary['weeks'] = scores.groupby('season').size()
+    summary['seconds'] = scores.groupby('season')['seconds'].sum()
+    return summary
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Walk-forward backtest of the EPA model, week by week.")
+    argument_parser.add_argument('csv', nargs='?', default="qb_stats.csv", help="Game log CSV (qb/rb/wrte_stats.csv)")
+    argument_parser.add_argument('--model', default='rf', choices=MODELS)
+    argument_parser.add_argument('--start-season', type=int, help="First season to predict, the second one by default")
+    argument_parser.add_argument('--end-season', type=int)
+    argument_parser.add_argument('--step', type=int, default=10, help="Trees (rf) or boosting rounds (xgb) per week")
+    argument_parser.add_argument('--team-encoding', default='onehot', choices=['onehot', 'codes'],
+                                 help="codes is one integer team column, xgb treats it as a native categorical")
+    argument_parser.add_argument('--output', help="CSV of the per week scores")
+    args = argument_parser.parse_args()
+
+    df = load_game_log(args.csv)
+    X, y, keys, columns = backtest_matrix(df, team_encoding=args.team_encoding)
+    start_season = args.start_season or int(keys.min() // 100) + 1
+    params = {'trees_per_step': args.step} if args.model == 'rf' else {'rounds_per_step': args.step} if args.model == 'xgb' else {}
+    if args.model == 'xgb' and args.team_encoding == 'codes':
+        params.update(enable_categorical=True, tree_method='hist',
+                      feature_types=['c' if column == 'team' else 'q' for column in columns])
+    updater = make_updater(args.model, **params)
+    start = time.perf_counter()
+    scores, predictions = walk_forward(X, y, keys, updater, start_key=start_season * 100,
+                                       end_key=args.end_season * 100 + 99 if args.end_season else None)
+    print(season_summary(scores, y, predictions, keys).round(3).to_string())
+    output = args.output or os.path.join(BACKTEST_DIRECTORY, f"backtest_{os.path.splitext(os.path.basename(args.csv))[0]}_{args.model}.csv")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    scores.to_csv(output, index=False)
+    print(f"✅ {len(scores)} weeks backtested in {time.perf_counter() - start:.1f}s, scores in {output}")
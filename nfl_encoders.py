@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import scipy.sparse as sparse
+except ImportError:  # only needed for the sparse output
+    sparse = None
+
+# Fitted encoder for the team column (or any other categorical column) with a fixed vocabulary.
+# The vocabulary is learned once (or given) and every later frame, the test set included, is encoded
+# against it, so training and test matrices have the same columns without realigning them.
+# Outputs:
+#   codes     one integer column, the position in the vocabulary (trees split on it directly)
+#   onehot    dense uint8 block, one column per vocabulary entry (the old pd.get_dummies columns)
+#   sparse    the same block as a scipy CSR matrix
+#   category  pandas Categorical with the vocabulary as categories (XGBoost enable_categorical)
+# Unknown and missing values are deterministic: code -1, an all-zero one-hot row, NaN in the
+# categorical output, or a ValueError with handle_unknown='error'.
+
+OUTPUTS = ['codes', 'onehot', 'sparse', 'category']
+UNKNOWN_CODE = -1
+
+
+class TeamEncoder:
+    def __init__(self, vocabulary=None, prefix='team', handle_unknown='ignore'):
+        if handle_unknown not in ('ignore', 'error'):
+            raise ValueError(f"handle_unknown must be 'ignore' or 'error', not {handle_unknown!r}")
+        self.prefix = prefix
+        self.handle_unknown = handle_unknown
+        self.vocabulary = None
+        if vocabulary is not None:
+            self.set_vocabulary(vocabulary)
+
+    def set_vocabulary(self, vocabulary):
+        self.vocabulary = list(vocabulary)
+        self.index = pd.Index(self.vocabulary)
+        if not self.index.is_unique:
+            raise ValueError("The vocabulary contains duplicates")
+
+    def fit(self, values):
+        # Sorted distinct values, missing values are not part of the vocabulary
+        self.set_vocabulary(sorted(pd.Series(values).dropna().astype(str).unique()))
+        return self
+
+    def codes(self, values):
+        if self.vocabulary is None:
+            raise ValueError("TeamEncoder is not fitted, call fit() or pass a vocabulary")
+        values = pd.Series(values)
+        codes = self.index.get_indexer(values.astype(str)).astype(np.int16)
+        codes[values.isna().to_numpy()] = UNKNOWN_CODE
+        if self.handle_unknown == 'error':
+            unknown = (codes == UNKNOWN_CODE) & values.notna().to_numpy()
+            if unknown.any():
+                raise ValueError(f"Unknown {self.prefix} values: {sorted(values[unknown].astype(str).unique())}")
+        return codes
+
+    def transform(self, values, output='onehot'):
+        codes = self.codes(values)
+        if output == 'codes':
+            return codes
+        if output == 'onehot':
+            block = np.zeros((len(codes), len(self.vocabulary)), dtype=np.uint8)
+            known = np.flatnonzero(codes >= 0)
+            block[known, codes[known]] = 1
+            return block
+        if output == 'sparse':
+            if sparse is None:
+                raise ImportError("The sparse output requires the scipy package.")
+            known = np.flatnonzero(codes >= 0)
+            return sparse.csr_matrix((np.ones(len(known), dtype=np.float32), (known, codes[known])),
+                                     shape=(len(codes), len(self.vocabulary)))
+        if output == 'category':
+            return pd.Categorical.from_codes(codes, categories=self.vocabulary)
+        raise ValueError(f"Unknown output {output!r}, expected one of {OUTPUTS}")
+
+    def feature_names(self, output='onehot'):
+        if output in ('onehot', 'sparse'):
+            return [f'{self.prefix}_{value}' for value in self.vocabulary]
+        return [self.prefix]
+
+    def frame(self, values, output='onehot', index=None):
+        # The encoded block as a DataFrame, for the pandas based feature frames
+        index = index if index is not None else getattr(values, 'index', None)
+        encoded = self.transform(values, output)
+        if output == 'sparse':
+            return pd.DataFrame.sparse.from_spmatrix(encoded, index=index, columns=self.feature_names(output))
+        if output in ('codes', 'category'):
+            return pd.DataFrame({self.prefix: encoded}, index=index)
+        return pd.DataFrame(encoded, index=index, columns=self.feature_names(output))
+
+    def to_dict(self):
+        return {'vocabulary': self.vocabulary, 'prefix': self.prefix, 'handle_unknown': self.handle_unknown}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['vocabulary'], data.get('prefix', 'team'), data.get('handle_unknown', 'ignore'))
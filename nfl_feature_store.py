@@ -0,0 +1,335 @@
+import argparse
+import copy
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from nfl_features import (EPA_FEATURES, GAME_ORDER, PLAYER_COLUMN, check_specs, compute_features, segment_starts,
+                          spec_columns)
+from nfl_scrape_manifest import write_json_atomic
+
+try:
+    import pyarrow  # noqa: F401  pandas' parquet engine
+except ImportError:  # only needed for the feature store
+    pyarrow = None
+
+# Incremental rolling features for the weekly nflfastR game logs.
+# Next to the feature rows, the store keeps a small state per player (gsis_id):
+#   the last K values of every stat column (K = longest window + shift), the games played,
+#   the last (season, week), the count/sum/sum of squares of the values older than those K, the hash
+#   of the last stored input row (the player's checkpoint) and an order independent hash of all of them.
+# Ingesting a new week only windows the new rows behind each player's K stored values, so a
+# refresh costs O(new rows + players) however many seasons are stored. update() hashes only the
+# rows at or after each checkpoint and rebuilds the store when a player's stored games were added,
+# removed or their last one edited (update(verify=True) hashes every row, to also catch older edits).
+# Each part records the seasons it holds, update(seasons=...) and load(seasons=...) only read those.
+# Layout:
+#   dat/features/<name>/config.json          features the store was built with
+#   dat/features/<name>/state.npz            per player state, replaced atomically after each ingest
+#   dat/features/<name>/part-00000.parquet   input rows with their features, one part per ingest
+
+FEATURE_ROOT = os.path.join('dat', 'features')
+
+
+def require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("The feature store requires the pyarrow package.")
+
+
+class FeatureStore:
+    def __init__(self, root, specs, shift=1, min_periods=None, career_game_number=True,
+                 group_column=PLAYER_COLUMN, order_columns=GAME_ORDER, rebuild=False):
+        require_pyarrow()
+        check_specs(specs)
+        self.root = root
+        self.specs = [tuple(spec) for spec in specs]
+        self.shift = shift
+        self.min_periods = min_periods
+        self.career_game_number = career_game_number
+        self.group_column = group_column
+        self.order_columns = list(order_columns)
+        self.columns = spec_columns(self.specs)
+        self.history_length = max([window for _, _, _, window in self.specs if window is not None], default=0) + shift
+        self.config = {'specs': [list(spec) for spec in self.specs], 'shift': shift, 'min_periods': min_periods,
+                       'career_game_number': career_game_number, 'group_column': group_column,
+                       'order_columns': self.order_columns}
+        os.makedirs(root, exist_ok=True)
+        if rebuild:
+            self.clear()
+        config_path = os.path.join(root, 'config.json')
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored != self.config:
+                raise ValueError(f"{root} holds other features than requested, open it with rebuild=True to recompute them")
+        else:
+            write_json_atomic(config_path, self.config)
+        self.load_state()
+        self.remove_orphans()
+
+    def state_path(self):
+        return os.path.join(self.root, 'state.npz')
+
+    def part_path(self, part):
+        return os.path.join(self.root, f'part-{part:05d}.parquet')
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.root, 'part-*.parquet')) + [self.state_path(),
+                                                                           os.path.join(self.root, 'config.json')]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def load_state(self):
+        columns = len(self.columns)
+        if os.path.exists(self.state_path()):
+            with np.load(self.state_path(), allow_pickle=False) as state:
+                self.ids = state['ids'].tolist()
+                self.games = state['games']
+                self.last_game = state['last_game']
+                self.history = state['history']
+                self.released = state['released']
+                self.parts = int(state['parts'])
+                # Stores written before the hashes were kept never match, update() rebuilds them
+                self.digests = state['digests'] if 'digests' in state.files else np.zeros(len(self.ids), dtype=np.uint64)
+                self.last_digests = (state['last_digests'] if 'last_digests' in state.files
+                                     else np.zeros(len(self.ids), dtype=np.uint64))
+                # Parts of stores written before the season ranges were kept are always read
+                self.part_seasons = (state['part_seasons'] if 'part_seasons' in state.files
+                                     else np.tile([-np.inf, np.inf], (self.parts, 1)))
+        else:
+            self.ids = []
+            self.games = np.zeros(0, dtype=np.int64)
+            self.last_game = np.zeros((0, len(self.order_columns)), dtype=np.float64)
+            self.history = np.zeros((0, self.history_length, columns), dtype=np.float64)
+            self.released = np.zeros((3, 0, columns), dtype=np.float64)
+            self.parts = 0
+            self.digests = np.zeros(0, dtype=np.uint64)
+            self.last_digests = np.zeros(0, dtype=np.uint64)
+            self.part_seasons = np.zeros((0, 2), dtype=np.float64)
+        self.slots = pd.Index(self.ids)
+
+    def save_state(self):
+        # The state names the parts it covers, so it is written after the part
+        temp_path = f'{self.state_path()}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, ids=np.array(self.ids, dtype=str), games=self.games, last_game=self.last_game,
+                     history=self.history, released=self.released, parts=np.int64(self.parts), digests=self.digests,
+                     last_digests=self.last_digests, part_seasons=self.part_seasons)
+        os.replace(temp_path, self.state_path())
+
+    def reset(self):
+        # Empties the store, keeping its config
+        self.clear()
+        write_json_atomic(os.path.join(self.root, 'config.json'), self.config)
+        self.load_state()
+
+    def remove_orphans(self):
+        # Deletes parts of an ingest that stopped before its state was saved
+        for path in glob.glob(os.path.join(self.root, 'part-*.parquet')):
+            if int(os.path.basename(path)[len('part-'):-len('.parquet')]) >= self.parts:
+                os.remove(path)
+
+    def add_players(self, ids):
+        unknown = pd.Index(pd.unique(ids)).difference(self.slots)
+        if not len(unknown):
+            return
+        count = len(unknown)
+        self.ids.extend(unknown.tolist())
+        self.slots = pd.Index(self.ids)
+        self.games = np.concatenate([self.games, np.zeros(count, dtype=np.int64)])
+        self.last_game = np.concatenate([self.last_game, np.zeros((count, len(self.order_columns)))])
+        self.history = np.concatenate([self.history, np.full((count,) + self.history.shape[1:], np.nan)])
+        self.released = np.concatenate([self.released, np.zeros((3, count, len(self.columns)))], axis=1)
+        self.digests = np.concatenate([self.digests, np.zeros(count, dtype=np.uint64)])
+        self.last_digests = np.concatenate([self.last_digests, np.zeros(count, dtype=np.uint64)])
+
+    def row_digests(self, df):
+        # One hash per row over the columns the features are computed from
+        columns = [self.group_column] + self.order_columns + [column for column in self.columns
+                                                              if column not in self.order_columns]
+        keys = pd.DataFrame({column: df[column].astype(str) if column == self.group_column
+                             else df[column].to_numpy(dtype=np.float64) for column in columns})
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+    def compare_to_last_game(self, slots, df):
+        # (rows after their player's last stored game, rows of the last stored game)
+        later = self.games[slots] == 0
+        equal = ~later
+        for position, column in enumerate(self.order_columns):
+            values = df[column].to_numpy(dtype=np.float64)
+            last = self.last_game[slots, position]
+            later |= equal & (values > last)
+            equal &= values == last
+        return later, equal
+
+    def newer_rows(self, slots, df):
+        # Rows after their player's last stored game, earlier rows are already in the store
+        return self.compare_to_last_game(slots, df)[0]
+
+    def changed_players(self, df, verify=False):
+        # Stored players of df whose games up to the last stored one differ from the stored games:
+        # another number of games or another last game (by its hash). verify also compares the sum
+        # of the hashes of all stored games, which hashes every row instead of one per player
+        ids = df[self.group_column].astype(str).to_numpy()
+        slots = self.slots.get_indexer(ids)
+        stored = np.flatnonzero(slots >= 0)
+        later, at_last = self.compare_to_last_game(slots[stored], df.iloc[stored])
+        players = np.unique(slots[stored])
+        games = np.bincount(slots[stored[~later]], minlength=len(self.ids))
+        checkpoints = stored[at_last]
+        checkpoint_rows = np.bincount(slots[checkpoints], minlength=len(self.ids))
+        last_digests = np.zeros(len(self.ids), dtype=np.uint64)
+        np.add.at(last_digests, slots[checkpoints], self.row_digests(df.iloc[checkpoints]))
+        changed = ((games[players] != self.games[players]) | (checkpoint_rows[players] != 1)
+                   | (last_digests[players] != self.last_digests[players]))
+        if verify:
+            digests = np.zeros(len(self.ids), dtype=np.uint64)
+            np.add.at(digests, slots[stored[~later]], self.row_digests(df.iloc[stored[~later]]))
+            changed |= digests[players] != self.digests[players]
+        return players[changed]
+
+    def new_games(self, df):
+        # (games of df newer than the stored ones with their features, what update_state needs to store
+        # them). Adds the unknown players of df to the in-memory state
+        ids = df[self.group_column].astype(str).to_numpy()
+        self.add_players(ids)
+        slots = self.slots.get_indexer(ids)
+        newer = self.newer_rows(slots, df)
+        df, slots = df[newer], slots[newer]
+        if not len(df):
+            return df, None
+        order = np.lexsort([df[column].to_numpy() for column in reversed(self.order_columns)] + [slots])
+        df, slots = df.iloc[order].reset_index(drop=True), slots[order]
+        players = np.unique(slots)
+
+        # Each player's stored last K values, followed by its new games
+        kept = np.minimum(self.games[players], self.history_length)
+        in_history = np.arange(self.history_length)[None, :] >= (self.history_length - kept)[:, None]
+        row_slots = np.concatenate([np.repeat(players, kept), slots])
+        is_new = np.concatenate([np.zeros(kept.sum(), dtype=bool), np.ones(len(df), dtype=bool)])
+        values = np.concatenate([self.history[players][in_history],
+                                 df[self.columns].to_numpy(dtype=np.float64).reshape(len(df), len(self.columns))])
+        combined = np.lexsort([is_new, row_slots])  # stable, history then new games per player
+        row_slots, is_new, values = row_slots[combined], is_new[combined], values[combined]
+        group_start = segment_starts(row_slots)
+
+        released = self.released[:, row_slots]
+        features = compute_features(values, group_start, self.specs, self.shift, self.min_periods,
+                                    career_base=(released[0], released[1], released[2]))
+        result = df.copy()
+        if self.career_game_number:
+            released_games = self.games - np.minimum(self.games, self.history_length)
+            game_number = np.arange(len(row_slots)) - group_start + 1 + released_games[row_slots]
+            result['career_game_number'] = game_number[is_new]
+        for name, _, _, _ in self.specs:
+            result[name] = features[name][is_new]
+        return result, (players, row_slots, group_start, values, df, slots)
+
+    def preview(self, df):
+        # Features of the games of df that are newer than the stored ones, windowed behind the stored
+        # state like ingest does, without changing the store (e.g. next week's rows before they are logged)
+        scratch = copy.copy(self)
+        scratch.ids = list(self.ids)
+        return scratch.new_games(df)[0]
+
+    def ingest(self, df):
+        # Adds the games of df that are newer than the stored ones and returns them with their features
+        start = time.perf_counter()
+        result, new = self.new_games(df)
+        if new is None:
+            print(f"✅ {self.root} is up to date")
+            return result
+        players, row_slots, group_start, values, df, slots = new
+        self.update_state(players, row_slots, group_start, values, df, slots)
+        digests = self.row_digests(df)
+        np.add.at(self.digests, slots, digests)
+        last = np.flatnonzero(np.r_[slots[1:] != slots[:-1], True])
+        self.last_digests[slots[last]] = digests[last]
+        temp_path = f'{self.part_path(self.parts)}.{os.getpid()}.tmp'
+        result.to_parquet(temp_path, index=False)
+        os.replace(temp_path, self.part_path(self.parts))
+        seasons = df[self.order_columns[0]].to_numpy(dtype=np.float64)
+        self.part_seasons = np.concatenate([self.part_seasons, [[seasons.min(), seasons.max()]]])
+        self.parts += 1
+        self.save_state()
+        print(f"✅ Added {len(result)} games of {len(players)} players to {self.root} "
+              f"in {time.perf_counter() - start:.2f}s")
+        return result
+
+    def update_state(self, players, row_slots, group_start, values, df, slots):
+        # Keeps the last K values of each player, older values move into the released totals
+        positions = np.arange(len(row_slots))
+        sizes = np.bincount(row_slots, minlength=len(self.ids))[row_slots]
+        from_end = group_start + sizes - positions - 1
+        releasing = from_end >= self.history_length
+        valid = ~np.isnan(values[releasing])
+        released_values = np.where(valid, values[releasing], 0.0)
+        np.add.at(self.released[0], row_slots[releasing], valid)
+        np.add.at(self.released[1], row_slots[releasing], released_values)
+        np.add.at(self.released[2], row_slots[releasing], released_values ** 2)
+        self.history[players] = np.nan
+        keep = ~releasing
+        self.history[row_slots[keep], self.history_length - 1 - from_end[keep]] = values[keep]
+        np.add.at(self.games, slots, 1)
+        last = np.flatnonzero(np.r_[slots[1:] != slots[:-1], True])
+        self.last_game[slots[last]] = df[self.order_columns].to_numpy(dtype=np.float64)[last]
+
+    def load(self, columns=None, seasons=None):
+        # The stored games with their features, sorted by player and game. seasons (values of the first
+        # order column) reads only the parts that hold them and only their rows
+        parts = np.arange(self.parts)
+        filters = None
+        if seasons is not None:
+            seasons = np.unique(np.asarray(seasons, dtype=np.float64))
+            first = np.searchsorted(seasons, self.part_seasons[:, 0], side='left')
+            parts = parts[(first < len(seasons)) & (seasons[np.minimum(first, len(seasons) - 1)] <= self.part_seasons[:, 1])]
+            filters = [(self.order_columns[0], 'in', seasons.tolist())]
+        paths = [self.part_path(part) for part in parts]
+        if not paths:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat([pd.read_parquet(path, columns=columns, filters=filters) for path in paths], ignore_index=True)
+        if self.group_column in df.columns and all(column in df.columns for column in self.order_columns):
+            df = df.sort_values([self.group_column] + self.order_columns, kind='stable').reset_index(drop=True)
+        return df
+
+    def feature_names(self):
+        return (['career_game_number'] if self.career_game_number else []) + [name for name, _, _, _ in self.specs]
+
+    def update(self, df, seasons=None, verify=False):
+        # Brings the store up to date with a full game log and returns the games of df with their
+        # features, sorted by player and game, only those of the given seasons when seasons is set.
+        # Stored games that differ from df (see changed_players) rebuild the store
+        changed = self.changed_players(df, verify)
+        if len(changed):
+            print(f"⚠️ Stored games of {len(changed)} players differ from the game log, rebuilding {self.root}")
+            self.reset()
+        self.ingest(df)
+        keys = [self.group_column] + self.order_columns
+        names = self.feature_names()
+        if seasons is not None:
+            df = df[df[self.order_columns[0]].isin(seasons)]
+        result = df.drop(columns=[column for column in names if column in df.columns])
+        if self.parts and len(df):
+            features = self.load(keys + names, seasons=pd.unique(df[self.order_columns[0]]))
+            features = features.drop_duplicates(keys, keep='last')
+            features[self.group_column] = features[self.group_column].astype(str)
+            result = result.assign(**{self.group_column: result[self.group_column].astype(str)})
+            result = result.merge(features, on=keys, how='left')
+            result[self.group_column] = result[self.group_column].astype(df[self.group_column].dtype)
+        return result.sort_values(keys, kind='stable').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Add new weeks of nflfastR game logs to a feature store.")
+    argument_parser.add_argument('csv', help="Game log CSV, e.g. qb_stats.csv or only the newest week")
+    argument_parser.add_argument('--root', help="Store directory, dat/features/<csv name> by default")
+    argument_parser.add_argument('--rebuild', action='store_true', help="Recompute all features from the CSV")
+    args = argument_parser.parse_args()
+
+    root = args.root or os.path.join(FEATURE_ROOT, os.path.splitext(os.path.basename(args.csv))[0])
+    store = FeatureStore(root, EPA_FEATURES, rebuild=args.rebuild)
+    store.ingest(pd.read_csv(args.csv))
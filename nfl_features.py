@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# Rolling per-player features for the game logs (qb_stats.csv, rb_stats.csv, wrte_stats.csv) and
+# anything longer, e.g. play-level data. The frame is sorted once by (gsis_id, season, week) and
+# every feature is computed from cumulative sums over the contiguous player segments:
+# sum(rows lo..hi) = cumsum[hi + 1] - cumsum[lo], so each (window, statistic) costs O(rows)
+# for all stat columns at once, whatever the window length, with no Python loop over players.
+# A feature is (name, column, statistic, window); window None means all earlier games (career to date).
+
+PLAYER_COLUMN = 'gsis_id'
+GAME_ORDER = ['season', 'week']
+STATISTICS = ('mean', 'std', 'sum')
+
+# Features of "QB RB WRTE Models.ipynb": avg_epa of the previous 1, 3 and 5 games
+EPA_FEATURES = [
+    ('epa_avg_last_1', 'avg_epa', 'mean', 1),
+    ('epa_avg_last_3', 'avg_epa', 'mean', 3),
+    ('epa_avg_last_5', 'avg_epa', 'mean', 5),
+    ('epa_std_last_5', 'avg_epa', 'std', 5),
+]
+
+
+def feature_name(column, statistic, window):
+    return f"{column}_{statistic}_career" if window is None else f"{column}_{statistic}_last_{window}"
+
+
+def rolling_specs(columns, windows, statistics=('mean',)):
+    # Every combination of column, window and statistic, with generated names
+    return [(feature_name(column, statistic, window), column, statistic, window)
+            for column in columns for window in windows for statistic in statistics]
+
+
+def segment_starts(codes):
+    # Position of the first row of each row's segment, codes are sorted so equal codes are contiguous
+    positions = np.arange(len(codes))
+    if not len(codes):
+        return positions
+    new_player = np.ones(len(codes), dtype=bool)
+    new_player[1:] = codes[1:] != codes[:-1]
+    return np.maximum.accumulate(np.where(new_player, positions, 0))
+
+
+def sort_games(df, group_column=PLAYER_COLUMN, order_columns=GAME_ORDER):
+    # df sorted by player then game (stable, index kept) and the first row position of each row's player
+    codes, _ = pd.factorize(df[group_column], sort=True)
+    order = np.lexsort([df[column].to_numpy() for column in reversed(order_columns)] + [codes])
+    return df.iloc[order], segment_starts(codes[order])
+
+
+def window_bounds(group_start, window, shift):
+    # [lo, end) rows of each row's window: the `window` games before the row's game minus `shift`,
+    # never reaching into the previous player's rows
+    positions = np.arange(len(group_start))
+    end = positions - shift + 1
+    lo = group_start if window is None else np.maximum(end - window, group_start)
+    return lo, np.maximum(end, lo)
+
+
+def rolling_statistics(values, lo, end, statistics, min_periods, base=None):
+    # {statistic: (rows, columns) array}; NaN values are skipped like pandas does.
+    # base = (counts, sums, squares) per row of values that precede the frame (nfl_feature_store's
+    # released career totals), they are added to every window.
+    valid = ~np.isnan(values)
+    # Centering keeps the cumulative sums small, so long frames do not lose precision in the differences
+    center = np.nanmean(values, axis=0) if valid.any() else np.zeros(values.shape[1])
+    center = np.where(np.isnan(center), 0.0, center)
+    centered = np.where(valid, values - center, 0.0)
+    zero = np.zeros((1, values.shape[1]))
+    counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    counts = counts[end] - counts[lo]
+    sums = np.concatenate([zero, np.cumsum(centered, axis=0)])
+    sums = sums[end] - sums[lo]
+    if base is not None:
+        base_counts, base_sums, base_squares = base
+        counts = counts + base_counts
+        sums = sums + base_sums - base_counts * center
+    enough = counts >= min_periods
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+        result = {}
+        if 'mean' in statistics:
+            result['mean'] = np.where(enough, means + center, np.nan)
+        if 'sum' in statistics:
+            result['sum'] = np.where(enough, sums + counts * center, np.nan)
+        if 'std' in statistics:
+            squares = np.concatenate([zero, np.cumsum(centered ** 2, axis=0)])
+            squares = squares[end] - squares[lo]
+            if base is not None:
+                squares = squares + base_squares - 2 * center * base_sums + base_counts * center ** 2
+            residual = squares - sums * means
+            # Rounding noise of the difference is zeroed, so constant windows get a std of exactly 0
+            residual = np.where(residual > squares * 1e-10, residual, 0.0)
+            variance = residual / (counts - 1)
+            result['std'] = np.where(enough & (counts > 1), np.sqrt(variance), np.nan)
+    return result
+
+
+def check_specs(specs):
+    for name, column, statistic, window in specs:
+        if statistic not in STATISTICS:
+            raise ValueError(f"Unknown statistic {statistic!r} for {name}, expected one of {STATISTICS}")
+
+
+def spec_columns(specs):
+    # Stat columns used by the specs, in first use order
+    return list(dict.fromkeys(column for _, column, _, _ in specs))
+
+
+def compute_features(values, group_start, specs, shift=1, min_periods=None, career_base=None):
+    # {name: array} of the specs over values (rows, spec_columns(specs)) sorted by player and game.
+    # career_base (counts, sums, squares) is added to the career to date (window None) features.
+    column_position = {column: position for position, column in enumerate(spec_columns(specs))}
+
+    # One pass per distinct window, covering every column and statistic of that window
+    by_window = {}
+    for name, column, statistic, window in specs:
+        by_window.setdefault(window, []).append((name, column, statistic))
+    features = {}
+    for window, window_specs in by_window.items():
+        lo, end = window_bounds(group_start, window, shift)
+        required = min_periods if min_periods is not None else (window or 1)
+        statistics = {statistic for _, _, statistic in window_specs}
+        base = career_base if window is None else None
+        result = rolling_statistics(values, lo, end, statistics, required, base)
+        for name, column, statistic in window_specs:
+            features[name] = result[statistic][:, column_position[column]]
+    return features
+
+
+def add_rolling_features(df, specs, shift=1, min_periods=None, group_column=PLAYER_COLUMN, order_columns=GAME_ORDER,
+                         career_game_number=True):
+    # Returns df sorted by player and game with one column per (name, column, statistic, window) spec.
+    # shift=1 uses only earlier games (no leakage of the current game), min_periods defaults to the
+    # full window like pandas' rolling; career to date features need at least one game.
+    check_specs(specs)
+    df, group_start = sort_games(df, group_column, order_columns)
+    df = df.copy()
+    if career_game_number:
+        df['career_game_number'] = np.arange(len(df)) - group_start + 1
+    columns = spec_columns(specs)
+    values = df[columns].to_numpy(dtype=np.float64) if columns else np.zeros((len(df), 0))
+    features = compute_features(values, group_start, specs, shift, min_periods)
+    for name, _, _, _ in specs:
+        df[name] = features[name]
+    return df
@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+}
+
+
+class RateLimiter:
+    # Spaces out calls so that no more than `requests_per_second` go through.
+    # Slots are handed out under a lock, the sleeping happens outside of it, so
+    # concurrent callers queue up behind each other instead of bursting.
+    def __init__(self, requests_per_second=None):
+        self.requests_per_second = requests_per_second
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.requests_per_second:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.requests_per_second
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    # Rate limiter that finds the rate a server tolerates (additive increase, multiplicative decrease):
+    # every successful response raises the rate a little, a throttled one (429/503) halves it.
+    # Requests already in flight tend to be throttled together, so the rate is halved at most
+    # once per cooldown period.
+    def __init__(self, requests_per_second=5, min_rate=0.5, max_rate=20, increase=0.1, cooldown=2.0):
+        super().__init__(requests_per_second)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.cooldown = cooldown
+        self.last_decrease = float('-inf')
+
+    def on_success(self):
+        with self.lock:
+            self.requests_per_second = min(self.max_rate, self.requests_per_second + self.increase)
+
+    def on_throttle(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease >= self.cooldown:
+                self.requests_per_second = max(self.min_rate, self.requests_per_second / 2)
+                self.last_decrease = now
+
+
+class PageFetcher:
+    # Shared HTTP layer for the NFL.com scrapers.
+    # One requests.Session (keep-alive connection pool) is used by every request,
+    # a thread pool gives bounded concurrency and each host gets its own rate limiter.
+    # With a ResponseCache attached, fresh pages are served from disk without touching
+    # the network or the rate limit, stale ones are revalidated with a conditional GET.
+    # A rate_limiter passed in replaces the per-host limiters, e.g. one shared between processes.
+    def __init__(self, max_workers=8, requests_per_second=5, headers=None, timeout=30, cache=None, rate_limiter=None):
+        self.max_workers = max_workers
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        # Keep at least one pooled connection per worker so threads never wait on the pool
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.host_limiters = {}
+        self.limiters_lock = threading.Lock()
+
+    def limiter_for(self, url):
+        # Returns the rate limiter of the host the url points to
+        if self.rate_limiter is not None:
+            return self.rate_limiter
+        host = urlsplit(url).netloc
+        with self.limiters_lock:
+            if host not in self.host_limiters:
+                self.host_limiters[host] = RateLimiter(self.requests_per_second)
+            return self.host_limiters[host]
+
+    def get(self, url, **kwargs):
+        # Blocking GET through the pooled session, respecting the host rate limit
+        cached = None
+        if self.cache is not None:
+            cached, is_fresh, validators = self.cache.lookup(url)
+            if cached is not None and is_fresh:
+                return cached
+            if validators:
+                kwargs["headers"] = {**validators, **kwargs.get("headers", {})}
+
+        self.limiter_for(url).wait()
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.get(url, **kwargs)
+
+        if self.cache is not None:
+            if response.status_code == 304 and cached is not None:
+                # Unchanged since we stored it, keep the cached body
+                self.cache.refresh(url)
+                return cached
+            if response.status_code == 200:
+                self.cache.store(url, response)
+        return response
+
+    def submit(self, url, **kwargs):
+        # Schedules a GET on the worker pool and returns its future
+        return self.executor.submit(self.get, url, **kwargs)
+
+    def fetch_many(self, urls):
+        # Fetches all urls concurrently and yields (url, response) in the order given.
+        # Must not be called from a function running on this fetcher's own pool (see map).
+        urls = list(urls)
+        futures = [self.submit(url) for url in urls]
+        for url, future in zip(urls, futures):
+            yield url, future.result()
+
+    def map(self, func, *iterables):
+        # Runs func over the items on the worker pool. func may call get(), but not
+        # fetch_many(), otherwise the pool can run out of workers waiting on itself.
+        return self.executor.map(func, *iterables)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,137 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from nfl_scrape_manifest import write_json_atomic
+
+# Typed loader for the nflfastR game logs of nfl_players_data.R (qb_stats.csv, rb_stats.csv, wrte_stats.csv).
+# Columns get their declared dtypes once: categories for ids, names, team and position, int8/int16 for counts
+# and years, float32 for rates, birth_date as a date. EPA stays float64, it is the model target.
+# The typed frame is cached as one .npy file per column under dat/cache/<csv name>-<csv sha256>/,
+# so while the CSV is unchanged a load is a memory map of those files instead of a CSV parse.
+
+CACHE_DIRECTORY = os.path.join('dat', 'cache')
+SCHEMA_VERSION = 1  # bump when GAME_LOG_DTYPES changes, older caches are then rebuilt
+
+IDENTITY_DTYPES = {
+    'season': 'int16', 'week': 'int8', 'gsis_id': 'category', 'full_name': 'category', 'team': 'category',
+    'position': 'category', 'birth_date': 'datetime64[s]', 'height': 'int8', 'weight': 'int16', 'years_exp': 'int8',
+    'rookie_year': 'int16', 'entry_year': 'int16', 'draft_number': 'int16', 'depth_chart_position': 'category',
+}
+
+COUNT_COLUMNS = [
+    'pass_attempts', 'completions', 'air_yards', 'passing_yards', 'first_down_pass', 'pass_touchdowns', 'interceptions',
+    'rush_attempts', 'rushing_yards', 'rush_touchdowns', 'rush_tds', 'first_down_rush', 'third_down_converted',
+    'third_down_failed', 'fourth_down_converted', 'fourth_down_failed', 'fumble', 'fumble_forced', 'fumble_not_forced',
+    'tackled_for_loss', 'fumble_lost', 'sack', 'penalties', 'penalty_yards', 'qb_dropback', 'targets', 'receptions',
+    'yac', 'pass_tds',
+]
+RATE_COLUMNS = ['comp_pct', 'third_down_rate', 'fourth_down_rate', 'cpoe', 'rush_ypa', 'catch_rate']
+EPA_COLUMNS = ['total_epa', 'avg_epa']
+
+GAME_LOG_DTYPES = {
+    **IDENTITY_DTYPES,
+    **{column: 'int16' for column in COUNT_COLUMNS},
+    **{column: 'float32' for column in RATE_COLUMNS},
+    **{column: 'float64' for column in EPA_COLUMNS},
+}
+
+
+def to_dtype(series, dtype):
+    # Integer columns with missing values (draft_number of undrafted players) become float32 instead
+    if dtype == 'category':
+        return series.astype('category')
+    if dtype.startswith('datetime64'):
+        return pd.to_datetime(series, errors='coerce').astype(dtype)
+    if dtype.startswith('int') and series.isna().any():
+        return series.astype('float32')
+    return series.astype(dtype)
+
+
+def read_game_log_csv(path):
+    # Parses the CSV and applies GAME_LOG_DTYPES, undeclared columns keep pandas' inferred dtype
+    df = pd.read_csv(path)
+    return pd.DataFrame({column: to_dtype(df[column], GAME_LOG_DTYPES[column]) if column in GAME_LOG_DTYPES
+                         else df[column] for column in df.columns})
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(path, digest, cache_directory=CACHE_DIRECTORY):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_directory, f'{name}-v{SCHEMA_VERSION}-{digest[:16]}')
+
+
+def write_cache(df, directory):
+    # One .npy per column (category codes plus their labels in meta.json); meta.json is written last
+    # and marks the cache complete, caches of earlier versions of the CSV are removed afterwards
+    temp_directory = f'{directory}.{os.getpid()}.tmp'
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    os.makedirs(temp_directory)
+    columns = []
+    for position, column in enumerate(df.columns):
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            entry = {'name': column, 'file': f'{position:03d}.npy', 'categories': series.cat.categories.tolist()}
+            values = series.cat.codes.to_numpy()
+        elif series.dtype.kind in 'biufcmM':
+            entry = {'name': column, 'file': f'{position:03d}.npy'}
+            values = series.to_numpy()
+        else:
+            # Undeclared text columns are small enough to keep in meta.json
+            columns.append({'name': column, 'values': series.astype(object).where(series.notna(), None).tolist()})
+            continue
+        np.save(os.path.join(temp_directory, entry['file']), values)
+        columns.append(entry)
+    write_json_atomic(os.path.join(temp_directory, 'meta.json'), {'schema': SCHEMA_VERSION, 'rows': len(df),
+                                                                  'columns': columns})
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temp_directory, directory)
+    name = os.path.basename(directory).rsplit('-', 2)[0]
+    for stale in glob.glob(os.path.join(glob.escape(os.path.dirname(directory)), glob.escape(name) + '-v*-*')):
+        if stale != directory and not stale.endswith('.tmp'):
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def read_cache(directory, mmap=True):
+    # Numeric and date columns are memory mapped copy-on-write: pages are read on first use and
+    # changes to the frame stay in memory, the cache files are never modified
+    with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    data = {}
+    for entry in meta['columns']:
+        if 'values' in entry:
+            data[entry['name']] = pd.Series(entry['values'])
+            continue
+        values = np.load(os.path.join(directory, entry['file']), mmap_mode='c' if mmap else None)
+        values = values.view(np.ndarray)  # still backed by the mapping, without the np.memmap subclass
+        if 'categories' in entry:
+            data[entry['name']] = pd.Categorical.from_codes(values, entry['categories'])
+        else:
+            data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_game_log(path, cache_directory=CACHE_DIRECTORY, mmap=True):
+    # Typed game log; parsed from the CSV only when the cache for its current content does not exist yet
+    directory = cache_path(path, file_sha256(path), cache_directory)
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        return read_cache(directory, mmap)
+    start = time.perf_counter()
+    df = read_game_log_csv(path)
+    os.makedirs(cache_directory, exist_ok=True)
+    write_cache(df, directory)
+    print(f"✅ Cached {path} ({len(df)} rows) in {directory} in {time.perf_counter() - start:.2f}s")
+    return df
@@ -0,0 +1,203 @@
+import datetime
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Time-to-live values in seconds, None means the page never goes stale
+FOREVER = None
+CURRENT_SEASON_TTL = 60 * 60  # stats of the running season change every week
+ARTICLE_TTL = 7 * 24 * 60 * 60  # published articles are rarely edited
+DEFAULT_TTL = 60 * 60  # listing and index pages
+
+# Stat pages carry their season in the path, e.g. /stats/player-stats/category/passing/2023/reg/all/...
+SEASON_PATTERN = re.compile(r'/((?:19|20)\d{2})/(?:pre|reg|post)(?:/|$)')
+ARTICLE_PATTERN = re.compile(r'/news/(?!all-news)[^/?#]+/?$')
+
+
+def season_of_date(date):
+    # The NFL season starts in September, January to August still belongs to the previous one
+    return date.year if date.month >= 9 else date.year - 1
+
+
+class TTLPolicy:
+    # Decides how long a cached page stays fresh based on the class of its url.
+    def __init__(self, current_season=None):
+        self.current_season = current_season if current_season is not None else season_of_date(datetime.date.today())
+
+    def __call__(self, url):
+        season = SEASON_PATTERN.search(url)
+        if season:
+            # Historic seasons are final, the running season is refreshed often
+            if int(season.group(1)) < self.current_season:
+                return FOREVER
+            return CURRENT_SEASON_TTL
+        if ARTICLE_PATTERN.search(url):
+            return ARTICLE_TTL
+        return DEFAULT_TTL
+
+
+class CachedResponse:
+    # Minimal stand-in for requests.Response for pages served from the cache
+    def __init__(self, url, status_code, content, headers=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+class ResponseCache:
+    # Persistent on-disk HTTP response cache shared by the NFL.com scrapers.
+    # Bodies are stored content-addressed (objects/<sha256>) so identical pages are kept once,
+    # an SQLite index maps urls to bodies together with their validators and expiry.
+    # The total size of the bodies is bounded, the least recently used urls are evicted first.
+    def __init__(self, directory="dat/http_cache", max_bytes=1024 ** 3, ttl_policy=None):
+        self.directory = directory
+        self.objects_directory = os.path.join(directory, 'objects')
+        self.max_bytes = max_bytes
+        self.ttl_policy = ttl_policy if ttl_policy is not None else TTLPolicy()
+        os.makedirs(self.objects_directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(directory, 'index.db'), timeout=60, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )""")
+            self.connection.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS objects (digest TEXT PRIMARY KEY, size INTEGER NOT NULL)')
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_directory, digest[:2], digest)
+
+    def expiry(self, url, now):
+        ttl = self.ttl_policy(url)
+        return None if ttl is FOREVER else now + ttl
+
+    def lookup(self, url):
+        # Returns (response, is_fresh, validators) for a cached url, or (None, False, {}) on a miss
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT digest, etag, last_modified, content_type, expires_at FROM entries WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None, False, {}
+            digest, etag, last_modified, content_type, expires_at = row
+            try:
+                with open(self.object_path(digest), 'rb') as f:
+                    content = f.read()
+            except FileNotFoundError:
+                # Body was removed behind our back, forget the entry
+                with self.connection:
+                    self.connection.execute('DELETE FROM entries WHERE url = ?', (url,))
+                return None, False, {}
+            now = time.time()
+            with self.connection:
+                self.connection.execute('UPDATE entries SET last_access = ? WHERE url = ?', (now, url))
+
+        validators = {}
+        if etag:
+            validators['If-None-Match'] = etag
+        if last_modified:
+            validators['If-Modified-Since'] = last_modified
+        headers = {'Content-Type': content_type} if content_type else {}
+        is_fresh = expires_at is None or expires_at > now
+        return CachedResponse(url, 200, content, headers), is_fresh, validators
+
+    def store(self, url, response):
+        # Saves a 200 response under its url and evicts old entries if the cache grew too large
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+
+        now = time.time()
+        headers = response.headers
+        with self.lock, self.connection:
+            previous = self.connection.execute('SELECT digest FROM entries WHERE url = ?', (url,)).fetchone()
+            self.connection.execute('INSERT OR IGNORE INTO objects (digest, size) VALUES (?, ?)', (digest, len(content)))
+            self.connection.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, digest, headers.get('ETag'), headers.get('Last-Modified'), headers.get('Content-Type'),
+                 now, self.expiry(url, now), now)
+            )
+            # The page changed, its old body goes unless another url has the same body
+            if previous is not None and previous[0] != digest:
+                self.drop_unused_object(previous[0])
+        self.evict()
+
+    def refresh(self, url):
+        # Marks a cached url as fresh again after the server answered 304 Not Modified
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'UPDATE entries SET stored_at = ?, expires_at = ?, last_access = ? WHERE url = ?',
+                (now, self.expiry(url, now), now, url)
+            )
+
+    def total_bytes(self):
+        with self.lock:
+            return self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+
+    def drop_unused_object(self, digest):
+        # Deletes a body no entry refers to anymore, returns the bytes freed. Called with the lock held
+        still_used = self.connection.execute('SELECT 1 FROM entries WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+        if still_used:
+            return 0
+        size = self.connection.execute('SELECT size FROM objects WHERE digest = ?', (digest,)).fetchone()
+        self.connection.execute('DELETE FROM objects WHERE digest = ?', (digest,))
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+        return size[0] if size else 0
+
+    def evict(self):
+        # Drops least recently used urls until the bodies fit into max_bytes again
+        if self.max_bytes is None:
+            return
+        with self.lock:
+            total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Bodies left behind by replaced pages (caches written before store() removed them) go first
+            orphans = self.connection.execute(
+                'SELECT objects.digest FROM objects LEFT JOIN entries ON entries.digest = objects.digest '
+                'WHERE entries.url IS NULL'
+            ).fetchall()
+            with self.connection:
+                for digest, in orphans:
+                    total -= self.drop_unused_object(digest)
+            if total <= self.max_bytes:
+                return
+            candidates = self.connection.execute('SELECT url, digest FROM entries ORDER BY last_access').fetchall()
+            with self.connection:
+                for url, digest in candidates:
+                    if total <= self.max_bytes:
+                        break
+                    self.connection.execute('DELETE FROM entries WHERE url = ?', (url,))
+                    total -= self.drop_unused_object(digest)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,171 @@
+import json
+import os
+
+from nfl_scrape_manifest import write_json_atomic
+
+try:
+    import zstandard as zstd
+except ImportError:  # only needed for compressed stores
+    zstd = None
+
+# Append-only JSONL storage with a persistent key index, used for the news links and articles.
+#
+#   dat/nfl_news_2023.jsonl            one JSON record per line (or .jsonl.zst, one zstd frame per batch)
+#   dat/nfl_news_2023.jsonl.idx        keys of the stored records, one per line
+#   dat/nfl_news_2023.jsonl.idx.json   size of the data file the index is in sync with
+#
+# A batch is appended to the data file and fsynced first, then its keys go to the index and the
+# checkpoint moves forward. Writing a batch therefore costs O(batch), whatever the size of the
+# archive. After a crash the records between the checkpoint and the end of the data file are
+# re-indexed when they are complete, a torn tail is cut off.
+
+
+class JsonlStore:
+    def __init__(self, path, key='url', compress=None):
+        self.path = path
+        self.key = key
+        self.compress = path.endswith('.zst') if compress is None else compress
+        if self.compress and zstd is None:
+            raise ImportError("Compressed stores require the zstandard package.")
+        self.index_path = path + '.idx'
+        self.checkpoint_path = path + '.idx.json'
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.keys = set()
+        self.recover()
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def data_size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def recover(self):
+        # Loads the index and brings it in line with the data file
+        checkpoint = 0
+        if os.path.exists(self.index_path) and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)['data_bytes']
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.keys = {line.rstrip('\n') for line in f if line.strip()}
+
+        size = self.data_size()
+        if size < checkpoint:
+            # Data file was replaced behind our back, rebuild the index from scratch
+            checkpoint = 0
+            self.keys = set()
+            open(self.index_path, 'w').close()
+        if size == checkpoint:
+            if not os.path.exists(self.checkpoint_path):
+                write_json_atomic(self.checkpoint_path, {'data_bytes': size})
+            return
+
+        # Records written after the last checkpoint: keep the complete ones, cut off a torn tail
+        with open(self.path, 'rb') as f:
+            f.seek(checkpoint)
+            tail = f.read()
+        records, valid_bytes = self.decode_tail(tail)
+        if valid_bytes < len(tail):
+            with open(self.path, 'r+b') as f:
+                f.truncate(checkpoint + valid_bytes)
+        self.index_records(records, checkpoint + valid_bytes)
+
+    def decode_tail(self, tail):
+        # Returns (complete records, number of bytes they take up)
+        if self.compress:
+            # One frame per batch, stop at the first frame that is cut off or damaged
+            records = []
+            valid_bytes = 0
+            while valid_bytes < len(tail):
+                decompressor = zstd.ZstdDecompressor().decompressobj()
+                try:
+                    text = decompressor.decompress(tail[valid_bytes:])
+                except zstd.ZstdError:
+                    break
+                if not decompressor.eof:
+                    break
+                records += [json.loads(line) for line in text.splitlines() if line.strip()]
+                valid_bytes = len(tail) - len(decompressor.unused_data)
+            return records, valid_bytes
+        end = tail.rfind(b'\n') + 1
+        records = []
+        for line in tail[:end].splitlines():
+            if line.strip():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records, end
+
+    def index_records(self, records, data_bytes):
+        keys = [record[self.key] for record in records]
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.writelines(key + '\n' for key in keys)
+            f.flush()
+            os.fsync(f.fileno())
+        self.keys.update(keys)
+        write_json_atomic(self.checkpoint_path, {'data_bytes': data_bytes})
+
+    def append(self, records):
+        # Appends the records whose key is not stored yet, returns the ones that were written
+        new_records = []
+        batch_keys = set()
+        for record in records:
+            key = record[self.key]
+            if key not in self.keys and key not in batch_keys:
+                batch_keys.add(key)
+                new_records.append(record)
+        if not new_records:
+            return []
+
+        payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in new_records).encode('utf-8')
+        if self.compress:
+            # Every batch is an independent zstd frame, concatenated frames form a valid stream
+            payload = zstd.ZstdCompressor(level=10).compress(payload)
+        with open(self.path, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+            data_bytes = f.tell()
+        self.index_records(new_records, data_bytes)
+        return new_records
+
+    def __iter__(self):
+        # Streams every stored record
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            if self.compress:
+                reader = zstd.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                lines = iter_lines(reader)
+            else:
+                lines = f
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_lines(reader, chunk_size=1 << 20):
+    # Splits a binary stream into lines, reading it in large chunks
+    remainder = b''
+    for chunk in iter(lambda: reader.read(chunk_size), b''):
+        lines = (remainder + chunk).split(b'\n')
+        remainder = lines.pop()
+        yield from lines
+    if remainder:
+        yield remainder
+
+
+def migrate_json_array(json_path, store):
+    # One-off import of a legacy JSON array file (the old read-modify-write format) into a store
+    if not os.path.exists(json_path):
+        return 0
+    with open(json_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    written = store.append(records)
+    os.replace(json_path, json_path + '.migrated')
+    return len(written)
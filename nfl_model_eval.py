@@ -0,0 +1,157 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+from nfl_encoders import TeamEncoder
+from nfl_game_logs import load_game_log
+
+# Evaluation harness for the time-split random forest (qb_random_forest_time_split_model.py).
+# The script used to fit the same model 1 + 5 (cross_val_score RMSE) + 5 (cross_val_score R²)
+# + 50 (learning_curve) times, one after the other. Here every (fold, training size) is fitted once
+# and all metrics are computed from that fit: the full-size point of each fold's learning curve is
+# the cross-validation fit of that fold, so a 5 fold, 10 point report needs 50 fits plus the holdout.
+# The fits run in a joblib process pool; the feature matrix is dumped once and every worker maps
+# the same read-only file instead of receiving its own pickled copy.
+
+TARGET = 'avg_epa'
+SPLIT_WEEK = 10  # train on weeks <= 10, test on the rest of the season
+DROP_COLUMNS = ['avg_epa', 'gsis_id', 'position', 'depth_chart_position', 'full_name', 'total_epa', 'third_down_rate',
+                'fourth_down_rate']
+TRAIN_SIZES = np.linspace(0.1, 1.0, 10)
+POSITION_CSVS = {'QB': "qb_stats.csv", 'RB': "rb_stats.csv", 'WR/TE': "wrte_stats.csv"}
+
+
+def feature_frame(df, drop_columns=DROP_COLUMNS, encoder=None, team_encoding='onehot'):
+    # Encoded team and birth_year, as in the time-split script. The team encoder is fitted on df
+    # when none is given; team_encoding is one of nfl_encoders.OUTPUTS.
+    if encoder is None:
+        encoder = TeamEncoder().fit(df['team'])
+    features = df.drop(columns=[column for column in drop_columns if column in df.columns] + ['team', 'birth_date'])
+    team = encoder.frame(df['team'], team_encoding, index=df.index)
+    birth_year = pd.to_datetime(df['birth_date']).dt.year.rename('birth_year')
+    features = pd.concat([features, team, birth_year], axis=1)
+    # comp_pct is inf for games without a pass attempt, sklearn rejects infinite values.
+    # Unknown teams are encoded, not missing, so they never drop a row.
+    complete = [column for column in features.columns if column not in team.columns]
+    return features.replace([np.inf, -np.inf], np.nan).dropna(subset=complete)
+
+
+def time_split(df, target=TARGET, split_week=SPLIT_WEEK, drop_columns=DROP_COLUMNS, team_encoding='onehot'):
+    # (X_train, y_train, X_test, y_test). The team vocabulary comes from the training weeks, so the
+    # test set has the same columns and teams it does not know are encoded as unknown
+    train_data = df[df['week'] <= split_week]
+    test_data = df[df['week'] > split_week]
+    encoder = TeamEncoder().fit(train_data['team'])
+    train_features = feature_frame(train_data, drop_columns, encoder, team_encoding)
+    test_features = feature_frame(test_data, drop_columns, encoder, team_encoding)
+    return (train_features, train_data.loc[train_features.index, target],
+            test_features, test_data.loc[test_features.index, target])
+
+
+def fit_and_score(model, X, y, train, test, train_size):
+    # One fit on the first train_size share of the fold's training rows, scored on the fold's test rows
+    rows = train[:max(int(round(train_size * len(train))), 1)]
+    model = clone(model).fit(X[rows], y[rows])
+    predictions = model.predict(X[test])
+    return {
+        'train_rows': len(rows),
+        'train_r2': r2_score(y[rows], model.predict(X[rows])),
+        'test_r2': r2_score(y[test], predictions),
+        'test_rmse': float(np.sqrt(mean_squared_error(y[test], predictions))),
+    }
+
+
+def fit_holdout(model, X_train, y_train, X_test, y_test):
+    model = clone(model).fit(X_train, y_train)
+    predictions = model.predict(X_test)
+    return model, {'rmse': float(np.sqrt(mean_squared_error(y_test, predictions))), 'r2': r2_score(y_test, predictions)}
+
+
+def single_threaded(model):
+    # The pool provides the parallelism, forests inside the workers use one core each
+    return clone(model).set_params(n_jobs=1) if 'n_jobs' in model.get_params() else clone(model)
+
+
+def evaluate_model(model, X, y, cv=5, train_sizes=TRAIN_SIZES, n_jobs=None, holdout=None, temp_directory=None):
+    # Cross-validation, learning curve and optionally the holdout fit (X_test, y_test) of one model.
+    # Folds are unshuffled KFold splits like cross_val_score; the learning curve uses the same folds.
+    columns = list(X.columns) if hasattr(X, 'columns') else None
+    X = np.ascontiguousarray(X, dtype=np.float32)  # the dtype the forest fits on
+    y = np.asarray(y, dtype=np.float64)
+    folds = list(KFold(cv).split(X))
+    train_sizes = sorted(set(float(size) for size in train_sizes) | {1.0})
+    model = single_threaded(model)
+
+    directory = tempfile.mkdtemp(prefix='nfl_model_eval_', dir=temp_directory)
+    try:
+        joblib.dump(X, os.path.join(directory, 'X.joblib'))
+        shared_X = joblib.load(os.path.join(directory, 'X.joblib'), mmap_mode='r')
+        tasks = [joblib.delayed(fit_and_score)(model, shared_X, y, train, test, size)
+                 for train, test in folds for size in train_sizes]
+        if holdout is not None:
+            X_test, y_test = holdout
+            X_test = np.ascontiguousarray(X_test, dtype=np.float32)
+            tasks.append(joblib.delayed(fit_holdout)(model, shared_X, y, X_test, np.asarray(y_test)))
+        start = time.perf_counter()
+        results = joblib.Parallel(n_jobs=n_jobs or os.cpu_count(), backend='loky')(tasks)
+        seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {'fits': len(tasks), 'seconds': seconds}
+    if holdout is not None:
+        report['model'], report['holdout'] = results.pop()
+        if columns is not None:
+            report['feature_importance'] = pd.Series(report['model'].feature_importances_,
+                                                     index=columns).sort_values(ascending=False)
+    scores = pd.DataFrame(results)
+    scores['fold'] = np.repeat(np.arange(cv), len(train_sizes))
+    scores['train_size'] = np.tile(train_sizes, cv)
+    full = scores[scores['train_size'] == 1.0]
+    report['cv_rmse'] = full['test_rmse'].to_numpy()
+    report['cv_r2'] = full['test_r2'].to_numpy()
+    curve = scores.groupby('train_size')
+    report['train_sizes'] = curve['train_rows'].mean().round().astype(int).to_numpy()
+    report['train_scores'] = np.stack([group['train_r2'].to_numpy() for _, group in curve])
+    report['test_scores'] = np.stack([group['test_r2'].to_numpy() for _, group in curve])
+    return report
+
+
+def print_report(label, report):
+    print(f"{label} RMSE:", report['holdout']['rmse'])
+    print(f"{label} R2:", report['holdout']['r2'])
+    print(f"Cross-validated RMSE: {report['cv_rmse'].mean():.3f} ± {report['cv_rmse'].std():.3f}")
+    print(f"Cross-validated R²: {report['cv_r2'].mean():.3f} ± {report['cv_r2'].std():.3f}")
+    print(f"({report['fits']} fits in {report['seconds']:.1f}s)")
+
+
+def position_reports(position_csvs=POSITION_CSVS, n_jobs=None, cv=5, train_sizes=TRAIN_SIZES):
+    # Holdout, cross-validation and learning curve of the time-split forest for every position
+    reports = {}
+    for label, path in position_csvs.items():
+        X_train, y_train, X_test, y_test = time_split(load_game_log(path))
+        model = RandomForestRegressor(n_estimators=100, random_state=42)
+        reports[label] = evaluate_model(model, X_train, y_train, cv, train_sizes, n_jobs, holdout=(X_test, y_test))
+        print_report(label, reports[label])
+    return reports
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Evaluate the time-split random forest for QB, RB and WR/TE.")
+    argument_parser.add_argument('--jobs', type=int, help="Worker processes, all cores by default")
+    argument_parser.add_argument('--cv', type=int, default=5)
+    args = argument_parser.parse_args()
+
+    start = time.perf_counter()
+    position_reports(n_jobs=args.jobs, cv=args.cv)
+    print(f"✅ Report finished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,343 @@
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from nfl_encoders import TeamEncoder
+from nfl_feature_store import FeatureStore
+from nfl_position_models import POSITION_CONFIGS, TARGET, TEAM_COLUMN, feature_matrix, load_position, run_positions
+from nfl_scrape_manifest import write_json_atomic
+
+# Versioned model artifacts of the position models and a local prediction service.
+# A trained model is saved once under dat/models/<position>/<version>/:
+#   model.joblib    the fitted estimator, uncompressed so its arrays can be memory-mapped on load
+#   schema.json     feature columns and encoding (team vocabulary, dropped and zero-filled columns), the
+#                   pipeline config, SHA-256 of the training CSV, metrics and the sklearn version
+# dat/models/<position>/latest.json names the newest version. A Predictor loads an artifact once and
+# scores any batch of player-weeks through the training feature code, so weekly projections are a
+# predict call instead of a refit. The server builds the game logs once at start (GET requests never
+# touch the feature stores) and answers on localhost only:
+#   GET  /models                                   saved positions and their latest schema
+#   GET  /predict/<position>?season=2023&week=5    projections of every player-week in the game log
+#   POST /predict/<position>                       {"records": [...]} raw game log rows (e.g. next week's)
+#   POST /refresh                                  reloads the latest models and rebuilds the game logs
+# Posted rows need gsis_id, season, week and the model's other numeric columns, team and birth_date;
+# a 400 lists the missing ones. Their rolling features (from the earlier games only) are taken
+# from the game log for logged games and windowed behind each player's stored feature state for later
+# games, without writing the store. Rows that already carry every rolling feature are used as posted.
+
+MODEL_ROOT = os.path.join('dat', 'models')
+ID_COLUMNS = ['gsis_id', 'full_name', 'team', 'season', 'week']
+PORT = 8008
+
+
+def model_slug(label):
+    # "WR/TE" -> "wrte", like the feature store directories
+    return label.lower().replace('/', '')
+
+
+def position_label(slug):
+    for label in POSITION_CONFIGS:
+        if model_slug(label) == slug.lower():
+            return label
+    raise ValueError(f"Unknown position {slug!r}, expected one of {[model_slug(label) for label in POSITION_CONFIGS]}")
+
+
+def versions(label, root=MODEL_ROOT):
+    directory = os.path.join(root, model_slug(label))
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if name.startswith('v') and name[1:].isdigit())
+
+
+def latest_version(label, root=MODEL_ROOT):
+    path = os.path.join(root, model_slug(label), 'latest.json')
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No saved {label} model under {root}, run `python nfl_model_registry.py train` first")
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['version']
+
+
+def save_artifact(label, result, root=MODEL_ROOT):
+    # Saves one train_position result as the next version and makes it the latest. Returns the version
+    directory = os.path.join(root, model_slug(label))
+    existing = versions(label, root)
+    version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+    config = result['config']
+    team_columns = TeamEncoder(result['vocabulary'], prefix=TEAM_COLUMN).feature_names(config['team_encoding'])
+    schema = {
+        'label': label,
+        'version': version,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'target': TARGET,
+        'columns': result['columns'],
+        'numeric_columns': result['columns'][:len(result['columns']) - len(team_columns) - 1],
+        'vocabulary': result['vocabulary'],
+        'team_encoding': config['team_encoding'],
+        'drop_columns': config['drop_columns'],
+        'fill_zero': config['fill_zero'],
+        'config': config,
+        'data_sha256': result['data_sha256'],
+        'metrics': result['metrics'],
+        'model_class': type(result['model']).__name__,
+        'sklearn_version': sklearn.__version__,
+    }
+    # Written to a temporary directory and renamed, a reader never sees half an artifact
+    temp_directory = os.path.join(directory, f'.{version}.{os.getpid()}.tmp')
+    os.makedirs(temp_directory, exist_ok=True)
+    joblib.dump(result['model'], os.path.join(temp_directory, 'model.joblib'))
+    write_json_atomic(os.path.join(temp_directory, 'schema.json'), schema)
+    os.replace(temp_directory, os.path.join(directory, version))
+    write_json_atomic(os.path.join(directory, 'latest.json'), {'version': version})
+    return version
+
+
+def load_artifact(label, version=None, root=MODEL_ROOT, mmap=True):
+    # (model, schema) of a saved version, the latest by default
+    version = version or latest_version(label, root)
+    directory = os.path.join(root, model_slug(label), version)
+    with open(os.path.join(directory, 'schema.json'), encoding='utf-8') as f:
+        schema = json.load(f)
+    model = joblib.load(os.path.join(directory, 'model.joblib'), mmap_mode='r' if mmap else None)
+    return model, schema
+
+
+class Predictor:
+    # A loaded artifact, scores player-weeks with the feature code the model was trained with
+    def __init__(self, label, version=None, root=MODEL_ROOT, mmap=True):
+        self.label = label
+        self.model, self.schema = load_artifact(label, version, root, mmap)
+        self.log = None
+        self.store = None
+        self.log_lock = threading.Lock()
+        if hasattr(self.model, 'n_jobs'):
+            self.model.n_jobs = 1  # small batches, the worker threads cost more than they save
+
+    def matrix(self, df):
+        schema = self.schema
+        X, columns = feature_matrix(df, schema['drop_columns'], schema['fill_zero'], schema['vocabulary'],
+                                    schema['team_encoding'], schema['numeric_columns'])
+        if columns != schema['columns']:
+            raise ValueError(f"Feature columns differ from the {self.label} {schema['version']} schema")
+        return X
+
+    def predict(self, df):
+        # Predicted target per row, NaN for rows with missing or infinite features (left out in training)
+        X = self.matrix(df)
+        predictions = np.full(len(X), np.nan)
+        complete = np.isfinite(X).all(axis=1)
+        if complete.any():
+            predictions[complete] = self.model.predict(X[complete])
+        return predictions
+
+    def game_log(self):
+        # The position's game log with the rolling features of the training config, built on first use
+        with self.log_lock:
+            if self.log is None:
+                config = self.schema['config']
+                self.log = load_position(self.label, config)
+                if config['rolling_features']:
+                    self.store = FeatureStore(config['feature_store'], config['rolling_features'])
+            return self.log
+
+    def required_columns(self):
+        # Columns a posted row needs, its rolling features are added from the game log and feature store.
+        # The stat columns the features are computed from are optional (the target of a game to predict)
+        columns = []
+        names = []
+        if self.store is not None:
+            columns = [self.store.group_column] + self.store.order_columns
+            names = self.store.feature_names()
+        columns += [column for column in self.schema['numeric_columns'] if column not in names]
+        return list(dict.fromkeys(columns + [TEAM_COLUMN, 'birth_date']))
+
+    def with_features(self, df):
+        # Posted rows with their rolling features: logged games take them from the game log, games after
+        # a player's last stored one are windowed behind its stored state, other rows get none (NaN)
+        log = self.game_log()
+        if self.store is None or all(name in df.columns for name in self.store.feature_names()):
+            return df
+        missing = [column for column in self.required_columns() if column not in df.columns]
+        if missing:
+            raise ValueError(f"Columns {missing} are missing from the records")
+        group = self.store.group_column
+        keys = [group] + self.store.order_columns
+        names = self.store.feature_names()
+        rows = df.drop(columns=[name for name in names if name in df.columns]).reset_index(drop=True)
+        rows[group] = rows[group].astype(str)
+        known = [log[keys + names]]
+        stats = {column: np.nan for column in self.store.columns if column not in rows.columns}
+        previewed = self.store.preview(rows.assign(**stats))
+        if len(previewed):
+            known.append(previewed[keys + names])
+        known = pd.concat(known, ignore_index=True)
+        known[group] = known[group].astype(str)
+        return rows.merge(known.drop_duplicates(keys, keep='last'), on=keys, how='left')
+
+    def project(self, df=None, season=None, week=None):
+        # ID columns and prediction of the player-weeks of one season and/or week
+        df = df if df is not None else self.game_log()
+        if season is not None:
+            df = df[df['season'] == season]
+        if week is not None:
+            df = df[df['week'] == week]
+        projections = df[[column for column in ID_COLUMNS if column in df.columns]].copy()
+        projections[f'predicted_{TARGET}'] = self.predict(df)
+        return projections
+
+
+def train_and_save(position_configs=POSITION_CONFIGS, n_jobs=None, root=MODEL_ROOT):
+    # {position: version} of the newly saved models
+    results = run_positions(position_configs, n_jobs)
+    return {label: save_artifact(label, result, root) for label, result in results.items()}
+
+
+def json_records(projections):
+    records = projections.astype(object).where(projections.notna(), None)
+    return records.to_dict(orient='records')
+
+
+def load_predictors(root=MODEL_ROOT):
+    # {position: Predictor} of the latest saved models with their game logs built
+    predictors = {label: Predictor(label, root=root) for label in POSITION_CONFIGS if versions(label, root)}
+    for predictor in predictors.values():
+        predictor.game_log()
+    return predictors
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    # The predictors are replaced as a whole by /refresh, requests only read them
+    predictors = {}
+    root = MODEL_ROOT
+    refresh_lock = threading.Lock()
+
+    def predictor(self, slug):
+        label = position_label(slug)
+        predictors = PredictionHandler.predictors
+        if label not in predictors:
+            raise FileNotFoundError(f"No {label} model loaded, save one and POST /refresh")
+        return predictors[label]
+
+    def refresh(self):
+        # Only one refresh at a time writes the feature stores
+        with self.refresh_lock:
+            start = time.perf_counter()
+            PredictionHandler.predictors = load_predictors(self.root)
+        return self.send_json(200, {'models': {model_slug(label): predictor.schema['version']
+                                               for label, predictor in PredictionHandler.predictors.items()},
+                                    'milliseconds': round((time.perf_counter() - start) * 1000, 2)})
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self, payload=None):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if parts == ['models']:
+                return self.send_json(200, {model_slug(label): predictor.schema
+                                            for label, predictor in PredictionHandler.predictors.items()})
+            if parts == ['refresh'] and payload is not None:
+                return self.refresh()
+            if len(parts) != 2 or parts[0] != 'predict':
+                return self.send_json(404, {'error': f"Unknown path {url.path}"})
+            start = time.perf_counter()
+            predictor = self.predictor(parts[1])
+            if payload is None:
+                query = {key: int(values[-1]) for key, values in parse_qs(url.query).items() if key in ('season', 'week')}
+                projections = predictor.project(**query)
+            else:
+                records = payload['records'] if isinstance(payload, dict) else payload
+                projections = predictor.project(predictor.with_features(pd.DataFrame.from_records(records)))
+            return self.send_json(200, {'version': predictor.schema['version'],
+                                        'milliseconds': round((time.perf_counter() - start) * 1000, 2),
+                                        'predictions': json_records(projections)})
+        except (ValueError, KeyError) as error:
+            return self.send_json(400, {'error': str(error)})
+        except FileNotFoundError as error:
+            return self.send_json(404, {'error': str(error)})
+
+    def do_GET(self):
+        self.route()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b'[]')
+        except json.JSONDecodeError as error:
+            return self.send_json(400, {'error': f"Invalid JSON: {error}"})
+        self.route(payload)
+
+
+def serve(port=PORT, root=MODEL_ROOT):
+    # Loads every saved model and its game log once, then answers on localhost until interrupted
+    PredictionHandler.root = root
+    PredictionHandler.predictors = load_predictors(root)
+    server = ThreadingHTTPServer(('127.0.0.1', port), PredictionHandler)
+    print(f"✅ Serving {', '.join(PredictionHandler.predictors) or 'no models'} on http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Save, list and serve the position model artifacts.")
+    argument_parser.add_argument('--root', default=MODEL_ROOT, help="Artifact directory")
+    commands = argument_parser.add_subparsers(dest='command', required=True)
+    train_parser = commands.add_parser('train', help="Train the QB, RB and WR/TE models and save a new version")
+    train_parser.add_argument('--jobs', type=int)
+    train_parser.add_argument('--split-week', type=int)
+    train_parser.add_argument('--team-encoding', default='onehot', choices=['onehot', 'codes'])
+    commands.add_parser('list', help="Saved versions and their metrics")
+    predict_parser = commands.add_parser('predict', help="Project the player-weeks of the game log")
+    predict_parser.add_argument('position', help="qb, rb or wrte")
+    predict_parser.add_argument('--season', type=int)
+    predict_parser.add_argument('--week', type=int)
+    predict_parser.add_argument('--version', help="Saved version, the latest by default")
+    predict_parser.add_argument('--output', help="CSV of the projections, printed otherwise")
+    serve_parser = commands.add_parser('serve', help="HTTP prediction server on localhost")
+    serve_parser.add_argument('--port', type=int, default=PORT)
+    args = argument_parser.parse_args()
+
+    if args.command == 'train':
+        configs = {label: {**config, 'split_week': args.split_week, 'team_encoding': args.team_encoding}
+                   for label, config in POSITION_CONFIGS.items()}
+        for label, version in train_and_save(configs, args.jobs, args.root).items():
+            print(f"✅ Saved {label} model {version}")
+    elif args.command == 'list':
+        for label in POSITION_CONFIGS:
+            for version in versions(label, args.root):
+                with open(os.path.join(args.root, model_slug(label), version, 'schema.json'), encoding='utf-8') as f:
+                    schema = json.load(f)
+                print(label, version, schema['created'], schema['data_sha256'][:12],
+                      {key: schema['metrics'][key] for key in ('rmse', 'r2')})
+    elif args.command == 'predict':
+        start = time.perf_counter()
+        predictor = Predictor(position_label(args.position), args.version, args.root)
+        loaded = time.perf_counter()
+        projections = predictor.project(season=args.season, week=args.week)
+        if args.output:
+            projections.to_csv(args.output, index=False)
+        else:
+            print(projections.to_string(index=False))
+        print(f"✅ {len(projections)} projections with {predictor.label} {predictor.schema['version']}: "
+              f"loaded in {(loaded - start) * 1000:.0f}ms, predicted in {(time.perf_counter() - loaded) * 1000:.0f}ms")
+    else:
+        serve(args.port, args.root)
@@ -1,5 +1,4 @@
 import requests
-import json
 import os
 import time
 from bs4 import BeautifulSoup
@@ -9,10 +8,12 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException
 from webdriver_manager.chrome import ChromeDriverManager
+from nfl_jsonl_store import JsonlStore, migrate_json_array
 
 BASE_URL = "https://www.nfl.com"
 HEADERS = {"User-Agent": "Mozilla/5.0"}
-LINKS_PATH = "dat/nfl_news_links_2025_to_2018.json"
+LINKS_PATH = "dat/nfl_news_links_2025_to_2018.jsonl"
+LEGACY_LINKS_PATH = "dat/nfl_news_links_2025_to_2018.json"
 LOG_PATH = "dat/link_scraper_log.txt"
 CHECKPOINT_PATH = "dat/link_scraper_checkpoint.txt"
 
@@ -35,11 +36,13 @@ def log_message(message):
     with open(LOG_PATH, "a", encoding="utf-8") as f:
         f.write(message + "\n")
 
-def load_existing_links():
-    if os.path.exists(LINKS_PATH):
-        with open(LINKS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+def open_link_store():
+    # Links are appended to a JSONL store, a links file from before the switch is imported once
+    store = JsonlStore(LINKS_PATH)
+    migrated = migrate_json_array(LEGACY_LINKS_PATH, store)
+    if migrated:
+        print(f"📦 Imported {migrated} links from {LEGACY_LINKS_PATH}")
+    return store
 
 def load_checkpoint():
     if os.path.exists(CHECKPOINT_PATH):
@@ -51,18 +54,11 @@ def save_checkpoint(last_url):
     with open(CHECKPOINT_PATH, "w", encoding="utf-8") as f:
         f.write(last_url)
 
-def flush_batch():
+def flush_batch(store):
     global link_batch
     if not link_batch:
         return
-    if os.path.exists(LINKS_PATH):
-        with open(LINKS_PATH, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    else:
-        existing = []
-    existing.extend(link_batch)
-    with open(LINKS_PATH, "w", encoding="utf-8") as f:
-        json.dump(existing, f, indent=2, ensure_ascii=False)
+    store.append(link_batch)
     print(f"💾 Flushed {len(link_batch)} links to file.")
     log_message(f"💾 Flushed {len(link_batch)} links to file.")
     link_batch = []
@@ -74,10 +70,8 @@ def collect_article_links(start_year=2025, end_year=2018):
     print("📄 Scrolling and collecting links...")
     log_message(f"\n=== Scraping started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
 
-    seen = set()
-    existing = load_existing_links()
-    for item in existing:
-        seen.add(item["url"])
+    store = open_link_store()
+    seen = set(store.keys)
 
     last_checkpoint = load_checkpoint()
     checkpoint_found = last_checkpoint is None
@@ -122,7 +116,7 @@ def collect_article_links(start_year=2025, end_year=2018):
             save_checkpoint(href)
 
             if len(link_batch) >= BATCH_SIZE:
-                flush_batch()
+                flush_batch(store)
 
         if not done:
             try:
@@ -140,7 +134,7 @@ def collect_article_links(start_year=2025, end_year=2018):
                 break
 
     driver.quit()
-    flush_batch()
+    flush_batch(store)
     print(f"✅ Finished run. Total seen: {len(seen)}")
     log_message(f"✅ Finished run. Total seen: {len(seen)}")
 
@@ -0,0 +1,176 @@
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from nfl_feature_store import FEATURE_ROOT, FeatureStore
+from nfl_features import EPA_FEATURES
+from nfl_encoders import TeamEncoder
+from nfl_game_logs import file_sha256, load_game_log
+
+# One declarative training pipeline for the position models of "QB RB WRTE Models.ipynb".
+# A position is a config entry: its CSV, the columns it drops, the rolling features it fills with 0
+# (neutral performance) and how it is split. Every position is encoded with the same code path into
+# one float32 matrix: numeric columns are written straight into a preallocated array, the team is
+# encoded by a TeamEncoder over a vocabulary shared by all positions (one-hot columns, or a single
+# integer code column with team_encoding 'codes'), birth_year is taken from birth_date. The positions
+# are trained concurrently in a process pool and each run returns the fitted models together with
+# their metrics.
+
+TARGET = 'avg_epa'
+TEAM_COLUMN = 'team'
+EPA_FEATURE_NAMES = [name for name, _, _, _ in EPA_FEATURES]
+COMMON_DROP = ['avg_epa', 'gsis_id', 'position', 'depth_chart_position', 'full_name', 'week', 'total_epa',
+               'draft_number', 'third_down_rate', 'fourth_down_rate']
+
+# split_week None is the notebook's random 80/20 split, a week number trains on weeks <= split_week
+# of every season and tests on the rest. seasons None uses every season of the CSV.
+POSITION_CONFIGS = {
+    'QB': {'csv': "qb_stats.csv", 'drop_columns': COMMON_DROP + ['entry_year'], 'fill_zero': EPA_FEATURE_NAMES},
+    'RB': {'csv': "rb_stats.csv", 'drop_columns': COMMON_DROP + ['entry_year'], 'fill_zero': []},
+    'WR/TE': {'csv': "wrte_stats.csv", 'drop_columns': COMMON_DROP, 'fill_zero': []},
+}
+DEFAULT_CONFIG = {
+    'rolling_features': EPA_FEATURES,
+    'fill_zero': [],
+    'seasons': None,
+    'split_week': None,
+    'test_size': 0.2,
+    'team_encoding': 'onehot',
+    'random_state': 42,
+    'model_params': {'n_estimators': 100, 'random_state': 42},
+}
+
+
+def position_config(label, config):
+    return {**DEFAULT_CONFIG, 'feature_store': os.path.join(FEATURE_ROOT, label.lower().replace('/', '')), **config}
+
+
+def load_position(label, config):
+    # Typed game log with the configured rolling features. The features are computed over every season
+    # of the CSV (the store holds the full history), only the configured seasons are read back
+    config = position_config(label, config)
+    df = load_game_log(config['csv'])
+    if config['rolling_features']:
+        return FeatureStore(config['feature_store'], config['rolling_features']).update(df, config['seasons'])
+    if config['seasons'] is not None:
+        df = df[df['season'].isin(config['seasons'])].reset_index(drop=True)
+    return df
+
+
+def team_vocabulary(position_configs=POSITION_CONFIGS):
+    # Sorted teams of every position, so all models share the same team encoding
+    teams = pd.concat([load_game_log(config['csv'])[TEAM_COLUMN] for config in position_configs.values()])
+    return TeamEncoder(prefix=TEAM_COLUMN).fit(teams).vocabulary
+
+
+def feature_matrix(df, drop_columns, fill_zero, vocabulary, team_encoding='onehot', numeric=None):
+    # (X float32, column names), columns in the notebook's order: numeric columns, team, birth_year.
+    # Teams outside the vocabulary get an all-zero one-hot row or code -1. numeric fixes the numeric
+    # columns (a saved model's schema), otherwise every column of df that is not dropped is used
+    if team_encoding not in ('onehot', 'codes'):
+        raise ValueError(f"team_encoding must be 'onehot' or 'codes' for the dense matrix, not {team_encoding!r}")
+    encoder = TeamEncoder(vocabulary, prefix=TEAM_COLUMN)
+    drop = set(drop_columns) | {TEAM_COLUMN, 'birth_date'}
+    if numeric is None:
+        numeric = [column for column in df.columns if column not in drop]
+    missing = [column for column in numeric if column not in df.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} are missing from the data")
+    text = [column for column in numeric if not (pd.api.types.is_numeric_dtype(df[column])
+                                                 or pd.api.types.is_bool_dtype(df[column]))]
+    if text:
+        raise ValueError(f"Columns {text} are neither numeric nor dropped, add them to drop_columns")
+    columns = numeric + encoder.feature_names(team_encoding) + ['birth_year']
+    X = np.zeros((len(df), len(columns)), dtype=np.float32)
+    for position, column in enumerate(numeric):
+        X[:, position] = df[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        if column in fill_zero:
+            X[np.isnan(X[:, position]), position] = 0
+    codes = encoder.codes(df[TEAM_COLUMN])
+    if team_encoding == 'codes':
+        X[:, len(numeric)] = codes
+    else:
+        known = np.flatnonzero(codes >= 0)
+        X[known, len(numeric) + codes[known]] = 1
+    X[:, -1] = pd.to_datetime(df['birth_date']).dt.year.to_numpy(dtype=np.float32, na_value=np.nan)
+    return X, columns
+
+
+def split_rows(df, X, config):
+    # Training and test row positions. Rows with missing values are left out before the split and rows
+    # with infinite values (comp_pct without pass attempts) after it, like the notebook did
+    complete = np.flatnonzero(~np.isnan(X).any(axis=1))
+    if config['split_week'] is not None:
+        in_training = df['week'].to_numpy()[complete] <= config['split_week']
+        train, test = complete[in_training], complete[~in_training]
+    else:
+        train, test = train_test_split(complete, test_size=config['test_size'], random_state=config['random_state'])
+    finite = np.isfinite(X).all(axis=1)
+    return train[finite[train]], test[finite[test]]
+
+
+def train_position(label, config, vocabulary):
+    # Runs in a worker: features, split, fit and metrics of one position
+    start = time.perf_counter()
+    config = position_config(label, config)
+    df = load_position(label, config)
+    X, columns = feature_matrix(df, config['drop_columns'], config['fill_zero'], vocabulary, config['team_encoding'])
+    y = df[TARGET].to_numpy(dtype=np.float64)
+    train, test = split_rows(df, X, config)
+    model = RandomForestRegressor(**config['model_params']).fit(X[train], y[train])
+    predictions = model.predict(X[test])
+    index = df.index
+    return {
+        'model': model,
+        'columns': columns,
+        'config': config,
+        'vocabulary': vocabulary,
+        'data_sha256': file_sha256(config['csv']),
+        'metrics': {
+            'rmse': float(np.sqrt(mean_squared_error(y[test], predictions))),
+            'r2': r2_score(y[test], predictions),
+            'train_rows': len(train),
+            'test_rows': len(test),
+            'seconds': round(time.perf_counter() - start, 2),
+        },
+        'feature_importance': pd.Series(model.feature_importances_, index=columns).sort_values(ascending=False),
+        'split': (pd.DataFrame(X[train], index=index[train], columns=columns),
+                  pd.DataFrame(X[test], index=index[test], columns=columns),
+                  pd.Series(y[train], index=index[train], name=TARGET),
+                  pd.Series(y[test], index=index[test], name=TARGET)),
+    }
+
+
+def run_positions(position_configs=POSITION_CONFIGS, n_jobs=None):
+    # {position: result of train_position}, the positions trained in parallel
+    vocabulary = team_vocabulary(position_configs)
+    labels = list(position_configs)
+    results = joblib.Parallel(n_jobs=min(n_jobs or os.cpu_count(), len(labels)), backend='loky')(
+        joblib.delayed(train_position)(label, position_configs[label], vocabulary) for label in labels)
+    return dict(zip(labels, results))
+
+
+def metrics_frame(results):
+    return pd.DataFrame({label: result['metrics'] for label, result in results.items()}).T
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Train the QB, RB and WR/TE EPA models in one run.")
+    argument_parser.add_argument('--jobs', type=int, help="Positions trained at the same time, all cores by default")
+    argument_parser.add_argument('--split-week', type=int, help="Time split instead of the random 80/20 split")
+    argument_parser.add_argument('--team-encoding', default='onehot', choices=['onehot', 'codes'])
+    args = argument_parser.parse_args()
+
+    configs = {label: {**config, 'split_week': args.split_week, 'team_encoding': args.team_encoding}
+               for label, config in POSITION_CONFIGS.items()}
+    start = time.perf_counter()
+    results = run_positions(configs, args.jobs)
+    print(metrics_frame(results).to_string())
+    print(f"✅ Trained {len(results)} position models in {time.perf_counter() - start:.1f}s")
@@ -1,5 +1,3 @@
-import requests
-import json
 import os
 import time
 from bs4 import BeautifulSoup
@@ -9,6 +7,10 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException
 from webdriver_manager.chrome import ChromeDriverManager
+from nfl_article_downloader import parse_article_text
+from nfl_fetcher import PageFetcher
+from nfl_http_cache import ResponseCache
+from nfl_jsonl_store import JsonlStore, migrate_json_array
 
 START_YEAR = 2025
 END_YEAR = 2018
@@ -24,6 +26,12 @@ MAX_RETRIES = 3
 RETRY_DELAY = 2
 BATCH_SIZE = 100
 
+# Article pages are served from the shared on-disk cache when they were downloaded before
+fetcher = PageFetcher(max_workers=1, requests_per_second=2, headers=HEADERS, cache=ResponseCache())
+
+# One append-only store per year, opened once so its URL index is loaded a single time
+article_stores = {}
+
 
 def setup_driver():
     options = webdriver.ChromeOptions()
@@ -39,16 +47,10 @@ def parse_date(text):
 def scrape_article_text(url):
     for attempt in range(MAX_RETRIES):
         try:
-            res = requests.get(url, headers=HEADERS)
+            res = fetcher.get(url)
             if res.status_code != 200:
                 raise Exception(f"HTTP {res.status_code}")
-            soup = BeautifulSoup(res.text, "html.parser")
-            sections = soup.find_all("div", class_="d3-l-col__col-8")
-            paragraphs = []
-            for section in sections:
-                ps = section.find_all("p")
-                paragraphs.extend([p.text.strip() for p in ps if p.text.strip()])
-            return "\n\n".join(paragraphs)
+            return parse_article_text(res.text)
         except Exception as e:
             msg = f"⏳ Retry {attempt+1}/{MAX_RETRIES} for {url} due to error: {e}"
             print(msg)
@@ -67,23 +69,18 @@ def log_error(message):
     with open(ERROR_LOG_PATH, "a", encoding="utf-8") as f:
         f.write(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}\n")
 
+def article_store(year):
+    if year not in article_stores:
+        store = JsonlStore(f"dat/nfl_news_{year}.jsonl")
+        migrate_json_array(f"dat/nfl_news_{year}.json", store)
+        article_stores[year] = store
+    return article_stores[year]
+
 def save_articles_batch(year, articles):
-    filename = f"dat/nfl_news_{year}.json"
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-        existing_urls = {item["url"] for item in existing}
-    else:
-        existing = []
-        existing_urls = set()
-
-    new_articles = [a for a in articles if a["url"] not in existing_urls]
-    if new_articles:
-        existing.extend(new_articles)
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(existing, f, indent=2, ensure_ascii=False)
-        for a in new_articles:
-            log_message(f"✅ Article saved: {a['url']}")
+    # Appends only the new articles, the cost does not grow with the size of the year's file
+    new_articles = article_store(year).append(articles)
+    for a in new_articles:
+        log_message(f"✅ Article saved: {a['url']}")
 
 
 def fetch_articles_by_year_range(start_year=2025, end_year=2018):
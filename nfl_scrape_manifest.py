@@ -0,0 +1,94 @@
+import datetime
+import hashlib
+import json
+import os
+
+
+def write_json_atomic(path, data):
+    # Writes to a temporary file first so a crash never leaves a half written manifest behind
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+class ScrapeManifest:
+    # Records which scrape units of one (season, level[, week]) output directory are finished.
+    # Every (unit, category) gets its own small JSON file under <directory>/.manifest listing the
+    # pages already written, with the content hash of the page, its row count and the size of the
+    # CSV file after the page was appended. An interrupted category resumes after its last page
+    # once that page still hashes the same (otherwise its "Next Page" cursor may point into a changed
+    # listing and the category starts over), a finished season/level is skipped without a single request.
+    def __init__(self, directory, season, level, week=None):
+        self.directory = directory
+        self.manifest_directory = os.path.join(directory, '.manifest')
+        self.season = int(season)
+        self.level = level
+        self.week = week
+        os.makedirs(self.manifest_directory, exist_ok=True)
+
+    def category_path(self, unit, category):
+        return os.path.join(self.manifest_directory, f'{unit}--{category}.json')
+
+    def level_path(self):
+        return os.path.join(self.manifest_directory, '_level.json')
+
+    def read(self, path, default):
+        if not os.path.exists(path):
+            return default
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, unit, category):
+        # Returns the recorded state of a category, a fresh one if nothing was scraped yet
+        return self.read(self.category_path(unit, category), {
+            'season': self.season,
+            'level': self.level,
+            'week': self.week,
+            'unit': unit,
+            'category': category,
+            'complete': False,
+            'pages': [],
+        })
+
+    def reset(self, state):
+        state['complete'] = False
+        state['pages'] = []
+        write_json_atomic(self.category_path(state['unit'], state['category']), state)
+
+    def record_page(self, state, url, content, rows, csv_bytes, next_url):
+        # Called after a page was appended to the output, makes it count as done
+        state['pages'].append({
+            'page': len(state['pages']),
+            'url': url,
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'rows': rows,
+            'csv_bytes': csv_bytes,
+            'next_url': next_url,
+            'scraped_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        })
+        write_json_atomic(self.category_path(state['unit'], state['category']), state)
+
+    def page_unchanged(self, page, content):
+        # True when a recorded page still has the content it had when it was written
+        return page.get('sha256') == hashlib.sha256(content).hexdigest()
+
+    def mark_complete(self, state):
+        state['complete'] = True
+        write_json_atomic(self.category_path(state['unit'], state['category']), state)
+
+    def level_complete(self):
+        return self.read(self.level_path(), {}).get('complete', False)
+
+    def record_level(self, unit_links, complete):
+        # Remembers the categories of this season/level and whether all of them are finished
+        write_json_atomic(self.level_path(), {
+            'season': self.season,
+            'level': self.level,
+            'week': self.week,
+            'categories': {unit: sorted(categories) for unit, categories in unit_links.items()},
+            'complete': complete,
+        })
+
+    def category_complete(self, unit, category):
+        return self.load(unit, category)['complete']
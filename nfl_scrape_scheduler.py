@@ -0,0 +1,203 @@
+import argparse
+import heapq
+import multiprocessing
+import os
+import random
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from nfl_fetcher import PageFetcher
+from nfl_http_cache import ResponseCache
+from nfl_scraper_functions import NFLDataScraper
+from nfl_table_parsers import DEFAULT_PARSER
+
+# Work-queue scheduler for historic backfills.
+# Every (season, level, unit, category) becomes an independent job. Jobs run in a process pool,
+# all workers draw from one rate limiter so the request budget holds for the whole pool, failed
+# jobs are retried with exponential backoff and finished ones are recorded in the scrape manifest.
+
+SEASON_IN_LINK = re.compile(r'/((?:19|20)\d{2})/(?:pre|reg|post)(?:/|$)')
+
+ScrapeJob = namedtuple('ScrapeJob', ['season', 'level', 'unit', 'category', 'link', 'directory', 'week'])
+
+
+class SharedRateLimiter:
+    # Process-safe version of nfl_fetcher.RateLimiter, the next free slot lives in shared memory.
+    # time.monotonic is system wide, so slots handed out by different processes are comparable.
+    def __init__(self, requests_per_second):
+        self.requests_per_second = requests_per_second
+        self.next_slot = multiprocessing.Value('d', 0.0, lock=False)
+        self.lock = multiprocessing.Lock()
+
+    def wait(self):
+        if not self.requests_per_second:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.value)
+            self.next_slot.value = slot + 1.0 / self.requests_per_second
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def season_link(link, season):
+    # Points a stats link discovered for one season at another season
+    match = SEASON_IN_LINK.search(link)
+    if match is None:
+        return link
+    return link[:match.start(1)] + str(season) + link[match.end(1):]
+
+
+# Each worker process builds its own scraper once, sharing only the rate limiter
+worker_scraper = None
+
+
+def init_worker(rate_limiter, fetch_threads, use_cache, parser, base_url, output_format):
+    global worker_scraper
+    cache = ResponseCache() if use_cache else None
+    fetcher = PageFetcher(max_workers=fetch_threads, cache=cache, rate_limiter=rate_limiter)
+    worker_scraper = NFLDataScraper(fetcher=fetcher, base_url=base_url, parser=parser, output_format=output_format)
+    worker_scraper.set_current_season_and_week()
+
+
+def run_job(job):
+    # Scrapes one category of one season, raises when it could not be completed
+    manifest = worker_scraper.open_manifest(job.season, job.level)
+    unit_directory_path = os.path.join(job.directory, job.unit) if job.level == "team" else job.directory
+    unit_links = {job.unit: {job.category: job.link}}
+    worker_scraper.season = job.season
+    if not worker_scraper.scrape_and_process_data(job.unit, job.category, job.level, unit_directory_path, unit_links, manifest):
+        raise RuntimeError(f"{job.season} {job.level} {job.unit}/{job.category} did not complete")
+    return job
+
+
+class BackfillScheduler:
+    def __init__(self, processes=None, requests_per_second=5, fetch_threads=2, max_retries=4,
+                 backoff_seconds=5, use_cache=True, parser=DEFAULT_PARSER, base_url="https://www.nfl.com",
+                 output_format="csv"):
+        self.processes = processes or os.cpu_count()
+        self.requests_per_second = requests_per_second
+        self.fetch_threads = fetch_threads
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.use_cache = use_cache
+        self.parser = parser
+        self.base_url = base_url
+        self.output_format = output_format
+        # The parent scraper only discovers the category links and output directories
+        self.scraper = NFLDataScraper(fetcher=PageFetcher(cache=ResponseCache() if use_cache else None), base_url=base_url,
+                                      output_format=output_format)
+        self.scraper.set_current_season_and_week()
+
+    def build_jobs(self, seasons, levels):
+        # Discovers the categories once per level and expands them over all seasons,
+        # leaving out seasons and categories the manifests already record as complete
+        jobs = []
+        for level in levels:
+            unit_links = None
+            for season in seasons:
+                directory, week = self.scraper.output_directory(season, level)
+                manifest = self.scraper.open_manifest(season, level)
+                if manifest.level_complete():
+                    continue
+                if unit_links is None:
+                    self.scraper.season = season
+                    unit_links = self.scraper.format_links(level)
+                season_jobs = [ScrapeJob(season, level, unit, category, season_link(link, season), directory, week)
+                               for unit, categories in unit_links.items()
+                               for category, link in categories.items()
+                               if not manifest.category_complete(unit, category)]
+                manifest.record_level(unit_links, not season_jobs)
+                jobs += season_jobs
+        return jobs
+
+    def backoff(self, attempt):
+        # Exponential backoff with jitter so retries of many jobs do not fire at once
+        return self.backoff_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+    def run(self, seasons, levels=("player", "team")):
+        jobs = self.build_jobs(seasons, levels)
+        total = len(jobs)
+        print(f"|---| {total} jobs over {len(seasons)} seasons, {self.processes} processes, "
+              f"{self.requests_per_second} requests/sec |---|")
+        if not jobs:
+            return {}
+
+        rate_limiter = SharedRateLimiter(self.requests_per_second)
+        retry_queue = []  # heap of (ready time, order, job, attempt)
+        failed = []
+        done = 0
+        start = time.monotonic()
+        order = 0
+
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=init_worker,
+                                 initargs=(rate_limiter, self.fetch_threads, self.use_cache, self.parser, self.base_url,
+                                           self.output_format)) as executor:
+            running = {executor.submit(run_job, job): (job, 1) for job in jobs}
+            while running or retry_queue:
+                # Move retries whose backoff has expired back into the pool
+                now = time.monotonic()
+                while retry_queue and retry_queue[0][0] <= now:
+                    _, _, job, attempt = heapq.heappop(retry_queue)
+                    running[executor.submit(run_job, job)] = (job, attempt)
+
+                timeout = max(0.0, retry_queue[0][0] - now) if retry_queue else None
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                finished, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job, attempt = running.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        done += 1
+                        elapsed = time.monotonic() - start
+                        print(f"[{done}/{total}] {job.season} {job.level} {job.unit}/{job.category} done "
+                              f"({elapsed:.0f}s elapsed, {done / elapsed * 60:.1f} jobs/min)")
+                    elif attempt < self.max_retries:
+                        delay = self.backoff(attempt)
+                        print(f"Retry {attempt}/{self.max_retries - 1} of {job.season} {job.level} "
+                              f"{job.unit}/{job.category} in {delay:.1f}s: {error}")
+                        order += 1
+                        heapq.heappush(retry_queue, (time.monotonic() + delay, order, job, attempt + 1))
+                    else:
+                        print(f"Error: giving up on {job.season} {job.level} {job.unit}/{job.category}: {error}")
+                        failed.append(job)
+
+        self.record_levels(jobs, failed)
+        print(f"|---| Finished {done}/{total} jobs in {time.monotonic() - start:.0f}s, {len(failed)} failed |---|")
+        return {'done': done, 'failed': failed}
+
+    def record_levels(self, jobs, failed):
+        # Marks every season/level whose jobs all finished as complete in its manifest
+        failed_keys = {(job.season, job.level) for job in failed}
+        seen = set()
+        for job in jobs:
+            key = (job.season, job.level)
+            if key in seen:
+                continue
+            seen.add(key)
+            manifest = self.scraper.open_manifest(job.season, job.level)
+            state = manifest.read(manifest.level_path(), {})
+            unit_links = state.get('categories', {})
+            manifest.record_level(unit_links, key not in failed_keys)
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="Backfill NFL.com stats for many seasons in parallel.")
+    argument_parser.add_argument('--start', type=int, default=1970)
+    argument_parser.add_argument('--end', type=int, help="Last season, defaults to the one before the current season")
+    argument_parser.add_argument('--levels', nargs='+', default=["player", "team"], choices=["player", "team"])
+    argument_parser.add_argument('--processes', type=int, default=os.cpu_count())
+    argument_parser.add_argument('--requests-per-second', type=float, default=5)
+    argument_parser.add_argument('--max-retries', type=int, default=4)
+    argument_parser.add_argument('--output-format', default="csv", choices=["csv", "parquet"])
+    args = argument_parser.parse_args()
+
+    scheduler = BackfillScheduler(processes=args.processes, requests_per_second=args.requests_per_second,
+                                  max_retries=args.max_retries, output_format=args.output_format)
+    end = args.end if args.end is not None else scheduler.scraper.current_season - 1
+    scheduler.run(list(range(args.start, end + 1)), args.levels)
@@ -1,24 +1,25 @@
 from nfl_scraper_functions import NFLDataScraper
+from nfl_fetcher import PageFetcher
+from nfl_http_cache import ResponseCache
 
-# Create an instance of the NFLDataScraper class
-scraper = NFLDataScraper()
-
-# Set the season before calling get_stats
-scraper.season = 2023
+# Create an instance of the NFLDataScraper class.
+# Pages are fetched by 8 workers sharing one connection pool, capped at 5 requests per second.
+# Responses are kept in dat/http_cache: historic seasons are never downloaded twice.
+scraper = NFLDataScraper(fetcher=PageFetcher(max_workers=8, requests_per_second=5, cache=ResponseCache()))
 
 # Check current season and week
 scraper.set_current_season_and_week()
 
-# Call the get_stats method with the season argument
-scraper.get_stats(level = "player")
-scraper.get_stats(level = "team")
-
-# Scrape current season data for both player and team levels
+# Scrape current season data for both player and team levels.
+# Only the current week{N} is fetched, earlier weeks are complete in their manifests.
 for level in ["player", "team"]:
-    scraper.get_stats(level, season="2023")
+    scraper.season = scraper.current_season
+    scraper.get_stats(level)
 
-# Get historic data for previous seasons
-historic_seasons = [str(year) for year in range(1970, scraper.current_season - 1)]
+# Get historic data for previous seasons.
+# Seasons recorded as complete are skipped, an interrupted one resumes after its last page.
+historic_seasons = range(1970, scraper.current_season)
 for season in historic_seasons:
     for level in ["player", "team"]:
-        scraper.get_stats(level, season)
\ No newline at end of file
+        scraper.season = season
+        scraper.get_stats(level)
\ No newline at end of file
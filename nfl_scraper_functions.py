@@ -1,8 +1,11 @@
-import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from nfl_fetcher import PageFetcher
+from nfl_scrape_manifest import ScrapeManifest
+from nfl_stats_store import PARQUET_ROOT, clear_partition, partition_directory, write_page
+from nfl_table_parsers import DEFAULT_PARSER, find_next_page, parse_stats_page
 
 class ValidSeasonError(Exception):
     def __init__(self, season):
@@ -12,8 +15,21 @@ class ValidSeasonError(Exception):
         return 'The ' + str(self.season) + ' Season is not within the database ranging from 1970 to the current season. '
 
 class NFLDataScraper:
-    def __init__(self):
-        self.base_url = "https://www.nfl.com"
+    def __init__(self, fetcher=None, base_url="https://www.nfl.com", category_workers=4, parser=DEFAULT_PARSER,
+                 output_format="csv", parquet_root=PARQUET_ROOT):
+        self.base_url = base_url
+        # All HTTP traffic goes through one pooled, rate limited fetcher
+        self.fetcher = fetcher if fetcher is not None else PageFetcher()
+        # Number of stat categories scraped at the same time
+        self.category_workers = category_workers
+        # Backend used to extract the stats tables, see nfl_table_parsers.PARSERS
+        self.parser = parser
+        # "csv" writes one CSV per category, "parquet" writes typed parts partitioned by
+        # season/level/unit/category under parquet_root (see nfl_stats_store)
+        if output_format not in ("csv", "parquet"):
+            raise ValueError(f"Unknown output format '{output_format}', use 'csv' or 'parquet'.")
+        self.output_format = output_format
+        self.parquet_root = parquet_root
         self.current_season = None
         self.current_week = None
         self.current_date = datetime.date.today()
@@ -39,14 +55,14 @@ class NFLDataScraper:
     def get_links(self, level):
         if level == "player":
             # Request the raw HTML for player statistics page
-            html = requests.get("https://www.nfl.com/stats/player-stats/")
+            html = self.fetcher.get(self.base_url + "/stats/player-stats/")
             # Parse the HTML content using BeautifulSoup
             soup = BeautifulSoup(html.content, 'html.parser')
             # Find all list items with class 'd3-o-tabs__list-item'
             li_elements = soup.find_all('li', class_='d3-o-tabs__list-item')
         elif level == "team":
             # Request the raw HTML for team statistics page
-            html = requests.get("https://www.nfl.com/stats/team-stats/")
+            html = self.fetcher.get(self.base_url + "/stats/team-stats/")
             # Parse the HTML content using BeautifulSoup
             soup = BeautifulSoup(html.content, 'html.parser')
             # Find the unordered list element with class 'd3-o-tabbed-controls-selector__list'
@@ -67,10 +83,9 @@ class NFLDataScraper:
         # List to store the links
         links = []
 
-        # Loop through href_values and fetch links for each URL
-        for href in href_values:
-            url = self.base_url + href
-            html = requests.get(url)
+        # Fetch the page behind every href concurrently and collect the links on each
+        urls = [self.base_url + href for href in href_values]
+        for url, html in self.fetcher.fetch_many(urls):
             soup = BeautifulSoup(html.content, "html.parser")
             # Find all list items with class 'd3-o-tabs__list-item'
             a_elements = soup.find_all('li', class_='d3-o-tabs__list-item')
@@ -82,60 +97,6 @@ class NFLDataScraper:
 
         return links
 
-    def get_sub_pages(self, unit_links):
-        # Create a dictionary to store the category names and their corresponding page links
-        sub_pages = {}
-        base_url = "https://www.nfl.com"  # Assuming you have a base URL
-
-        for unit, category_links in unit_links.items():
-            sub_pages[unit] = {}
-
-            for category, link in category_links.items():
-                page_count = 0  # Initialize page count
-                current_link = link  # Use the provided link as the starting point
-                current_stat = category  # Set the current_stat to the category name
-
-                # Initialize the category's dictionary
-                sub_pages[unit][current_stat] = {page_count: current_link}
-
-                # Create an infinite loop to scrape data from multiple pages
-                while True:
-                    # Request raw HTML for the current page
-                    response = requests.get(current_link)
-
-                    # Check if the request was successful
-                    if response.status_code == 200:
-                        # Create a BeautifulSoup object to parse the HTML
-                        soup = BeautifulSoup(response.content, "html.parser")
-
-                        # Find the "Next Page" link
-                        next_page_link = soup.find('a', class_='nfl-o-table-pagination__next')
-
-                        if next_page_link:
-                            # Extract the 'href' attribute
-                            href = next_page_link['href']
-
-                            # Update current_link with the next page's URL
-                            current_link = base_url + href
-                            page_count += 1  # Increment page count
-
-                            # Add the link to the category's dictionary
-                            sub_pages[unit][current_stat][page_count] = current_link
-                        else:
-                            print(f"No more pages to scrape for {unit} - {current_stat}.")
-                            break  # Exit the loop when there are no more pages
-                    else:
-                        print(f"Error: Unable to fetch data from {current_link} for {unit} - {current_stat}.")
-                        break  # Exit the loop on request error
-
-        # Display the collected category pages and their links
-        for unit, categories in sub_pages.items():
-            for category, pages in categories.items():
-                print(f"{unit} - {category} Sub-Pages:")
-                for page_num, page_link in pages.items():
-                    print(f"Page {page_num}: {page_link}")
-        return sub_pages
-
     def format_links(self, level):
         # Create a dictionary to store the links for each unit and its categories
         unit_links = {}
@@ -187,9 +148,9 @@ class NFLDataScraper:
             else:
                 stat_cols[outer_key] = inner_keys
 
-        # Update unit_links with the fetched links
+        # Update unit_links with the fetched links. Only the first page of every category
+        # is known here, the remaining pages are discovered while they are scraped.
         unit_links = team_stats_dict
-        unit_links = self.get_sub_pages(unit_links)
         return unit_links
 
     def create_directory_if_not_exists(self, directory_path):
@@ -197,7 +158,7 @@ class NFLDataScraper:
 
         if not os.path.exists(directory_path):
             try:
-                os.makedirs(directory_path)
+                os.makedirs(directory_path, exist_ok=True)
                 print(f'Directory "{directory_path}" has been created.')
             except OSError as e:
                 print(f'Error: Failed to create directory "{directory_path}".')
@@ -205,81 +166,132 @@ class NFLDataScraper:
         else:
             print(f'Directory "{directory_path}" already exists.')
 
-    def scrape_and_process_data(self, unit, category, level, unit_directory_path, unit_links):
+    def resume_category(self, manifest, state, csv_file_path):
+        # Restores the CSV file to the last page recorded in the manifest.
+        # Returns (url of the next page or None when the category is done, rows already written).
+        last_page = state['pages'][-1]
+        csv_bytes = last_page['csv_bytes'] if self.output_format == "csv" else 0
+        if csv_bytes and (not os.path.exists(csv_file_path) or os.path.getsize(csv_file_path) < csv_bytes):
+            # The output does not match the manifest any more, scrape the category again
+            print(f"Output {csv_file_path} is missing or shorter than recorded, restarting the category.")
+            manifest.reset(state)
+            return None, 0
+        # The recorded next_url is a cursor into the listing as it was then, only follow it
+        # while the last written page is unchanged
+        response = self.fetcher.get(last_page['url'])
+        if response.status_code != 200 or not manifest.page_unchanged(last_page, response.content):
+            print(f"Page {last_page['page']} of {state['unit']}/{state['category']} changed since it was scraped, "
+                  f"restarting the category.")
+            manifest.reset(state)
+            return None, 0
+        if csv_bytes:
+            # Drop rows of a page that was written but not recorded before the interruption
+            with open(csv_file_path, 'r+b') as f:
+                f.truncate(csv_bytes)
+        return last_page['next_url'], sum(page['rows'] for page in state['pages'])
+
+    def scrape_and_process_data(self, unit, category, level, unit_directory_path, unit_links, manifest=None):
         # Scrapes data for a specific category, processes it, and stores it in the appropriate directory.
-
-        # Create a list to store DataFrames for the current category
-        category_dfs = []
-
-        # Loop through the sub-pages for the current category
-        for page_num, page_url in unit_links[unit][category].items():
-            # Request raw HTML for the current page
-            response = requests.get(page_url)
+        # Every page is downloaded once: it is parsed for its "Next Page" link first, so the next
+        # download is already in flight while the rows of the current page are parsed and written.
+        # With a manifest, finished categories are skipped and interrupted ones resume after their
+        # last recorded page. Returns True when the category is complete.
+
+        # Specify the file path within the unit's directory
+        csv_file_path = os.path.join(unit_directory_path, category + '.csv')
+        parquet_directory = partition_directory(self.parquet_root, self.season, level, unit, category)
+        output_path = csv_file_path if self.output_format == "csv" else parquet_directory
+
+        page_url = unit_links[unit][category]
+        rows_written = 0
+        page_number = 0
+
+        state = manifest.load(unit, category) if manifest is not None else None
+        if state is not None and state['complete']:
+            print(f"Skipping category '{category}' in unit '{unit}', already complete.")
+            return True
+        if state is not None and state['pages']:
+            next_url, rows_written = self.resume_category(manifest, state, csv_file_path)
+            # The state has no pages left when the output was damaged and the category restarts
+            if state['pages']:
+                if next_url is None:
+                    manifest.mark_complete(state)
+                    return True
+                page_url = next_url
+                page_number = len(state['pages'])
+                print(f"Resuming category '{category}' in unit '{unit}' at page {page_number}.")
+
+        if self.output_format == "parquet" and page_number == 0:
+            # A fresh scrape replaces whatever snapshot the partition held before
+            clear_partition(parquet_directory)
+
+        pending = self.fetcher.submit(page_url)
+        complete = True
+
+        while pending is not None:
+            response = pending.result()
+            pending = None
 
             # Check if the request was successful
-            if response.status_code == 200:
-                # Create a BeautifulSoup object to parse the HTML
-                soup = BeautifulSoup(response.content, "html.parser")
-
-                # Find all elements with the class 'd3-o-player-stats--detailed'
-                stats = soup.find_all(attrs={"class": f'd3-o-{level}-stats--detailed'})
-
-                # Initialize lists to collect data
-                stat_val = []
-                stat_col = []
-
-                # Loop through each <tr> element to extract and collect the text from <td> elements
-                for row in stats:
-                    # This gets the stat names
-                    header_cells = row.find_all('th')
-
-                    if len(header_cells) > 0:
-                        for cell in header_cells:
-                            stat_col.append(cell.get_text(strip=True))
-
-                    # This gets the stats
-                    data_cells = row.find_all('td')
-
-                    if len(data_cells) > 0:
-                        for cell in data_cells:
-                            stat_val.append(cell.get_text(strip=True))
-
-                # Determine the number of columns in each row
-                num_columns = len(stat_col) if stat_col else 1  # Use 1 if stat_col is empty
-
-                # Split the list into rows
-                rows = [stat_val[i:i + num_columns] for i in range(0, len(stat_val), num_columns)]
-
-                # Create a DataFrame for the current category and page
-                df = pd.DataFrame(rows, columns=stat_col)
-
-                # Append the DataFrame to the list for the current category
-                category_dfs.append(df)
-            else:
+            if response.status_code != 200:
                 print(f"Error: Unable to fetch data from {page_url} for {category}.")
-
-        # Concatenate dataframes for the current category into one
-        if category_dfs:
-            merged_df = pd.concat(category_dfs, ignore_index=True)
-
-            # Check if the DataFrame has a "Team" column before attempting to remove the duplicated part
-            if 'Team' in merged_df.columns:
-                # Remove duplicated part from the "Team" column
-                merged_df['Team'] = merged_df['Team'].apply(lambda x: x[:len(x) // 2])
-
-            # Create the directory if it doesn't exist
-            self.create_directory_if_not_exists(unit_directory_path)
-
-            # Specify the file path within the unit's directory
-            csv_file_path = os.path.join(unit_directory_path, category + '.csv')
-
-            # Export the DataFrame to a CSV file
-            merged_df.to_csv(csv_file_path, index=False)  # Set index=False to exclude the index column
-
-            print(f'DataFrame for category "{category}" in unit "{unit}" has been exported to {csv_file_path}')
+                complete = False
+                break
+
+            # Find the "Next Page" link and start downloading it right away
+            current_url = page_url
+            next_href = find_next_page(response.content)
+            if next_href:
+                page_url = self.base_url + next_href
+                pending = self.fetcher.submit(page_url)
+
+            # Extract the stats table with the configured parser backend
+            df = parse_stats_page(response.content, level, self.parser)
+            if not df.empty and self.output_format == "parquet":
+                # Every page becomes its own typed part file of the category's partition
+                write_page(df, parquet_directory, page_number, category, level)
+                rows_written += len(df)
+            elif not df.empty:
+                if rows_written == 0:
+                    # Create the directory if it doesn't exist
+                    self.create_directory_if_not_exists(unit_directory_path)
+
+                # Stream the page into the CSV file, the header is written with the first page only
+                df.to_csv(csv_file_path, mode='w' if rows_written == 0 else 'a', header=rows_written == 0, index=False)
+                rows_written += len(df)
+
+            if state is not None:
+                csv_bytes = os.path.getsize(csv_file_path) if rows_written and self.output_format == "csv" else 0
+                manifest.record_page(state, current_url, response.content, len(df), csv_bytes,
+                                     page_url if next_href else None)
+            page_number += 1
+
+        if rows_written:
+            print(f'{rows_written} rows for category "{category}" in unit "{unit}" have been exported to {output_path}')
         else:
             print(f"No data found for category '{category}' in unit '{unit}'")
 
+        if state is not None and complete:
+            manifest.mark_complete(state)
+        return complete
+
+    def output_directory(self, season, level):
+        # Combine the base directory path with the current week for the current season,
+        # else store data in 'reg' (regular season) directory. Returns (directory, week or None).
+        directory_path = os.path.join('data', str(season), level)
+        if int(season) == self.current_season:
+            return os.path.join(directory_path, f'week{self.current_week}'), self.current_week
+        return directory_path, None
+
+    def open_manifest(self, season, level):
+        # Manifests live next to the CSV output, the parquet tree keeps them in a _manifests sidecar
+        directory_path, week = self.output_directory(season, level)
+        if self.output_format == "parquet":
+            directory_path = os.path.join(self.parquet_root, '_manifests', str(season), level)
+            if week is not None:
+                directory_path = os.path.join(directory_path, f'week{week}')
+        return ScrapeManifest(directory_path, season, level, week)
+
     def get_stats(self, level):
         # Initiates the data scraping process for player or team statistics.
         self.set_current_season_and_week()
@@ -297,28 +309,30 @@ class NFLDataScraper:
         if int(self.season) < 1970:
             raise ValidSeasonError(self.season)
         else:
-            # Combine the base directory path with the current week for the current season,
-            # else store data in 'reg' (regular season) directory
-            directory_path = os.path.join('data', str(self.season), level)
-            if int(self.season) == self.current_season:
-                directory_path = os.path.join(directory_path, f'week{self.current_week}')
+            directory_path, week = self.output_directory(self.season, level)
+
+            # Historic seasons and earlier weeks that finished before are not requested again
+            manifest = self.open_manifest(self.season, level)
+            if manifest.level_complete():
+                print(f"Skipping {level} stats for season {self.season}, already complete in {directory_path}.")
+                return
 
             unit_links = self.format_links(level)
 
-            if level == "team":
-                for unit, categories in unit_links.items():
-                    for category, _ in categories.items():
+            jobs = []
+            for unit, categories in unit_links.items():
+                for category in categories:
+                    if level == "team":
                         # Create a subdirectory for the current unit
                         unit_directory_path = os.path.join(directory_path, unit)
-
-                        # Call scrape_and_process_data with unit and category
-                        self.scrape_and_process_data(unit, category, level, unit_directory_path, unit_links)
-
-            elif level == "player":
-                for unit, categories in unit_links.items():
-                    for category, _ in categories.items():
+                    else:
                         # Directly use the week1 directory for player-level data
                         unit_directory_path = directory_path
+                    jobs.append((unit, category, level, unit_directory_path, unit_links, manifest))
+
+            # Categories are independent page chains, scrape several of them side by side.
+            # These threads only wait on the fetcher's pool, they never occupy it.
+            with ThreadPoolExecutor(max_workers=self.category_workers) as executor:
+                completed = list(executor.map(lambda job: self.scrape_and_process_data(*job), jobs))
 
-                        # Pass unit and category to the scrape_and_process_data function
-                        self.scrape_and_process_data(unit, category, level, unit_directory_path, unit_links)
\ No newline at end of file
+            manifest.record_level(unit_links, all(completed))
\ No newline at end of file
@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+
+# Declared column types of the NFL.com player stats tables and the normalization stage that applies them.
+# Scraped values arrive as text ("1,234" yards, "75T" for a touchdown long, "--" for none) and the CSVs
+# keep that text; normalize_frame turns it into compact typed columns with vectorized string operations
+# when a CSV is read (read_stats_csv) or a page is written to parquet. A long keeps its touchdown marker
+# as a boolean <column>_td next to it. Team tables have no declared schema, their columns are inferred.
+
+# Kinds of columns and the dtype they are stored as
+COUNT = 'count'  # small counts (attempts, touchdowns, ...)
+YARDS = 'yards'  # yardage totals, may carry thousands separators
+LONG = 'long'  # longest play, a trailing "T" marks a touchdown (kept as <column>_td)
+RATE = 'rate'  # averages, percentages, ratings
+TEXT = 'text'
+CATEGORY = 'category'
+
+KIND_DTYPES = {
+    COUNT: 'Int16',
+    YARDS: 'Int32',
+    LONG: 'Int16',
+    RATE: 'float32',
+    TEXT: 'string',
+    CATEGORY: 'category',
+}
+
+MADE_ATTEMPTED = {f'{distance} > A-M': TEXT for distance in ('1-19', '20-29', '30-39', '40-49', '50-59', '60+')}
+
+STAT_SCHEMAS = {
+    'field-goals': {'Player': TEXT, 'FGM': COUNT, 'Att': COUNT, 'FG %': RATE, **MADE_ATTEMPTED,
+                    'Lng': LONG, 'FG Blk': COUNT},
+    'fumbles': {'Player': TEXT, 'FF': COUNT, 'FR': COUNT, 'FR TD': COUNT},
+    'interceptions': {'Player': TEXT, 'INT': COUNT, 'INT TD': COUNT, 'INT Yds': YARDS, 'Lng': LONG},
+    'kickoff-returns': {'Player': TEXT, 'Avg': RATE, 'Ret': COUNT, 'Yds': YARDS, 'KRet TD': COUNT, '20+': COUNT,
+                        '40+': COUNT, 'Lng': LONG, 'FC': COUNT, 'FUM': COUNT},
+    'kickoffs': {'Player': TEXT, 'KO': COUNT, 'Yds': YARDS, 'Ret Yds': YARDS, 'TB': COUNT, 'TB %': RATE, 'Ret': COUNT,
+                 'Ret Avg': RATE, 'OSK': COUNT, 'OSK Rec': COUNT, 'OOB': COUNT, 'TD': COUNT},
+    'passing': {'Player': TEXT, 'Pass Yds': YARDS, 'Yds/Att': RATE, 'Att': COUNT, 'Cmp': COUNT, 'Cmp %': RATE,
+                'TD': COUNT, 'INT': COUNT, 'Rate': RATE, '1st': COUNT, '1st%': RATE, '20+': COUNT, '40+': COUNT,
+                'Lng': LONG, 'Sck': COUNT, 'SckY': YARDS},
+    'punt-returns': {'Player': TEXT, 'Avg': RATE, 'Ret': COUNT, 'Yds': YARDS, 'PRet T': COUNT, '20+': COUNT,
+                     '40+': COUNT, 'Lng': LONG, 'FC': COUNT, 'FUM': COUNT},
+    'punts': {'Player': TEXT, 'Avg': RATE, 'Net Avg': RATE, 'Net Yds': YARDS, 'Punts': COUNT, 'Lng': LONG,
+              'Yds': YARDS, 'IN 20': COUNT, 'OOB': COUNT, 'Dn': COUNT, 'TB': COUNT, 'FC': COUNT, 'Ret': COUNT,
+              'RetY': YARDS, 'TD': COUNT, 'P Blk': COUNT},
+    'receiving': {'Player': TEXT, 'Rec': COUNT, 'Yds': YARDS, 'TD': COUNT, '20+': COUNT, '40+': COUNT, 'LNG': LONG,
+                  'Rec 1st': COUNT, '1st%': RATE, 'Rec FUM': COUNT, 'Rec YAC/R': YARDS, 'Tgts': COUNT},
+    'rushing': {'Player': TEXT, 'Rush Yds': YARDS, 'Att': COUNT, 'TD': COUNT, '20+': COUNT, '40+': COUNT,
+                'Lng': LONG, 'Rush 1st': COUNT, 'Rush 1st%': RATE, 'Rush FUM': COUNT},
+    'tackles': {'Player': TEXT, 'Comb': COUNT, 'Asst': COUNT, 'Solo': COUNT, 'Sck': RATE},
+}
+
+# Columns shared by every table, whatever the category
+COMMON_COLUMNS = {'Player': TEXT, 'Team': CATEGORY}
+
+
+def column_kind(category, column):
+    # Declared kind of a column, None when the column is not declared for the category
+    return STAT_SCHEMAS.get(category, {}).get(column, COMMON_COLUMNS.get(column))
+
+
+def dedupe_team(team):
+    # NFL.com renders the team name twice inside the cell, keep one copy.
+    # Rows are grouped by half length (a handful of distinct values) and each group is sliced at once.
+    team = team.astype('string')
+    half = team.str.len() // 2
+    deduped = team.copy()
+    for length in half.dropna().unique():
+        rows = half == length
+        deduped[rows] = team[rows].str.slice(0, int(length))
+    return deduped
+
+
+def clean_numbers(values):
+    # "1,234" -> 1234, "--" / "" -> missing
+    text = values.astype('string').str.strip().str.replace(',', '', regex=False)
+    return pd.to_numeric(text.mask(text.isin(['', '-', '--'])), errors='coerce')
+
+
+def touchdown_flags(values):
+    # True where a long ends in the touchdown marker ("75T"), missing where the long is missing
+    text = values.astype('string').str.strip()
+    return text.str.endswith('T').astype('boolean').mask(text.isin(['', '-', '--']) | text.isna())
+
+
+def to_kind(values, kind):
+    if kind in (TEXT, CATEGORY):
+        return values.astype(KIND_DTYPES[kind])
+    if kind == LONG:
+        values = values.astype('string').str.strip().str.rstrip('T')
+    numbers = clean_numbers(values)
+    if kind == RATE or (numbers.dropna() % 1 != 0).any():
+        # Fractions are never rounded into an integer column
+        return numbers.astype('float32')
+    return numbers.astype(KIND_DTYPES[kind])
+
+
+def infer_kind(values):
+    # Undeclared columns (e.g. team level tables) are numeric when every present value parses
+    numbers = clean_numbers(values)
+    present = values.notna() & ~values.astype('string').str.strip().isin(['', '-', '--'])
+    return RATE if numbers[present].notna().all() else TEXT
+
+
+def assemble(columns, names, df):
+    # Puts typed columns back together positionally, so repeated column names survive
+    if not columns:
+        return df.copy()
+    typed = pd.concat(columns, axis=1)
+    typed.columns = names
+    return typed
+
+
+def normalize_frame(df, category=None, level='player'):
+    # Applies the declared schema of the category to a frame of scraped text values (Team already
+    # de-duplicated). Only player tables are declared, team tables share category names but not columns
+    normalized = []
+    names = []
+    for i, column in enumerate(df.columns):
+        values = df.iloc[:, i]
+        declared = column_kind(category, column) if level == 'player' else COMMON_COLUMNS.get(column)
+        kind = declared or infer_kind(values)
+        normalized.append(to_kind(values, kind))
+        names.append(column)
+        if kind == LONG:
+            normalized.append(touchdown_flags(values))
+            names.append(f'{column.lower()}_td')
+    return assemble(normalized, names, df)
+
+
+def read_stats_csv(path, category=None, level=None):
+    # Reads a scraped stats CSV with its declared dtypes. The category defaults to the file name,
+    # the level to 'team' for files under a team directory (data/<season>/team/...) and 'player' otherwise
+    if category is None:
+        category = os.path.splitext(os.path.basename(path))[0]
+    if level is None:
+        level = 'team' if 'team' in os.path.normpath(path).split(os.sep) else 'player'
+    return normalize_frame(pd.read_csv(path, dtype=str, keep_default_na=False), category, level)
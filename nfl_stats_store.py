@@ -0,0 +1,99 @@
+import glob
+import os
+
+import pandas as pd
+
+from nfl_stat_schema import normalize_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for the parquet output mode
+    pa = None
+
+# Columnar output for the scraped NFL.com stats.
+# Pages are written as typed parquet files (dtypes from nfl_stat_schema) into a hive partitioned tree:
+#   data/parquet/season=2023/level=player/unit=individual/category=passing/part-00000.parquet
+# so one stat across all seasons is a single column-pruned dataset scan instead of many CSV parses.
+
+PARQUET_ROOT = os.path.join('data', 'parquet')
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("The parquet output mode requires the pyarrow package.")
+
+
+def partition_directory(root, season, level, unit, category):
+    return os.path.join(root, f'season={season}', f'level={level}', f'unit={unit}', f'category={category}')
+
+
+def part_path(directory, page):
+    return os.path.join(directory, f'part-{page:05d}.parquet')
+
+
+def clear_partition(directory):
+    # Removes the parts of an earlier scrape, e.g. the previous week's snapshot of the running season
+    for path in glob.glob(os.path.join(directory, 'part-*.parquet')):
+        os.remove(path)
+
+
+def to_table(df):
+    # Keeps the declared dtypes of nfl_stat_schema (int16/int32/float32), text is stored as string
+    # (parquet dictionary-encodes it on its own) so all pages of a stat share one schema
+    columns = {}
+    for name in df.columns:
+        values = df[name]
+        if pd.api.types.is_numeric_dtype(values):
+            columns[name] = pa.array(values, from_pandas=True)
+        else:
+            columns[name] = pa.array(values.astype(object).where(values.notna(), None), type=pa.string(), from_pandas=True)
+    return pa.table(columns)
+
+
+def write_page(df, directory, page, category=None, level='player'):
+    # Writes one scraped page of cell text as its own typed part file, replacing a part left behind
+    # by an interrupted run
+    require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    path = part_path(directory, page)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    pq.write_table(to_table(normalize_frame(df, category, level)), temp_path)
+    os.replace(temp_path, path)
+    return path
+
+
+def unified_schema(paths):
+    # Merges the schemas of all parts (read from the footers only). A column that is numeric
+    # in some parts and text in others is read as text everywhere, differing numbers as float64.
+    fields = {}
+    for path in paths:
+        for field in pq.read_schema(path):
+            known = fields.get(field.name)
+            if known is None or known.type == field.type or pa.types.is_string(known.type):
+                fields.setdefault(field.name, field)
+            elif pa.types.is_string(field.type):
+                fields[field.name] = field
+            else:
+                fields[field.name] = pa.field(field.name, pa.float64())
+    return pa.schema(list(fields.values()))
+
+
+def load_stat(category, level='player', columns=None, seasons=None, root=PARQUET_ROOT):
+    # Loads one stat category across all scraped seasons, reading only the requested columns
+    require_pyarrow()
+    paths = sorted(glob.glob(os.path.join(root, 'season=*', f'level={level}', 'unit=*', f'category={category}', '*.parquet')))
+    if seasons is not None:
+        wanted = {f'season={season}' for season in seasons}
+        paths = [path for path in paths if any(part in wanted for part in path.split(os.sep))]
+    if not paths:
+        return pd.DataFrame(columns=columns)
+
+    schema = unified_schema(paths)
+    for name, type_ in (('season', pa.int32()), ('level', pa.string()), ('unit', pa.string()), ('category', pa.string())):
+        schema = schema.append(pa.field(name, type_))
+    dataset = ds.dataset(paths, schema=schema, format='parquet', partitioning='hive', partition_base_dir=root)
+    if columns is not None:
+        columns = ['season', 'unit'] + [column for column in columns if column not in ('season', 'unit')]
+    return dataset.to_table(columns=columns).to_pandas()
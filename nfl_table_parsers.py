@@ -0,0 +1,155 @@
+import re
+from html.parser import HTMLParser
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from nfl_stat_schema import dedupe_team
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, the other backends work without it
+    lxml = None
+
+# Parser backends for the NFL.com stats tables.
+# Every backend takes the raw page (bytes or str) and the stats level ("player" or "team")
+# and returns the stats table as a DataFrame of cell text. The text is written to the CSVs as is,
+# nfl_stat_schema types it when it is read back or written to parquet.
+
+NEXT_PAGE_CLASS = 'nfl-o-table-pagination__next'
+NEXT_PAGE_PATTERN = re.compile(r'<a\b[^>]*\bclass="[^"]*\b' + NEXT_PAGE_CLASS + r'\b[^"]*"[^>]*>', re.IGNORECASE)
+HREF_PATTERN = re.compile(r'\bhref="([^"]*)"', re.IGNORECASE)
+
+
+def table_class(level):
+    return f'd3-o-{level}-stats--detailed'
+
+
+def to_frame(columns, rows):
+    # Builds the page DataFrame of raw cell text, typing is left to nfl_stat_schema
+    if not columns:
+        return pd.DataFrame()
+    width = len(columns)
+    rows = [row[:width] + [None] * (width - len(row)) for row in rows]
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+def parse_bs4(page, level):
+    # Reference implementation: full BeautifulSoup tree with the stdlib parser
+    soup = BeautifulSoup(page, "html.parser")
+    columns = []
+    values = []
+    for element in soup.find_all(attrs={"class": table_class(level)}):
+        columns += [cell.get_text(strip=True) for cell in element.find_all('th')]
+        values += [cell.get_text(strip=True) for cell in element.find_all('td')]
+    num_columns = len(columns) if columns else 1  # Use 1 if there are no headers
+    rows = [values[i:i + num_columns] for i in range(0, len(values), num_columns)]
+    return to_frame(columns, rows)
+
+
+def parse_lxml(page, level):
+    # libxml2 based parsing, cells are located with XPath instead of a Python tree walk
+    if lxml is None:
+        raise ImportError("The 'lxml' parser backend requires the lxml package.")
+    tree = lxml.html.fromstring(page)
+    has_class = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+    columns = []
+    rows = []
+    for table in tree.xpath(f"//*[{has_class.format(table_class(level))}]"):
+        columns += [''.join(text.strip() for text in th.itertext()) for th in table.iter('th')]
+        for tr in table.iter('tr'):
+            cells = [''.join(text.strip() for text in td.itertext()) for td in tr.iterfind('td')]
+            if cells:
+                rows.append(cells)
+    return to_frame(columns, rows)
+
+
+class StatsTableTokenizer(HTMLParser):
+    # Streaming tokenizer that only collects th/td text and row boundaries
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.columns = []
+        self.rows = []
+        self.cell = None
+        self.cell_tag = None
+        self.row = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self.row = []
+        elif tag in ('th', 'td'):
+            self.cell = []
+            self.cell_tag = tag
+
+    def handle_endtag(self, tag):
+        if tag == self.cell_tag and self.cell is not None:
+            text = ''.join(self.cell)
+            if tag == 'th':
+                self.columns.append(text)
+            elif self.row is not None:
+                self.row.append(text)
+            self.cell = None
+            self.cell_tag = None
+        elif tag == 'tr' and self.row is not None:
+            if self.row:
+                self.rows.append(self.row)
+            self.row = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            data = data.strip()
+            if data:
+                self.cell.append(data)
+
+
+def find_table_markup(page, level):
+    # Cuts the stats table out of the page so the tokenizer never sees the rest of the document
+    marker = page.find(table_class(level))
+    if marker == -1:
+        return ''
+    start = page.rfind('<', 0, marker)
+    tag = re.match(r'<\s*([a-zA-Z0-9]+)', page[start:])
+    if tag is None:
+        return ''
+    end = page.find(f'</{tag.group(1)}>', marker)
+    return page[start:] if end == -1 else page[start:end + len(tag.group(1)) + 3]
+
+
+def parse_stream(page, level):
+    # Targeted tokenizer: only the d3-o-{level}-stats--detailed table is tokenized
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+    tokenizer = StatsTableTokenizer()
+    tokenizer.feed(find_table_markup(page, level))
+    tokenizer.close()
+    return to_frame(tokenizer.columns, tokenizer.rows)
+
+
+def find_next_page(page):
+    # Returns the href of the "Next Page" link, found with a regex so it is known before the table is parsed
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+    next_page_tag = NEXT_PAGE_PATTERN.search(page)
+    if next_page_tag is None:
+        return None
+    href = HREF_PATTERN.search(next_page_tag.group(0))
+    return href.group(1).replace('&amp;', '&') if href else None
+
+
+PARSERS = {
+    'bs4': parse_bs4,
+    'lxml': parse_lxml,
+    'stream': parse_stream,
+}
+
+DEFAULT_PARSER = 'lxml' if lxml is not None else 'stream'
+
+
+def parse_stats_page(page, level, parser=DEFAULT_PARSER):
+    # Parses the stats table of one page with the chosen backend and removes the doubled team names
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser backend '{parser}', choose one of {sorted(PARSERS)}.")
+    df = PARSERS[parser](page, level)
+    if 'Team' in df.columns:
+        df['Team'] = dedupe_team(df['Team']).astype(object)
+    return df
@@ -5,64 +5,39 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.model_selection import cross_val_score, learning_curve
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-
-# Load QB data
-qb = pd.read_csv("dat/qb_stats.csv")
-
-# Sort by time to simulate real game sequence
-qb = qb.sort_values(by=['gsis_id', 'season', 'week'])
-
-# Create rolling average features (last 3 games)
-qb['rolling_pass_yards'] = qb.groupby('gsis_id')['pass_yards'].rolling(3, min_periods=1).mean().reset_index(0, drop=True)
-qb['rolling_completions'] = qb.groupby('gsis_id')['completions'].rolling(3, min_periods=1).mean().reset_index(0, drop=True)
-qb['rolling_pass_tds'] = qb.groupby('gsis_id')['pass_touchdowns'].rolling(3, min_periods=1).mean().reset_index(0, drop=True)
-qb['rolling_interceptions'] = qb.groupby('gsis_id')['interceptions'].rolling(3, min_periods=1).mean().reset_index(0, drop=True)
-
-# Split based on week number: train on week <= 10, test on week > 10
-train_data = qb[qb['week'] <= 10].copy()
-test_data = qb[qb['week'] > 10].copy()
-
-# Feature selection and preprocessing
-train_features = train_data.drop(columns=['avg_epa','gsis_id', 'position', 'depth_chart_position', 'full_name', 'total_epa', 'third_down_rate', 'fourth_down_rate'])
-train_features = pd.get_dummies(train_features, columns=['team'])
-train_features['birth_date'] = pd.to_datetime(train_features['birth_date'])
-train_features['birth_year'] = train_features['birth_date'].dt.year
-train_features = train_features.drop(columns=['birth_date'])
-train_features = train_features.dropna()
-y_train = train_data.loc[train_features.index, 'avg_epa']
-
-# Prepare test set with aligned columns
-test_features = test_data[train_features.columns.intersection(test_data.columns)].copy()
-test_features = test_features.dropna()
-y_test = test_data.loc[test_features.index, 'avg_epa']
-
-# Train model
+from nfl_feature_store import FeatureStore
+from nfl_game_logs import load_game_log
+from nfl_model_eval import evaluate_model, print_report, time_split
+
+# Load QB data (typed, from the binary cache while qb_stats.csv is unchanged)
+qb = load_game_log("qb_stats.csv")
+
+# Rolling average features (last 3 games), sorted by gsis_id, season, week.
+# The feature store only computes games it has not seen yet, from the per-player state of earlier runs.
+ROLLING_FEATURES = [
+    ('rolling_pass_yards', 'passing_yards', 'mean', 3),
+    ('rolling_completions', 'completions', 'mean', 3),
+    ('rolling_pass_tds', 'pass_touchdowns', 'mean', 3),
+    ('rolling_interceptions', 'interceptions', 'mean', 3),
+]
+feature_store = FeatureStore("dat/features/qb_time_split", ROLLING_FEATURES, shift=0, min_periods=1,
+                             career_game_number=False)
+qb = feature_store.update(qb)
+
+# Split based on week number: train on week <= 10, test on week > 10.
+# Team one-hot columns over the training weeks' teams and birth_year, rows with missing values dropped.
+# The test set is encoded with the same team vocabulary, so both have the same columns.
+train_features, y_train, test_features, y_test = time_split(qb, split_week=10)
+
+# Holdout fit, 5 fold cross-validation and learning curve. Every model is fitted once, in a process pool,
+# and the RMSE and R² of a fold come from the same fit
 rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-rf_model.fit(train_features, y_train)
-
-# Predict and evaluate
-y_pred = rf_model.predict(test_features)
-rmse = lambda y_true, y_pred: np.sqrt(mean_squared_error(y_true, y_pred))
-print("QB RMSE:", rmse(y_test, y_pred))
-print("QB R2:", r2_score(y_test, y_pred))
-
-# Cross-validation on training set only
-cv_rmse_scores = cross_val_score(rf_model, train_features, y_train, cv=5, scoring='neg_root_mean_squared_error')
-cv_r2_scores = cross_val_score(rf_model, train_features, y_train, cv=5, scoring='r2')
-print(f"Cross-validated RMSE: {-cv_rmse_scores.mean():.3f} ± {cv_rmse_scores.std():.3f}")
-print(f"Cross-validated R²: {cv_r2_scores.mean():.3f} ± {cv_r2_scores.std():.3f}")
-
-# Learning curve
-train_sizes, train_scores, test_scores = learning_curve(
-    rf_model,
-    train_features, y_train,
-    cv=5,
-    scoring='r2',
-    train_sizes=np.linspace(0.1, 1.0, 10)
-)
+report = evaluate_model(rf_model, train_features, y_train, cv=5, train_sizes=np.linspace(0.1, 1.0, 10),
+                        holdout=(test_features, y_test))
+rf_model = report['model']
+print_report("QB", report)
+train_sizes, train_scores, test_scores = report['train_sizes'], report['train_scores'], report['test_scores']
 
 train_mean = np.mean(train_scores, axis=1)
 test_mean = np.mean(test_scores, axis=1)
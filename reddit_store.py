@@ -0,0 +1,271 @@
+import calendar
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from reddit_zst import iter_zst_records, loads, year_bounds
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for the columnar Reddit store
+    pa = None
+
+# Columnar store for the filtered Reddit posts.
+# Only the useful columns are kept, in parquet files partitioned by month of created_utc:
+#   dat/reddit_store/month=2019-10/part-<run>-00000.parquet   posts sorted by created_utc
+#   dat/reddit_store/_index/part-<run>-00000.parquet          id -> created_utc, month, file
+# Author, subreddit and flair are dictionary columns (loaded as pandas categories). A season/week
+# query reads only the months it overlaps, and the sorted created_utc lets parquet skip row groups.
+
+REDDIT_ROOT = os.path.join('dat', 'reddit_store')
+CALENDAR_PATH = "dat/season_week_calendar.csv"
+INGEST_BATCH_SIZE = 200000
+
+USEFUL_COLUMNS = ["id", "title", "selftext", "created_utc", "score", "num_comments", "subreddit", "author",
+                  "author_flair_text", "link_flair_text", "is_self", "is_video", "spoiler", "stickied", "locked"]
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("The Reddit store requires the pyarrow package.")
+
+
+def post_schema():
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("id", pa.string()),
+        ("title", pa.string()),
+        ("selftext", pa.string()),
+        ("created_utc", pa.int64()),
+        ("score", pa.int32()),
+        ("num_comments", pa.int32()),
+        ("subreddit", dictionary),
+        ("author", dictionary),
+        ("author_flair_text", dictionary),
+        ("link_flair_text", dictionary),
+        ("is_self", pa.bool_()),
+        ("is_video", pa.bool_()),
+        ("spoiler", pa.bool_()),
+        ("stickied", pa.bool_()),
+        ("locked", pa.bool_()),
+    ])
+
+
+def month_of(created_utc):
+    return time.strftime('%Y-%m', time.gmtime(created_utc))
+
+
+def month_bounds(month):
+    # [start, end) of a "YYYY-MM" month as UTC timestamps
+    year, number = map(int, month.split('-'))
+    start = calendar.timegm((year, number, 1, 0, 0, 0))
+    end = calendar.timegm((year + number // 12, number % 12 + 1, 1, 0, 0, 0))
+    return start, end
+
+
+def to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_table(records):
+    # Builds a typed table from projected post dicts, created_utc is sometimes a string in the dumps
+    schema = post_schema()
+    columns = {name: [record.get(name) for record in records] for name in USEFUL_COLUMNS}
+    for name in ("created_utc", "score", "num_comments"):
+        columns[name] = [to_int(value) for value in columns[name]]
+    arrays = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(columns[field.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[field.name], type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class RedditStore:
+    def __init__(self, root=REDDIT_ROOT):
+        require_pyarrow()
+        self.root = root
+        self.index_directory = os.path.join(root, '_index')
+        self.id_index = None
+
+    def load_index(self):
+        # id -> created_utc, month, file of every stored post
+        if self.id_index is None:
+            paths = sorted(glob.glob(os.path.join(self.index_directory, '*.parquet')))
+            if paths:
+                self.id_index = pq.ParquetDataset(paths).read().to_pandas().set_index('id')
+            else:
+                self.id_index = pd.DataFrame(columns=['created_utc', 'month', 'file']).rename_axis('id')
+        return self.id_index
+
+    def ingest(self, records, batch_size=INGEST_BATCH_SIZE):
+        # Appends posts that are not stored yet, one part per month and batch
+        run = time.strftime('%Y%m%d%H%M%S')
+        self.remove_orphans()
+        known = set(self.load_index().index)
+        written = 0
+        batch = []
+        batch_no = 0
+        for record in records:
+            if record.get("id") in known or to_int(record.get("created_utc")) is None:
+                continue
+            known.add(record["id"])
+            batch.append(record)
+            if len(batch) >= batch_size:
+                written += self.write_batch(batch, run, batch_no)
+                batch = []
+                batch_no += 1
+        if batch:
+            written += self.write_batch(batch, run, batch_no)
+        self.id_index = None
+        print(f"✅ Ingested {written} posts into {self.root}")
+        return written
+
+    def write_batch(self, records, run, batch_no):
+        table = to_table(records).sort_by('created_utc')
+        months = pa.array([month_of(created) for created in table.column('created_utc').to_pylist()])
+        index_rows = []
+        for month in pc.unique(months).to_pylist():
+            part = table.filter(pc.equal(months, month))
+            directory = os.path.join(self.root, f'month={month}')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'part-{run}-{batch_no:05d}.parquet')
+            temp_path = f'{path}.{os.getpid()}.tmp'
+            pq.write_table(part, temp_path, row_group_size=50000)
+            os.replace(temp_path, path)
+            index_rows.append(pa.table({
+                'id': part.column('id'),
+                'created_utc': part.column('created_utc'),
+                'month': pa.array([month] * part.num_rows),
+                'file': pa.array([os.path.relpath(path, self.root)] * part.num_rows),
+            }))
+        # The index part goes last, parts it does not cover are removed by the next ingest
+        os.makedirs(self.index_directory, exist_ok=True)
+        index_path = os.path.join(self.index_directory, f'part-{run}-{batch_no:05d}.parquet')
+        pq.write_table(pa.concat_tables(index_rows), index_path + '.tmp')
+        os.replace(index_path + '.tmp', index_path)
+        return table.num_rows
+
+    def remove_orphans(self):
+        # Deletes month parts of an ingest that stopped before writing their index part
+        referenced = set(self.load_index()['file'])
+        for path in glob.glob(os.path.join(self.root, 'month=*', '*.parquet')):
+            if os.path.relpath(path, self.root) not in referenced:
+                os.remove(path)
+
+    def ingest_jsonl(self, path, batch_size=INGEST_BATCH_SIZE):
+        # Ingests a JSON lines export such as dat/reddit_2018_2023.jsonl
+        def records():
+            with open(path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        obj = loads(line)
+                        yield {name: obj.get(name) for name in USEFUL_COLUMNS}
+        return self.ingest(records(), batch_size)
+
+    def ingest_zst(self, path, min_year, max_year, batch_size=INGEST_BATCH_SIZE):
+        # Ingests straight from a zst dump, without the intermediate JSON lines file
+        start_utc, end_utc = year_bounds(min_year, max_year)
+        return self.ingest(iter_zst_records(path, USEFUL_COLUMNS, start_utc, end_utc), batch_size)
+
+    def month_paths(self, start_utc, end_utc):
+        # Part files of the months overlapping [start_utc, end_utc)
+        paths = []
+        for directory in sorted(glob.glob(os.path.join(self.root, 'month=*'))):
+            month_start, month_end = month_bounds(os.path.basename(directory).split('=', 1)[1])
+            if month_start < end_utc and month_end > start_utc:
+                paths += sorted(glob.glob(os.path.join(directory, '*.parquet')))
+        return paths
+
+    def load_posts(self, start_utc, end_utc, columns=None):
+        # Posts created in [start_utc, end_utc), reading only the overlapping months
+        paths = self.month_paths(start_utc, end_utc)
+        if not paths:
+            return to_table([]).to_pandas() if columns is None else pd.DataFrame(columns=columns)
+        dataset = ds.dataset(paths, schema=post_schema(), format='parquet')
+        condition = (ds.field('created_utc') >= start_utc) & (ds.field('created_utc') < end_utc)
+        return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+    def load_ids(self, ids, columns=None):
+        # Posts by id, through the index: only the files holding them are opened
+        index = self.load_index()
+        found = index.loc[index.index.intersection(pd.Index(ids))]
+        if found.empty:
+            return pd.DataFrame(columns=columns or USEFUL_COLUMNS)
+        paths = [os.path.join(self.root, file) for file in found['file'].unique()]
+        dataset = ds.dataset(paths, schema=post_schema(), format='parquet')
+        return dataset.to_table(columns=columns, filter=ds.field('id').isin(list(found.index))).to_pandas()
+
+    def load_season_week(self, season, week, columns=None, calendar_df=None):
+        # Posts of one NFL season week as defined in dat/season_week_calendar.csv
+        calendar_df = load_calendar() if calendar_df is None else calendar_df
+        row = calendar_df[(calendar_df['season'] == season) & (calendar_df['week'] == week)]
+        if row.empty:
+            raise ValueError(f"Season {season} week {week} is not in the calendar")
+        start_utc, end_utc = week_bounds(row.iloc[0])
+        return self.load_posts(start_utc, end_utc, columns)
+
+    def load_season_weeks(self, season_weeks, columns=None, calendar_df=None):
+        # Posts of several weeks, e.g. the season/week pairs of qb_stats.csv, tagged with season and week.
+        # Only the months overlapping one of the weeks are read.
+        calendar_df = load_calendar() if calendar_df is None else calendar_df
+        pairs = pd.DataFrame(season_weeks, columns=['season', 'week']).drop_duplicates()
+        weeks = calendar_df.merge(pairs, on=['season', 'week'])
+        bounds = [week_bounds(row) for _, row in weeks.iterrows()]
+        paths = sorted({path for start_utc, end_utc in bounds for path in self.month_paths(start_utc, end_utc)})
+        if columns is not None and 'created_utc' not in columns:
+            columns = list(columns) + ['created_utc']
+        if not paths:
+            posts = to_table([]).to_pandas() if columns is None else pd.DataFrame(columns=columns)
+        else:
+            condition = None
+            for start_utc, end_utc in bounds:
+                in_week = (ds.field('created_utc') >= start_utc) & (ds.field('created_utc') < end_utc)
+                condition = in_week if condition is None else condition | in_week
+            dataset = ds.dataset(paths, schema=post_schema(), format='parquet')
+            posts = dataset.to_table(columns=columns, filter=condition).to_pandas()
+        posts['created_dt'] = pd.to_datetime(posts['created_utc'], unit='s')
+        return assign_season_week(posts, weeks)
+
+
+def load_calendar(path=CALENDAR_PATH):
+    calendar_df = pd.read_csv(path)
+    calendar_df['start_date'] = pd.to_datetime(calendar_df['start_date'])
+    calendar_df['end_date'] = pd.to_datetime(calendar_df['end_date'])
+    return calendar_df
+
+
+def week_bounds(calendar_row):
+    # [start, end) in UTC seconds, matching start_date <= created_dt <= end_date of the notebook
+    start = calendar.timegm(calendar_row['start_date'].timetuple())
+    end = calendar.timegm(calendar_row['end_date'].timetuple()) + 1
+    return start, end
+
+
+def assign_season_week(df, calendar_df, time_column='created_dt'):
+    # Vectorized version of the notebook's per-row calendar lookup (start_date <= created_dt <= end_date).
+    # Posts outside every week get season 0 and week 0.
+    weeks = calendar_df.sort_values('start_date')[['start_date', 'end_date', 'season', 'week']]
+    weeks = weeks.astype({'start_date': 'datetime64[ns]', 'end_date': 'datetime64[ns]'})
+    times = pd.DataFrame({'time': df[time_column].astype('datetime64[ns]').to_numpy(), 'position': np.arange(len(df))})
+    times = times.dropna(subset=['time']).sort_values('time')
+    matched = pd.merge_asof(times, weeks, left_on='time', right_on='start_date', direction='backward')
+    matched = matched[matched['time'] <= matched['end_date']]
+    season = np.zeros(len(df), dtype=int)
+    week = np.zeros(len(df), dtype=int)
+    season[matched['position'].to_numpy()] = matched['season'].to_numpy()
+    week[matched['position'].to_numpy()] = matched['week'].to_numpy()
+    df = df.copy()
+    df['season'] = season
+    df['week'] = week
+    return df
@@ -1,6 +1,17 @@
 import zstandard as zstd
+import bisect
+import calendar
 import json
 import os
+import re
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+try:
+    import orjson
+except ImportError:  # optional, the standard json module is used without it
+    orjson = None
 
 # 修改為你的檔案路徑
 zst_path = "dat/reddit/subreddits24/nfl_submissions.zst"
@@ -8,31 +19,280 @@ zst_path = "dat/reddit/subreddits24/nfl_submissions.zst"
 # 設定你要預覽幾筆資料（可自行調整）
 PREVIEW_LIMIT = 10
 
+# Decompressed bytes handled per read, lines are split inside each window without copying
+READ_SIZE = 1 << 24
+# The Reddit dumps are compressed with a long window (up to 2 GB)
+MAX_WINDOW_SIZE = 1 << 31
+# Cheap prefilter: created_utc is found in the raw line before the JSON is parsed. Only a line with a
+# single match is decided this way, nested records (crosspost_parent_list) carry their own created_utc
+CREATED_UTC = re.compile(rb'"created_utc"\s*:\s*"?(\d+)')
+
+
+def loads(line):
+    # orjson parses bytes and memoryviews directly, json needs bytes
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(bytes(line))
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def iter_zst_blocks(path, read_size=READ_SIZE):
+    # Decompressed windows of a zst JSON lines file, each cut at the last complete line
+    with open(path, 'rb') as f:
+        dctx = zstd.ZstdDecompressor(max_window_size=MAX_WINDOW_SIZE)
+        with dctx.stream_reader(f, read_size=read_size, read_across_frames=True) as reader:
+            remainder = b""
+            for chunk in iter(lambda: reader.read(read_size), b""):
+                data = remainder + chunk if remainder else chunk
+                end = data.rfind(b"\n") + 1
+                remainder = data[end:]
+                if end:
+                    yield data[:end] if remainder else data
+            if remainder.strip():
+                yield remainder
+
+
+def iter_block_lines(data):
+    # Lines of a block as memoryviews into it, nothing is copied
+    view = memoryview(data)
+    start = 0
+    end = data.find(b"\n")
+    while end >= 0:
+        if end > start:
+            yield view[start:end]
+        start = end + 1
+        end = data.find(b"\n", start)
+    if start < len(data) and data[start:].strip():
+        yield view[start:]
+
+
+def iter_zst_lines(path, read_size=READ_SIZE):
+    # Yields every line of a zst JSON lines file as a memoryview into the decompressed window.
+    # A view is only valid until the next one is requested, copy it (bytes(line)) to keep it.
+    for block in iter_zst_blocks(path, read_size):
+        yield from iter_block_lines(block)
+
+
+def created_utc_of(line):
+    # created_utc of the raw line, None when it has none or several (the line has to be parsed then)
+    match = CREATED_UTC.search(line)
+    if match is None or CREATED_UTC.search(line, match.end()) is not None:
+        return None
+    return int(match.group(1))
+
+
+def year_bounds(min_year, max_year):
+    # [start, end) of the year range as UTC timestamps
+    return calendar.timegm((min_year, 1, 1, 0, 0, 0)), calendar.timegm((max_year + 1, 1, 1, 0, 0, 0))
+
+
+def in_range(line, start_utc, end_utc):
+    # Decides on the raw line when possible, lines without a single plain created_utc are parsed
+    created = created_utc_of(line)
+    if created is None:
+        try:
+            created = int(float(loads(line).get("created_utc") or 0))
+        except (ValueError, TypeError):
+            return False
+    return (start_utc is None or created >= start_utc) and (end_utc is None or created < end_utc)
+
+
+def iter_zst_records(path, fields=None, start_utc=None, end_utc=None, read_size=READ_SIZE):
+    # Parsed records of a zst dump. Lines outside [start_utc, end_utc) are skipped before parsing,
+    # with fields only those keys are kept (missing ones are None).
+    check_time = start_utc is not None or end_utc is not None
+    for line in iter_zst_lines(path, read_size):
+        if check_time and not in_range(line, start_utc, end_utc):
+            continue
+        try:
+            obj = loads(line)
+        except ValueError:
+            continue
+        if fields is not None:
+            obj = {key: obj.get(key) for key in fields}
+        yield obj
+
+
+def filter_zst_to_jsonl(input_path, output_path, min_year, max_year, fields=None, progress_every=100000):
+    # Writes the records of [min_year, max_year] to a JSON lines file. Without fields the
+    # matching lines are copied as they are, so only the created_utc prefilter touches them.
+    start_utc, end_utc = year_bounds(min_year, max_year)
+    written = 0
+    with open(output_path, 'wb', buffering=READ_SIZE) as f_out:
+        if fields is None:
+            for line in iter_zst_lines(input_path):
+                if in_range(line, start_utc, end_utc):
+                    f_out.write(line)
+                    f_out.write(b"\n")
+                    written += 1
+                    if written % progress_every == 0:
+                        print(f"✅ Saved {written} records so far...")
+        else:
+            for obj in iter_zst_records(input_path, fields, start_utc, end_utc):
+                f_out.write(dumps(obj) + b"\n")
+                written += 1
+                if written % progress_every == 0:
+                    print(f"✅ Saved {written} records so far...")
+    return written
+
+
+# === Parallel mode: the main process decompresses, a process pool parses and filters ===
+# The Reddit dumps are one long-window zstd frame, so the stream cannot be split for independent
+# decompression. Decompressing is the cheap part though, the workers take the per-line work.
+# Blocks are handed over in a ring of shared memory segments instead of being pickled through a pipe.
+# Every worker appends to its own shard per year and reports the byte ranges each block produced,
+# the ranges are then concatenated in block order into one file per year.
+
+# Shard files and attached shared memory segments of the current worker process
+worker_shards = {}
+worker_segments = {}
+
+
+def year_of(created, year_starts, first_year):
+    return first_year + bisect.bisect_right(year_starts, created) - 1
+
+
+def read_segment(name, length):
+    segment = worker_segments.get(name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=name)
+        worker_segments[name] = segment
+    with segment.buf[:length] as view:
+        return bytes(view)
+
+
+def filter_block(block_no, segment_name, length, min_year, max_year, fields, shard_directory):
+    # Runs in a worker: writes the block's lines of [min_year, max_year] to the worker's shards
+    data = read_segment(segment_name, length)
+    start_utc, end_utc = year_bounds(min_year, max_year)
+    year_starts = [calendar.timegm((year, 1, 1, 0, 0, 0)) for year in range(min_year, max_year + 1)]
+    by_year = {}
+    for line in iter_block_lines(data):
+        created = created_utc_of(line)
+        obj = None
+        if created is None:
+            try:
+                obj = loads(line)
+                created = int(float(obj.get("created_utc") or 0))
+            except (ValueError, TypeError):
+                continue
+        if not start_utc <= created < end_utc:
+            continue
+        if fields is not None:
+            try:
+                obj = loads(line) if obj is None else obj
+            except ValueError:
+                continue
+            line = dumps({key: obj.get(key) for key in fields})
+        by_year.setdefault(year_of(created, year_starts, min_year), []).append(line)
+
+    ranges = []
+    for year, lines in by_year.items():
+        shard = worker_shards.get(year)
+        if shard is None:
+            shard = open(os.path.join(shard_directory, f"{os.getpid()}-{year}.jsonl"), 'wb')
+            worker_shards[year] = shard
+        start = shard.tell()
+        for line in lines:
+            shard.write(line)
+            shard.write(b"\n")
+        # Flushed per block: pool workers exit without running Python's cleanup
+        shard.flush()
+        ranges.append((year, shard.name, start, shard.tell(), len(lines)))
+    return block_no, ranges
+
+
+def merge_shards(block_ranges, output_directory):
+    # Concatenates the shard ranges in block order into output_directory/year=YYYY.jsonl
+    written = {}
+    outputs = {}
+    handles = {}
+    try:
+        for block_no in sorted(block_ranges):
+            for year, path, start, end, count in block_ranges[block_no]:
+                if year not in outputs:
+                    outputs[year] = open(os.path.join(output_directory, f"year={year}.jsonl"), 'wb')
+                if path not in handles:
+                    handles[path] = open(path, 'rb')
+                shard = handles[path]
+                shard.seek(start)
+                outputs[year].write(shard.read(end - start))
+                written[year] = written.get(year, 0) + count
+    finally:
+        for f in list(outputs.values()) + list(handles.values()):
+            f.close()
+    return written
+
+
+def filter_zst_by_year_parallel(input_path, output_directory, min_year, max_year, processes=None, fields=None,
+                                read_size=READ_SIZE):
+    # Parallel version of filter_zst_to_jsonl, writes one JSON lines file per year
+    processes = processes or os.cpu_count()
+    shard_directory = os.path.join(output_directory, "_shards")
+    shutil.rmtree(shard_directory, ignore_errors=True)
+    os.makedirs(shard_directory)
+    block_ranges = {}
+    running = {}  # future -> segment holding its block
+    segments = []
+    free_segments = []
+
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for block_no, block in enumerate(iter_zst_blocks(input_path, read_size)):
+                # At most two blocks per worker in flight, so memory stays bounded
+                if not free_segments and len(segments) < processes * 2:
+                    segments.append(shared_memory.SharedMemory(create=True, size=2 * read_size))
+                    free_segments.append(segments[-1])
+                while not free_segments:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        block_ranges.update([future.result()])
+                        free_segments.append(running.pop(future))
+
+                segment = free_segments.pop()
+                if segment.size < len(block):
+                    # A line longer than the read window, the block needs a bigger segment
+                    segment = shared_memory.SharedMemory(create=True, size=len(block))
+                    segments.append(segment)
+                segment.buf[:len(block)] = block
+                running[executor.submit(filter_block, block_no, segment.name, len(block), min_year, max_year, fields,
+                                        shard_directory)] = segment
+            block_ranges.update(future.result() for future in running)
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    written = merge_shards(block_ranges, output_directory)
+    shutil.rmtree(shard_directory)
+    for year in sorted(written):
+        print(f"✅ {year}: {written[year]} records")
+    return written
+
+
 # 逐行讀取與解析 zst 中的 JSON lines
 def preview_zst_file(path, limit=10):
     if not os.path.exists(path):
         print(f"❌ File not found: {path}")
         return
 
-    with open(path, 'rb') as f:
-        dctx = zstd.ZstdDecompressor()
-        with dctx.stream_reader(f) as reader:
-            buffer = b""
-            count = 0
-
-            for chunk in iter(lambda: reader.read(8192), b""):
-                buffer += chunk
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    try:
-                        obj = json.loads(line.decode("utf-8"))
-                        print(json.dumps(obj, indent=2))  # 印出完整 JSON 結構
-                        count += 1
-                        if count >= limit:
-                            print("\n✅ Preview done.")
-                            return
-                    except Exception as e:
-                        print(f"⚠️ Error parsing line: {e}")
+    count = 0
+    for line in iter_zst_lines(path):
+        try:
+            obj = loads(line)
+        except ValueError as e:
+            print(f"⚠️ Error parsing line: {e}")
+            continue
+        print(json.dumps(obj, indent=2))  # 印出完整 JSON 結構
+        count += 1
+        if count >= limit:
+            print("\n✅ Preview done.")
+            return
 
 if __name__ == "__main__":
     preview_zst_file(zst_path, PREVIEW_LIMIT)
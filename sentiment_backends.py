@@ -0,0 +1,120 @@
+import os
+import re
+
+import numpy as np
+
+try:
+    import torch
+except ImportError:  # only needed when texts are actually scored
+    torch = None
+
+try:
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+except ImportError:  # only needed for the onnx backends
+    onnxruntime = None
+
+# Inference backends of SentimentEngine. Each one takes padded input_ids / attention_mask arrays
+# and returns the logits as a numpy array, so the batching in sentiment_engine stays the same.
+#   torch      the fp32 PyTorch model (reference scores)
+#   int8       PyTorch dynamic quantization: Linear weights in int8, activations quantized per batch
+#   onnx       the model exported to an ONNX Runtime graph (dat/onnx), fp32
+#   onnx-int8  the exported graph with dynamically quantized int8 weights
+# bench_sentiment_backends.py compares their speed, memory and agreement with the fp32 star ratings.
+
+ONNX_DIRECTORY = os.path.join('dat', 'onnx')
+ONNX_OPSET = 17
+
+
+def require_onnxruntime():
+    if onnxruntime is None:
+        raise ImportError("The onnx backends require the onnxruntime and onnx packages.")
+
+
+class TorchBackend:
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, input_ids, attention_mask):
+        with torch.inference_mode():
+            logits = self.model(input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask)).logits
+        return logits.float().numpy()
+
+
+class Int8Backend(TorchBackend):
+    def __init__(self, model):
+        # Quantized in place, the fp32 Linear weights are not kept alongside the int8 ones
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        super().__init__(model)
+
+
+class LogitsOnly(torch.nn.Module if torch is not None else object):
+    # Export wrapper: the graph returns the logits tensor instead of a ModelOutput
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def export_onnx(model, path):
+    # Exports the model once, batch size and sequence length stay dynamic
+    require_onnxruntime()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    example = torch.ones((2, 8), dtype=torch.long)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with torch.inference_mode():
+        torch.onnx.export(
+            LogitsOnly(model).eval(), (example, example), temp_path,
+            input_names=['input_ids', 'attention_mask'], output_names=['logits'],
+            dynamic_axes={'input_ids': {0: 'batch', 1: 'sequence'}, 'attention_mask': {0: 'batch', 1: 'sequence'},
+                          'logits': {0: 'batch'}},
+            opset_version=ONNX_OPSET, dynamo=False,
+        )
+    os.replace(temp_path, path)
+
+
+def onnx_path(model_id, quantized=False, directory=ONNX_DIRECTORY):
+    # One directory per model identity, so a new model revision is exported again
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', model_id)
+    return os.path.join(directory, name, 'model.int8.onnx' if quantized else 'model.onnx')
+
+
+class OnnxBackend:
+    def __init__(self, model, model_id, num_threads=None, quantized=False, directory=ONNX_DIRECTORY):
+        require_onnxruntime()
+        path = onnx_path(model_id, quantized, directory)
+        if not os.path.exists(path):
+            fp32_path = onnx_path(model_id, False, directory)
+            if not os.path.exists(fp32_path):
+                export_onnx(model, fp32_path)
+            if quantized:
+                quantize_dynamic(fp32_path, path + '.tmp', weight_type=QuantType.QInt8)
+                os.replace(path + '.tmp', path)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads or os.cpu_count()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = path
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_ids, attention_mask):
+        return self.session.run(['logits'], {'input_ids': input_ids, 'attention_mask': attention_mask})[0]
+
+
+BACKENDS = ['torch', 'int8', 'onnx', 'onnx-int8']
+
+
+def make_backend(name, model, model_id, num_threads=None):
+    if name == 'torch':
+        return TorchBackend(model)
+    if name == 'int8':
+        return Int8Backend(model)
+    if name in ('onnx', 'onnx-int8'):
+        return OnnxBackend(model, model_id, num_threads, quantized=name == 'onnx-int8')
+    raise ValueError(f"Unknown sentiment backend {name!r}, expected one of {BACKENDS}")
+
+
+def softmax(logits):
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return (shifted / shifted.sum(axis=1, keepdims=True)).astype(np.float32)
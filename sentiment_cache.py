@@ -0,0 +1,86 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+# Persistent sentiment scores, shared by the bios, news articles and Reddit posts.
+# A score is keyed by the sha256 of the text and the identity of the model that produced it
+# (name, revision, truncation length), so a rerun only scores texts that are new or changed
+# and scores of another model or model version are never mixed in.
+
+CACHE_PATH = "dat/sentiment_cache.db"
+QUERY_CHUNK = 500  # digests per SELECT, stays below SQLite's variable limit
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+
+def model_identity(model_name, model, max_length):
+    # Hub models carry their commit hash, other models are identified by a hash of their weights
+    revision = getattr(model.config, '_commit_hash', None)
+    if not revision:
+        weights = hashlib.sha256()
+        for name, tensor in model.state_dict().items():
+            if hasattr(tensor, 'numpy'):
+                weights.update(name.encode('utf-8'))
+                weights.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+        revision = weights.hexdigest()[:16]
+    return f"{model_name}@{revision}/max_length={max_length}"
+
+
+class ScoreCache:
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        with self.connection:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS scores (
+                    model_id TEXT NOT NULL,
+                    digest BLOB NOT NULL,
+                    scores BLOB NOT NULL,
+                    PRIMARY KEY (model_id, digest)
+                ) WITHOUT ROWID""")
+
+    def get_many(self, model_id, digests):
+        # Returns {digest: float32 scores} for the digests that are cached
+        found = {}
+        unique = list(dict.fromkeys(digests))
+        with self.lock:
+            for start in range(0, len(unique), QUERY_CHUNK):
+                chunk = unique[start:start + QUERY_CHUNK]
+                rows = self.connection.execute(
+                    f"SELECT digest, scores FROM scores WHERE model_id = ? AND digest IN ({','.join('?' * len(chunk))})",
+                    [model_id] + chunk,
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=np.float32)
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model_id, digests, scores):
+        # Stores the scores of a batch in one transaction
+        scores = np.asarray(scores, dtype=np.float32)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO scores VALUES (?, ?, ?)',
+                [(model_id, digest, row.tobytes()) for digest, row in zip(digests, scores)],
+            )
+
+    def count(self, model_id=None):
+        if model_id is None:
+            return self.connection.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+        return self.connection.execute('SELECT COUNT(*) FROM scores WHERE model_id = ?', (model_id,)).fetchone()[0]
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,174 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+from nfl_jsonl_store import JsonlStore
+from sentiment_engine import SCORE_COLUMNS, add_score_columns
+
+# Sentiment of documents longer than the model's 512 tokens (NFL.com articles).
+# Every document is tokenized once, without truncation, and cut into overlapping windows of token ids.
+# The windows of many documents go through SentimentEngine.score_ids together, so they share
+# length-bucketed batches. Window scores are averaged per document (weighted by window length)
+# and per player mention (the windows that contain the mention).
+
+ARTICLES_TXT_PATH = "dat/nfl_news_articles.txt"
+ARTICLE_SEPARATOR = "=" * 80
+WINDOW_OVERLAP = 128  # tokens shared by neighbouring windows
+CHUNK_DOCUMENTS = 500  # documents windowed and scored together
+
+
+def read_articles_txt(path=ARTICLES_TXT_PATH):
+    # Articles saved by web_scrap.py: "URL: ..." then the text, articles separated by a line of "="
+    with open(path, 'r', encoding='utf-8') as f:
+        blocks = f.read().split(ARTICLE_SEPARATOR)
+    rows = []
+    for block in blocks:
+        block = block.strip()
+        if not block.startswith("URL: "):
+            continue
+        first_line, _, content = block.partition("\n")
+        rows.append({'url': first_line[len("URL: "):].strip(), 'content': content.strip()})
+    return pd.DataFrame(rows, columns=['url', 'content'])
+
+
+def read_articles_jsonl(path):
+    # Articles of nfl_article_downloader.py / nfl_scrap_article_by_year.py (url, date, content)
+    return pd.DataFrame(list(JsonlStore(path)))
+
+
+def window_starts(length, body, stride):
+    # Token offsets of the windows covering a document, the last window ends at the document's end
+    if length <= body:
+        return [0]
+    starts = list(range(0, length - body + 1, stride))
+    if starts[-1] + body < length:
+        starts.append(length - body)
+    return starts
+
+
+def with_special_tokens(tokenizer, ids):
+    # [CLS] ids [SEP] for BERT, <s> ids </s> for tokenizers that use bos/eos instead
+    first = tokenizer.cls_token_id if tokenizer.cls_token_id is not None else tokenizer.bos_token_id
+    last = tokenizer.sep_token_id if tokenizer.sep_token_id is not None else tokenizer.eos_token_id
+    return [first] + list(ids) + [last]
+
+
+def window_digest(ids):
+    return hashlib.sha256(np.asarray(ids, dtype=np.int32).tobytes()).digest()
+
+
+class DocumentWindows:
+    # Overlapping windows of one chunk of documents
+    def __init__(self, engine, texts, overlap=WINDOW_OVERLAP):
+        tokenizer = engine.tokenizer
+        body = engine.max_length - 2
+        stride = max(body - overlap, 1)
+        encoded = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        self.token_starts = [np.array([start for start, _ in offsets], dtype=np.int64)
+                             for offsets in encoded['offset_mapping']]
+        self.window_ids = []
+        documents, starts, ends = [], [], []
+        self.first_window = np.zeros(len(texts) + 1, dtype=np.int64)
+        for document, ids in enumerate(encoded['input_ids']):
+            for start in window_starts(len(ids), body, stride):
+                end = min(start + body, len(ids))
+                self.window_ids.append(with_special_tokens(tokenizer, ids[start:end]))
+                documents.append(document)
+                starts.append(start)
+                ends.append(end)
+            self.first_window[document + 1] = len(self.window_ids)
+        self.document = np.array(documents, dtype=np.int64)
+        self.start = np.array(starts, dtype=np.int64)
+        self.end = np.array(ends, dtype=np.int64)
+
+    def score(self, engine):
+        # Scores of every window, through the score cache when the engine has one
+        if engine.cache is None:
+            return engine.score_ids(self.window_ids)
+        digests = [window_digest(ids) for ids in self.window_ids]
+        return engine.score_keyed(digests, self.window_ids, engine.score_ids)
+
+    def document_scores(self, scores, count):
+        # Length weighted mean of the window scores of each document
+        weights = np.maximum(self.end - self.start, 1).astype(np.float64)
+        totals = np.stack([np.bincount(self.document, weights=weights * scores[:, k], minlength=count)
+                           for k in range(scores.shape[1])], axis=1)
+        return (totals / np.bincount(self.document, weights=weights, minlength=count)[:, None]).astype(np.float32)
+
+    def windows_at(self, document, token):
+        # Windows of a document that contain a token position
+        first, last = self.first_window[document], self.first_window[document + 1]
+        inside = (self.start[first:last] <= token) & (token < self.end[first:last])
+        return np.arange(first, last)[inside]
+
+
+def player_pattern(players):
+    # One case-insensitive alternation over all names, longest first so "Josh Allen" wins over "Allen"
+    names = sorted({name for name in players if isinstance(name, str) and name}, key=len, reverse=True)
+    return re.compile(r'\b(' + '|'.join(re.escape(name) for name in names) + r')\b', re.IGNORECASE)
+
+
+def empty_mentions():
+    # Mention frame without rows, with the dtypes of a filled one
+    columns = {'document': 'int64', 'player': 'object', 'mentions': 'int64'}
+    columns.update({column: 'float64' for column in SCORE_COLUMNS})
+    columns['star_rating'] = 'int64'
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in columns.items()})
+
+
+def mention_scores(windows, scores, texts, players, offset=0):
+    # Mean score of the windows around each mention, averaged per (document, player)
+    columns = ['document', 'player', 'mentions'] + SCORE_COLUMNS
+    if not any(isinstance(name, str) and name for name in players):
+        return empty_mentions()
+    pattern = player_pattern(players)
+    canonical = {name.lower(): name for name in players if isinstance(name, str)}
+    rows = []
+    for document, text in enumerate(texts):
+        by_player = {}
+        for match in pattern.finditer(text):
+            token = np.searchsorted(windows.token_starts[document], match.start(), side='right') - 1
+            around = windows.windows_at(document, max(token, 0))
+            if len(around):
+                by_player.setdefault(canonical[match.group(1).lower()], []).append(scores[around].mean(axis=0))
+        for player, vectors in by_player.items():
+            rows.append([offset + document, player, len(vectors)] + np.mean(vectors, axis=0).tolist())
+    if not rows:
+        return empty_mentions()
+    mentions = pd.DataFrame(rows, columns=columns)
+    mentions['star_rating'] = mentions[SCORE_COLUMNS].to_numpy().argmax(axis=1) + 1
+    return mentions
+
+
+def score_documents(engine, texts, players=None, overlap=WINDOW_OVERLAP, chunk_documents=CHUNK_DOCUMENTS):
+    # Returns (document scores (n, 5), windows per document, per player mention scores or None)
+    texts = ["" if not isinstance(text, str) else text for text in texts]
+    document_scores, window_counts, mentions = [], [], []
+    for offset in range(0, len(texts), chunk_documents):
+        chunk = texts[offset:offset + chunk_documents]
+        windows = DocumentWindows(engine, chunk, overlap)
+        scores = windows.score(engine)
+        document_scores.append(windows.document_scores(scores, len(chunk)))
+        window_counts.append(np.diff(windows.first_window))
+        if players is not None:
+            mentions.append(mention_scores(windows, scores, chunk, players, offset))
+    if not texts:
+        mentions = empty_mentions() if players is not None else None
+        return np.zeros((0, len(SCORE_COLUMNS)), dtype=np.float32), np.zeros(0, dtype=np.int64), mentions
+    mentions = pd.concat(mentions, ignore_index=True) if players is not None else None
+    return np.concatenate(document_scores), np.concatenate(window_counts), mentions
+
+
+def score_articles_frame(engine, df, text_column='content', players=None, overlap=WINDOW_OVERLAP):
+    # Adds star_rating, score_1..score_5 and windows to a copy of df. With players also returns
+    # the per mention scores, keyed by the row's position in df (document) and the player's name.
+    scores, window_counts, mentions = score_documents(engine, df[text_column].tolist(), players, overlap)
+    scored = add_score_columns(df, scores)
+    scored['windows'] = window_counts
+    if players is None:
+        return scored
+    if 'url' in df.columns:
+        mentions.insert(1, 'url', df['url'].to_numpy()[mentions['document'].to_numpy()])
+    return scored, mentions
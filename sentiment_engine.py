@@ -0,0 +1,168 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from sentiment_backends import make_backend, softmax
+from sentiment_cache import model_identity, text_digest
+
+try:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+except ImportError:  # only needed when texts are actually scored
+    torch = None
+
+# Batched CPU inference for the nlptown 1-5 star sentiment model used in sentiment.ipynb.
+# Texts are tokenized in one call, sorted by length and grouped into batches under a token budget,
+# so every batch is padded only to its own longest text. The forward passes run under
+# torch.inference_mode with an explicit thread count, and the scores come back as one array.
+# With a sentiment_cache.ScoreCache only texts without a stored score for this model are scored.
+# backend picks fp32 PyTorch or one of the int8 / ONNX Runtime backends of sentiment_backends.
+
+MODEL_NAME = "nlptown/bert-base-multilingual-uncased-sentiment"
+SCORE_COLUMNS = ['score_1', 'score_2', 'score_3', 'score_4', 'score_5']
+MAX_LENGTH = 512
+BATCH_TOKENS = 2048  # rows x padded length per forward pass, larger pays off with more threads
+MAX_BATCH_SIZE = 64
+CHUNK_SIZE = 10000  # texts tokenized and scored together, bounds memory on millions of posts
+
+
+def require_torch():
+    if torch is None:
+        raise ImportError("Sentiment scoring requires the torch and transformers packages.")
+
+
+def set_threads(num_threads=None):
+    # Intra-op threads of the forward pass, all cores by default
+    require_torch()
+    torch.set_num_threads(num_threads or os.cpu_count())
+    return torch.get_num_threads()
+
+
+def length_batches(lengths, batch_tokens=BATCH_TOKENS, max_batch_size=MAX_BATCH_SIZE):
+    # Groups positions of similar length, longest first, so padding stays small
+    order = np.argsort(lengths, kind='stable')[::-1]
+    batches = []
+    batch = []
+    longest = 0
+    for position in order:
+        longest = max(longest, lengths[position])
+        if batch and (len(batch) + 1 > max_batch_size or (len(batch) + 1) * longest > batch_tokens):
+            batches.append(batch)
+            batch = []
+            longest = lengths[position]
+        batch.append(position)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def clean_texts(texts):
+    # Missing texts are scored as empty strings
+    return ["" if text is None or (isinstance(text, float) and np.isnan(text)) else str(text) for text in texts]
+
+
+class SentimentEngine:
+    def __init__(self, model_name=MODEL_NAME, num_threads=None, max_length=MAX_LENGTH, batch_tokens=BATCH_TOKENS,
+                 max_batch_size=MAX_BATCH_SIZE, tokenizer=None, model=None, cache=None, backend='torch'):
+        require_torch()
+        self.model_name = model_name
+        self.max_length = max_length
+        self.batch_tokens = batch_tokens
+        self.max_batch_size = max_batch_size
+        self.num_threads = set_threads(num_threads)
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_name)
+        self.model = model if model is not None else AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        self.num_labels = self.model.config.num_labels
+        self.cache = cache
+        self.backend_name = backend
+        self.model_id = None
+        base_id = None
+        if cache is not None or backend.startswith('onnx'):
+            # Identity of the fp32 weights, the backend is appended since int8 scores differ slightly
+            base_id = model_identity(model_name, self.model, max_length)
+            self.model_id = base_id if backend == 'torch' else f"{base_id}/{backend}"
+        self.backend = make_backend(backend, self.model, base_id, self.num_threads)
+        if backend.startswith('onnx'):
+            # The exported graph replaces the PyTorch model, free its weights
+            self.model = None
+
+    def tokenize(self, texts):
+        # One batched call into the (Rust) fast tokenizer, no padding yet
+        return self.tokenizer(clean_texts(texts), truncation=True, max_length=self.max_length)['input_ids']
+
+    def forward(self, batch_ids):
+        # Softmax scores of one batch, padded to its longest sequence
+        inputs = self.tokenizer.pad({'input_ids': batch_ids}, return_tensors='np')
+        logits = self.backend(inputs['input_ids'].astype(np.int64), inputs['attention_mask'].astype(np.int64))
+        return softmax(logits)
+
+    def score_ids(self, input_ids):
+        # Scores of already tokenized texts, in input order
+        scores = np.zeros((len(input_ids), self.num_labels), dtype=np.float32)
+        lengths = np.array([len(ids) for ids in input_ids])
+        for batch in length_batches(lengths, self.batch_tokens, self.max_batch_size):
+            scores[batch] = self.forward([input_ids[position] for position in batch])
+        return scores
+
+    def score(self, texts, chunk_size=CHUNK_SIZE):
+        # (n, 5) array of star probabilities for any number of texts
+        texts = clean_texts(texts)
+        if not texts:
+            return np.zeros((0, self.num_labels), dtype=np.float32)
+        score_chunk = self.score_cached if self.cache is not None else self.score_uncached
+        chunks = [score_chunk(texts[start:start + chunk_size]) for start in range(0, len(texts), chunk_size)]
+        return np.concatenate(chunks)
+
+    def score_uncached(self, texts):
+        return self.score_ids(self.tokenize(texts))
+
+    def score_cached(self, texts):
+        # Scores only the distinct texts the cache does not know yet, and stores them per chunk
+        return self.score_keyed([text_digest(text) for text in texts], texts, self.score_uncached)
+
+    def score_keyed(self, digests, items, score_items):
+        # Cache lookup for any scorable items (texts, token windows) under their digests
+        known = self.cache.get_many(self.model_id, digests)
+        missing = {}
+        for digest, item in zip(digests, items):
+            if digest not in known and digest not in missing:
+                missing[digest] = item
+        if missing:
+            scores = score_items(list(missing.values()))
+            self.cache.put_many(self.model_id, list(missing), scores)
+            known.update(zip(missing, scores))
+        return np.stack([known[digest] for digest in digests])
+
+    def score_frame(self, df, text_column, chunk_size=CHUNK_SIZE):
+        # Adds star_rating and score_1..score_5 to a copy of df
+        scores = self.score(df[text_column].tolist(), chunk_size)
+        return add_score_columns(df, scores)
+
+    def get_multiclass_sentiment(self, text):
+        # Same result as the notebook's per-text function: (stars, [score_1, ..., score_5])
+        scores = self.score([text])[0]
+        return int(scores.argmax()) + 1, scores.tolist()
+
+
+def add_score_columns(df, scores):
+    df = df.copy()
+    df['star_rating'] = scores.argmax(axis=1) + 1
+    df[SCORE_COLUMNS] = pd.DataFrame(scores, index=df.index, columns=SCORE_COLUMNS)
+    return df
+
+
+# Engine behind get_multiclass_sentiment, created on first use
+default_engine = None
+
+
+def get_engine():
+    global default_engine
+    if default_engine is None:
+        default_engine = SentimentEngine()
+    return default_engine
+
+
+def get_multiclass_sentiment(text):
+    return get_engine().get_multiclass_sentiment(text)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nfl_feature_store import FeatureStore
+from nfl_features import add_rolling_features
+
+pytest.importorskip('pyarrow')
+
+SPECS = [
+    ('y_mean_last_3', 'y', 'mean', 3),
+    ('y_std_last_5', 'y', 'std', 5),
+    ('y_sum_career', 'y', 'sum', None),
+]
+
+
+def game_log(seasons=(2019, 2020, 2021), weeks=6, players=5, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [(f'00-{player:07d}', season, week) for season in seasons for week in range(1, weeks + 1)
+            for player in range(players) if rng.random() < 0.9]
+    df = pd.DataFrame(rows, columns=['gsis_id', 'season', 'week'])
+    df['y'] = rng.normal(size=len(df)).round(3)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def expected(df):
+    return add_rolling_features(df, SPECS).reset_index(drop=True)
+
+
+def assert_same_features(result, df):
+    reference = expected(df)
+    columns = ['gsis_id', 'season', 'week', 'career_game_number'] + [name for name, _, _, _ in SPECS]
+    pd.testing.assert_frame_equal(result[columns].reset_index(drop=True), reference[columns], check_dtype=False)
+
+
+def test_weekly_updates_match_a_full_computation(tmp_path):
+    df = game_log()
+    store = FeatureStore(str(tmp_path), SPECS)
+    week_keys = df['season'] * 100 + df['week']
+    for key in sorted(week_keys.unique()):
+        result = store.update(df[week_keys <= key])
+    assert store.parts == week_keys.nunique()
+    assert_same_features(result, df)
+    # Reopened from disk, nothing new to add and only each player's last game is hashed
+    store = FeatureStore(str(tmp_path), SPECS)
+    hashed = []
+    row_digests = store.row_digests
+    store.row_digests = lambda rows: hashed.append(len(rows)) or row_digests(rows)
+    assert_same_features(store.update(df), df)
+    assert hashed == [df['gsis_id'].nunique()]
+
+
+def test_seasons_read_only_their_parts(tmp_path):
+    df = game_log()
+    store = FeatureStore(str(tmp_path), SPECS)
+    for season in (2019, 2020, 2021):
+        store.update(df[df['season'] <= season])
+    result = store.update(df, seasons=[2020])
+    assert set(result['season']) == {2020}
+    full = expected(df)
+    pd.testing.assert_frame_equal(result[full.columns], full[full['season'] == 2020].reset_index(drop=True),
+                                  check_dtype=False)
+    assert len(store.load(seasons=[2021])) == (df['season'] == 2021).sum()
+
+
+@pytest.mark.parametrize('change', ['edit_last', 'remove', 'add_earlier'])
+def test_changed_stored_games_rebuild_the_store(tmp_path, change):
+    df = game_log()
+    store = FeatureStore(str(tmp_path), SPECS)
+    store.update(df[df['season'] < 2021])
+    player = df['gsis_id'].iloc[0]
+    games = df[(df['gsis_id'] == player) & (df['season'] < 2021)].sort_values(['season', 'week'])
+    if change == 'edit_last':
+        df.loc[games.index[-1], 'y'] += 1
+    elif change == 'remove':
+        df = df.drop(games.index[1])
+    else:
+        df = pd.concat([df, pd.DataFrame({'gsis_id': [player], 'season': [2018], 'week': [1], 'y': [2.0]})],
+                       ignore_index=True)
+    assert_same_features(store.update(df), df)
+
+
+def test_older_edits_are_found_when_verifying(tmp_path):
+    df = game_log()
+    store = FeatureStore(str(tmp_path), SPECS)
+    store.update(df)
+    df.loc[df['season'] == 2019, 'y'] += 1
+    assert not len(store.changed_players(df))
+    assert len(store.changed_players(df, verify=True))
+    assert_same_features(store.update(df, verify=True), df)
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from nfl_fetcher import PageFetcher
+from nfl_scraper_functions import NFLDataScraper
+
+# PageFetcher and NFLDataScraper against a local stand-in for NFL.com on 127.0.0.1
+
+STATS_PATH = '/stats/player-stats/category/passing/2023/reg/all/passingyards/desc'
+PAGE_TEMPLATE = """<html><body>
+<table class="d3-o-table d3-o-player-stats--detailed">
+<thead><tr><th>Player</th><th>Team</th><th>Pass Yds</th><th>Lng</th></tr></thead>
+<tbody>{rows}</tbody>
+</table>{next_link}</body></html>"""
+
+
+def stats_page(page, pages, rows_per_page=3):
+    rows = ''.join(f'<tr><td>Player {page}-{row}</td><td>KCKC</td><td>1,{page}{row}0</td><td>7{row}T</td></tr>'
+                   for row in range(rows_per_page))
+    next_link = ''
+    if page + 1 < pages:
+        next_link = (f'<a class="nfl-o-table-pagination__next" '
+                     f'href="{STATS_PATH}?aftercursor=c{page}&amp;page={page + 1}">Next Page</a>')
+    return PAGE_TEMPLATE.format(rows=rows, next_link=next_link).encode('utf-8')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive HTTP/1.1 so the client can reuse its pooled connections
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1], time.monotonic()))
+        body = self.server.pages.get(self.path)
+        status = 200 if body is not None else 404
+        body = body if body is not None else b'not found'
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.requests = []
+    server.pages = {f'/page/{i}': b'ok' for i in range(12)}
+    server.pages[STATS_PATH] = stats_page(0, 3)
+    for page in (1, 2):
+        server.pages[f'{STATS_PATH}?aftercursor=c{page - 1}&page={page}'] = stats_page(page, 3)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_pooled(stand_in):
+    with PageFetcher(max_workers=2, requests_per_second=None) as fetcher:
+        urls = [f'{stand_in.base_url}/page/{i}' for i in range(12)]
+        responses = list(fetcher.fetch_many(urls))
+    assert [response.status_code for _, response in responses] == [200] * 12
+    # 12 requests over at most one keep-alive connection per worker
+    assert len({port for _, port, _ in stand_in.requests}) <= 2
+
+
+def test_requests_are_rate_limited(stand_in):
+    with PageFetcher(max_workers=4, requests_per_second=20) as fetcher:
+        list(fetcher.fetch_many(f'{stand_in.base_url}/page/{i}' for i in range(6)))
+    times = sorted(at for _, _, at in stand_in.requests)
+    # Six slots 1/20 s apart, whatever the number of workers
+    assert times[-1] - times[0] >= 5 / 20 * 0.9
+    assert min(b - a for a, b in zip(times, times[1:])) >= 1 / 20 * 0.5
+
+
+def test_scraper_walks_the_next_page_links(stand_in, tmp_path):
+    with PageFetcher(max_workers=2, requests_per_second=None) as fetcher:
+        scraper = NFLDataScraper(fetcher=fetcher, base_url=stand_in.base_url)
+        scraper.season = 2023
+        unit_links = {'individual': {'passing': stand_in.base_url + STATS_PATH}}
+        complete = scraper.scrape_and_process_data('individual', 'passing', 'player', str(tmp_path), unit_links)
+    assert complete
+    # Every page is downloaded exactly once, in chain order
+    paths = [path for path, _, _ in stand_in.requests]
+    assert paths == [STATS_PATH, f'{STATS_PATH}?aftercursor=c0&page=1', f'{STATS_PATH}?aftercursor=c1&page=2']
+    df = pd.read_csv(os.path.join(tmp_path, 'passing.csv'), dtype=str)
+    assert len(df) == 9
+    assert df['Player'].tolist()[:3] == ['Player 0-0', 'Player 0-1', 'Player 0-2']
+    assert set(df['Team']) == {'KC'}
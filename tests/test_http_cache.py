@@ -0,0 +1,56 @@
+import os
+
+from nfl_http_cache import FOREVER, CachedResponse, ResponseCache, TTLPolicy
+
+
+def stored_bodies(cache):
+    return sorted(name for _, _, names in os.walk(cache.objects_directory) for name in names)
+
+
+def test_fresh_and_stale_lookups(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_policy=lambda url: FOREVER if 'final' in url else -1)
+    cache.store('https://x/final', CachedResponse('https://x/final', 200, b'final page',
+                                                  {'ETag': '"abc"', 'Content-Type': 'text/html'}))
+    cache.store('https://x/live', CachedResponse('https://x/live', 200, b'live page'))
+    response, is_fresh, validators = cache.lookup('https://x/final')
+    assert (response.content, is_fresh, validators) == (b'final page', True, {'If-None-Match': '"abc"'})
+    response, is_fresh, _ = cache.lookup('https://x/live')
+    assert (response.content, is_fresh) == (b'live page', False)
+    assert cache.lookup('https://x/missing') == (None, False, {})
+    cache.close()
+
+
+def test_identical_bodies_are_stored_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for url in ('https://x/a', 'https://x/b'):
+        cache.store(url, CachedResponse(url, 200, b'same body'))
+    assert len(stored_bodies(cache)) == 1
+    assert cache.total_bytes() == len(b'same body')
+    cache.close()
+
+
+def test_changed_pages_do_not_leave_old_bodies(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    for version in range(10):
+        cache.store('https://x/current', CachedResponse('https://x/current', 200, b'%03d' % version * 30))
+    assert len(stored_bodies(cache)) == 1
+    assert cache.total_bytes() == 90
+    assert cache.lookup('https://x/current')[0].content == b'009' * 30
+    cache.close()
+
+
+def test_eviction_drops_least_recently_used_urls(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    for name in ('a', 'b', 'c'):
+        cache.store(f'https://x/{name}', CachedResponse(name, 200, name.encode() * 100))
+        cache.lookup('https://x/a')
+    assert cache.total_bytes() <= 250
+    assert cache.lookup('https://x/b')[0] is None
+    assert cache.lookup('https://x/a')[0].content == b'a' * 100
+    cache.close()
+
+
+def test_historic_seasons_never_expire():
+    policy = TTLPolicy(current_season=2023)
+    assert policy('https://www.nfl.com/stats/player-stats/category/passing/2019/reg/all/x') is FOREVER
+    assert policy('https://www.nfl.com/stats/player-stats/category/passing/2023/reg/all/x') is not FOREVER
@@ -0,0 +1,83 @@
+import json
+import time
+
+import pytest
+
+import nfl_article_downloader
+from nfl_jsonl_store import JsonlStore
+
+
+def records(count, start=0):
+    return [{'url': f'https://x/{i}', 'content': 'body ' * i} for i in range(start, start + count)]
+
+
+def test_append_skips_stored_keys(tmp_path):
+    store = JsonlStore(str(tmp_path / 'a.jsonl'))
+    assert len(store.append(records(3))) == 3
+    assert len(store.append(records(4))) == 1
+    reopened = JsonlStore(str(tmp_path / 'a.jsonl'))
+    assert len(reopened) == 4 and 'https://x/3' in reopened
+    assert [record['url'] for record in reopened] == [f'https://x/{i}' for i in range(4)]
+
+
+def test_torn_tail_is_cut_off_on_open(tmp_path):
+    path = str(tmp_path / 'a.jsonl')
+    JsonlStore(path).append(records(3))
+    # A crash in the middle of the next append: one complete record past the checkpoint, one torn
+    with open(path, 'ab') as f:
+        f.write((json.dumps(records(1, 3)[0]) + '\n').encode('utf-8'))
+        f.write(b'{"url": "https://x/4", "cont')
+    store = JsonlStore(path)
+    assert len(store) == 4 and 'https://x/4' not in store
+    assert [record['url'] for record in store] == [f'https://x/{i}' for i in range(4)]
+    with open(path, 'rb') as f:
+        assert f.read().endswith(b'}\n')
+    assert len(store.append(records(2, 4))) == 2
+    assert len(JsonlStore(path)) == 6
+
+
+def test_replaced_data_file_rebuilds_the_index(tmp_path):
+    path = str(tmp_path / 'a.jsonl')
+    JsonlStore(path).append(records(3))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(records(1)[0]) + '\n')
+    store = JsonlStore(path)
+    assert len(store) == 1 and 'https://x/2' not in store
+
+
+def test_legacy_json_array_is_migrated_once(tmp_path):
+    legacy = tmp_path / 'links.json'
+    legacy.write_text(json.dumps(records(2)), encoding='utf-8')
+    assert nfl_article_downloader.load_links(str(tmp_path / 'links.jsonl'), str(legacy)) == records(2)
+    assert not legacy.exists()
+    assert nfl_article_downloader.load_links(str(tmp_path / 'links.jsonl'), str(legacy)) == records(2)
+
+
+def test_downloaded_articles_survive_a_crash(tmp_path, monkeypatch):
+    links_path = str(tmp_path / 'links.jsonl')
+    articles_path = str(tmp_path / 'articles.jsonl')
+    JsonlStore(links_path).append([{'url': f'https://x/{i}'} for i in range(8)] + [{'url': 'https://x/bad'}])
+    monkeypatch.setattr(nfl_article_downloader, 'ERROR_LOG_PATH', str(tmp_path / 'errors.txt'))
+
+    def download_article(fetcher, link):
+        if link['url'] == 'https://x/bad':
+            raise ValueError('unparsable page')
+        if link['url'] == 'https://x/5':
+            time.sleep(0.2)
+            raise KeyboardInterrupt
+        return {'url': link['url'], 'content': 'text'}
+
+    monkeypatch.setattr(nfl_article_downloader, 'download_article', download_article)
+    with pytest.raises(KeyboardInterrupt):
+        nfl_article_downloader.download_articles(links_path, articles_path, max_workers=1, use_cache=False)
+    store = JsonlStore(articles_path)
+    assert {f'https://x/{i}' for i in range(5)} <= store.keys
+
+    # The rerun only downloads what is missing, a failing page does not stop the others
+    monkeypatch.setattr(nfl_article_downloader, 'download_article',
+                        lambda fetcher, link: download_article(fetcher, link) if link['url'] == 'https://x/bad'
+                        else {'url': link['url'], 'content': 'text'})
+    saved, failed = nfl_article_downloader.download_articles(links_path, articles_path, max_workers=2,
+                                                             use_cache=False)
+    assert failed == 1 and saved == 8 - len(store)
+    assert len(JsonlStore(articles_path)) == 8
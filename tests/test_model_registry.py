@@ -0,0 +1,91 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+import nfl_model_registry
+from nfl_feature_store import FeatureStore
+from nfl_position_models import EPA_FEATURE_NAMES, feature_matrix, position_config
+
+pytest.importorskip('pyarrow')
+
+# Posted raw game log rows get their rolling features from the game log and the feature store
+
+DROP = ['avg_epa', 'gsis_id', 'full_name', 'week']
+
+
+def game_log(weeks=6):
+    rng = np.random.default_rng(1)
+    rows = [(f'00-{player:07d}', f'Player {player}', ['KC', 'SF'][player % 2], 2023, week, '1995-05-17')
+            for week in range(1, weeks + 1) for player in range(4)]
+    df = pd.DataFrame(rows, columns=['gsis_id', 'full_name', 'team', 'season', 'week', 'birth_date'])
+    df['attempts'] = rng.integers(20, 40, len(df)).astype(float)
+    df['avg_epa'] = rng.normal(size=len(df)).round(3)
+    return df
+
+
+@pytest.fixture
+def predictor(tmp_path, monkeypatch):
+    df = game_log()
+    config = position_config('QB', {'csv': 'qb_stats.csv', 'drop_columns': DROP, 'fill_zero': EPA_FEATURE_NAMES,
+                                     'feature_store': str(tmp_path / 'features')})
+    monkeypatch.setattr(nfl_model_registry, 'load_position', lambda label, config: FeatureStore(
+        config['feature_store'], config['rolling_features']).update(df[df['week'] < 6]))
+    log = nfl_model_registry.load_position('QB', config)
+    X, columns = feature_matrix(log, DROP, EPA_FEATURE_NAMES, ['KC', 'SF'])
+    complete = np.isfinite(X).all(axis=1)
+    model = LinearRegression().fit(X[complete], log['avg_epa'].to_numpy()[complete])
+    result = {'config': config, 'vocabulary': ['KC', 'SF'], 'columns': columns, 'model': model,
+              'data_sha256': '0' * 64, 'metrics': {}}
+    nfl_model_registry.save_artifact('QB', result, str(tmp_path / 'models'))
+    predictor = nfl_model_registry.Predictor('QB', root=str(tmp_path / 'models'))
+    predictor.game_log()
+    return predictor, df, config
+
+
+def test_posted_rows_get_their_rolling_features(predictor, tmp_path):
+    predictor, df, config = predictor
+    names = predictor.store.feature_names()
+    # Next week, without the target, and a logged week
+    posted = pd.concat([df[df['week'] == 6].drop(columns=['avg_epa']), df[df['week'] == 3]], ignore_index=True)
+    rows = predictor.with_features(posted)
+    reference = FeatureStore(str(tmp_path / 'reference'), config['rolling_features']).update(df)
+    expected = posted[['gsis_id', 'week']].merge(reference, on=['gsis_id', 'week'], how='left')
+    np.testing.assert_allclose(rows[names].to_numpy(dtype=float), expected[names].to_numpy(dtype=float))
+    assert predictor.store.parts == 1
+    assert np.isfinite(predictor.project(rows)['predicted_avg_epa']).all()
+
+
+def test_missing_columns_are_listed_in_the_400(predictor):
+    predictor, df, _ = predictor
+    nfl_model_registry.PredictionHandler.predictors = {'QB': predictor}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), nfl_model_registry.PredictionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{server.server_address[1]}/predict/qb'
+
+        def post(records):
+            request = urllib.request.Request(url, data=json.dumps({'records': records}).encode('utf-8'))
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status, json.load(response)
+            except urllib.error.HTTPError as error:
+                return error.code, json.load(error)
+
+        records = df[df['week'] == 6].drop(columns=['avg_epa']).to_dict(orient='records')
+        status, body = post(records)
+        assert status == 200 and len(body['predictions']) == 4
+        assert all(prediction['predicted_avg_epa'] is not None for prediction in body['predictions'])
+        status, body = post([{key: value for key, value in record.items() if key not in ('attempts', 'birth_date')}
+                             for record in records])
+        assert status == 400 and "['attempts', 'birth_date']" in body['error']
+    finally:
+        server.shutdown()
+        server.server_close()
+        nfl_model_registry.PredictionHandler.predictors = {}
@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import Future
+
+import pandas as pd
+
+from nfl_scrape_manifest import ScrapeManifest
+from nfl_scraper_functions import NFLDataScraper
+
+# Resuming a category from its manifest, with an in-memory stand-in for the fetcher
+
+BASE_URL = 'https://stand-in'
+FIRST_PAGE = '/stats/player-stats/category/passing/2019/reg/all/passingyards/desc'
+
+
+class Response:
+    def __init__(self, status_code, content=b''):
+        self.status_code = status_code
+        self.content = content
+
+
+class PagesFetcher:
+    # Serves self.pages by url and records every request
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(url)
+        content = self.pages.get(url)
+        return Response(200, content) if content is not None else Response(404)
+
+    def submit(self, url):
+        future = Future()
+        future.set_result(self.get(url))
+        return future
+
+
+def page_url(page):
+    return BASE_URL + FIRST_PAGE + (f'?page={page}' if page else '')
+
+
+def stats_page(page, pages=3, label='a'):
+    rows = ''.join(f'<tr><td>{label} {page}-{row}</td><td>{100 * page + row}</td></tr>' for row in range(2))
+    next_link = (f'<a class="nfl-o-table-pagination__next" href="{FIRST_PAGE}?page={page + 1}">Next Page</a>'
+                 if page + 1 < pages else '')
+    return (f'<table class="d3-o-player-stats--detailed"><tr><th>Player</th><th>Pass Yds</th></tr>{rows}</table>'
+            f'{next_link}').encode('utf-8')
+
+
+def scrape(fetcher, directory):
+    scraper = NFLDataScraper(fetcher=fetcher, base_url=BASE_URL)
+    scraper.season = 2019
+    manifest = ScrapeManifest(directory, 2019, 'player')
+    unit_links = {'individual': {'passing': page_url(0)}}
+    return scraper.scrape_and_process_data('individual', 'passing', 'player', directory, unit_links, manifest)
+
+
+def players(directory):
+    return pd.read_csv(os.path.join(directory, 'passing.csv'), dtype=str)['Player'].tolist()
+
+
+def test_interrupted_category_resumes_after_its_last_page(tmp_path):
+    directory = str(tmp_path)
+    pages = {page_url(page): stats_page(page) for page in range(2)}
+    assert not scrape(PagesFetcher(pages), directory)
+
+    pages[page_url(2)] = stats_page(2)
+    fetcher = PagesFetcher(pages)
+    assert scrape(fetcher, directory)
+    # The last written page is checked once, then only the missing page is downloaded
+    assert fetcher.requests == [page_url(1), page_url(2)]
+    assert players(directory) == [f'a {page}-{row}' for page in range(3) for row in range(2)]
+
+    fetcher = PagesFetcher(pages)
+    assert scrape(fetcher, directory)
+    assert fetcher.requests == []
+
+
+def test_changed_last_page_restarts_the_category(tmp_path):
+    directory = str(tmp_path)
+    pages = {page_url(page): stats_page(page) for page in range(2)}
+    assert not scrape(PagesFetcher(pages), directory)
+
+    # The listing moved on while the scrape was stopped
+    pages = {page_url(page): stats_page(page, label='b') for page in range(3)}
+    fetcher = PagesFetcher(pages)
+    assert scrape(fetcher, directory)
+    assert fetcher.requests == [page_url(1), page_url(0), page_url(1), page_url(2)]
+    assert players(directory) == [f'b {page}-{row}' for page in range(3) for row in range(2)]
+
+
+def test_truncated_output_restarts_the_category(tmp_path):
+    directory = str(tmp_path)
+    pages = {page_url(page): stats_page(page) for page in range(2)}
+    assert not scrape(PagesFetcher(pages), directory)
+    with open(os.path.join(directory, 'passing.csv'), 'r+b') as f:
+        f.truncate(10)
+
+    pages[page_url(2)] = stats_page(2)
+    assert scrape(PagesFetcher(pages), directory)
+    assert players(directory) == [f'a {page}-{row}' for page in range(3) for row in range(2)]
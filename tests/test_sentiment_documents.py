@@ -0,0 +1,46 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from sentiment_documents import score_articles_frame
+
+# Windowing and mention scoring with a whitespace tokenizer and a fixed scorer in place of the model
+
+
+class Tokenizer:
+    cls_token_id, sep_token_id = 1, 2
+
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=True, verbose=False):
+        words = [list(re.finditer(r'\S+', text)) for text in texts]
+        return {'input_ids': [[10 + len(word.group()) for word in found] for found in words],
+                'offset_mapping': [[word.span() for word in found] for found in words]}
+
+
+class Engine:
+    tokenizer = Tokenizer()
+    max_length = 8
+    cache = None
+
+    def score_ids(self, input_ids):
+        # Four star windows
+        return np.tile(np.array([[0.1, 0.1, 0.1, 0.6, 0.1]], dtype=np.float32), (len(input_ids), 1))
+
+
+ARTICLES = pd.DataFrame({'url': ['https://x/0', 'https://x/1'],
+                         'content': ['Josh Allen threw for three scores', 'a quiet day']})
+
+
+def test_mentions_are_keyed_by_document_and_url():
+    scored, mentions = score_articles_frame(Engine(), ARTICLES, players=['Josh Allen'])
+    assert scored['star_rating'].tolist() == [4, 4]
+    assert mentions[['document', 'url', 'player', 'mentions', 'star_rating']].values.tolist() == [
+        [0, 'https://x/0', 'Josh Allen', 1, 4]]
+
+
+def test_empty_mentions_keep_their_dtypes():
+    for df, players in ((ARTICLES, []), (ARTICLES, ['Tom Brady']), (ARTICLES.iloc[:0], ['Josh Allen'])):
+        scored, mentions = score_articles_frame(Engine(), df, players=players)
+        assert len(scored) == len(df) and mentions.empty
+        assert str(mentions['document'].dtype) == 'int64' and str(mentions['star_rating'].dtype) == 'int64'
+        assert 'url' in mentions.columns
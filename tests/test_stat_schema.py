@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from nfl_stat_schema import normalize_frame, read_stats_csv
+from nfl_table_parsers import PARSERS, parse_stats_page
+
+PAGE = b"""<table class="d3-o-player-stats--detailed">
+<tr><th>Player</th><th>Team</th><th>Rush Yds</th><th>Att</th><th>Lng</th></tr>
+<tr><td>A</td><td>KCKC</td><td>1,234</td><td>250</td><td>75T</td></tr>
+<tr><td>B</td><td>SFSF</td><td>12</td><td>3</td><td>--</td></tr>
+</table>"""
+
+
+def frame(columns):
+    return pd.DataFrame(columns, dtype=object)
+
+
+@pytest.mark.parametrize('parser', sorted(name for name, parse in PARSERS.items() if name != 'lxml'))
+def test_pages_are_parsed_to_cell_text(parser):
+    df = parse_stats_page(PAGE, 'player', parser)
+    assert df.to_dict('list') == {'Player': ['A', 'B'], 'Team': ['KC', 'SF'], 'Rush Yds': ['1,234', '12'],
+                                  'Att': ['250', '3'], 'Lng': ['75T', '--']}
+
+
+def test_long_keeps_its_touchdown_flag():
+    df = normalize_frame(frame({'Player': ['A', 'B', 'C'], 'Lng': ['75T', '12', '--']}), 'rushing')
+    assert list(df.columns) == ['Player', 'Lng', 'lng_td']
+    assert str(df['Lng'].dtype) == 'Int16'
+    assert df['Lng'].tolist()[:2] == [75, 12] and df['Lng'].isna().tolist()[2]
+    assert df['lng_td'].tolist()[:2] == [True, False] and df['lng_td'].isna().tolist()[2]
+
+
+def test_declared_counts_are_not_rounded():
+    df = normalize_frame(frame({'Player': ['A', 'B'], 'Att': ['1.5', '2'], 'Rush Yds': ['1,234', '--']}), 'rushing')
+    assert str(df['Att'].dtype) == 'float32' and df['Att'].tolist() == [1.5, 2.0]
+    assert str(df['Rush Yds'].dtype) == 'Int32' and df['Rush Yds'].tolist()[0] == 1234
+
+
+def test_team_tables_are_inferred_not_declared():
+    df = normalize_frame(frame({'Team': ['KC', 'SF'], 'Att': ['30.5', '28'], 'Lng': ['75T', '40']}),
+                         'passing', level='team')
+    assert str(df['Team'].dtype) == 'category'
+    assert df['Att'].tolist() == [30.5, 28.0]
+    assert df['Lng'].tolist() == ['75T', '40']
+
+
+def test_read_stats_csv_types_the_raw_csv(tmp_path):
+    path = tmp_path / 'rushing.csv'
+    parse_stats_page(PAGE, 'player', 'stream').to_csv(path, index=False)
+    assert '75T' in path.read_text()
+    df = read_stats_csv(str(path))
+    assert df['Rush Yds'].tolist() == [1234, 12]
+    assert df['lng_td'].tolist()[0]
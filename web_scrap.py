@@ -1,7 +1,7 @@
 import os
-import requests
 from bs4 import BeautifulSoup
-import time
+from nfl_fetcher import PageFetcher
+from nfl_http_cache import ResponseCache
 
 # 1️⃣ Step 1: Retrieve all news article links from "https://www.nfl.com/news/all-news"
 base_url = "https://www.nfl.com"
@@ -11,6 +11,10 @@ headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
 }
 
+# Pages go through the shared on-disk cache, only uncached or stale pages hit NFL.com.
+# One request per second replaces the fixed sleep between articles, cached pages are not throttled.
+fetcher = PageFetcher(max_workers=1, requests_per_second=1, headers=headers, cache=ResponseCache())
+
 # Set the save path
 save_path = r"C:\rutgers\Data mining\project\nfl_news_articles.txt"
 
@@ -18,7 +22,7 @@ save_path = r"C:\rutgers\Data mining\project\nfl_news_articles.txt"
 os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
 # Send request to fetch the news page
-response = requests.get(base_url + news_page, headers=headers)
+response = fetcher.get(base_url + news_page)
 
 if response.status_code == 200:
     soup = BeautifulSoup(response.text, "html.parser")
@@ -40,7 +44,7 @@ else:
 
 # 2️⃣ Step 2: Scrape the content of each news article
 def scrape_article(url):
-    response = requests.get(url, headers=headers)
+    response = fetcher.get(url)
     if response.status_code == 200:
         soup = BeautifulSoup(response.text, "html.parser")
 
@@ -73,8 +77,6 @@ for idx, url in enumerate(article_urls):
     if article_text:
         all_articles[url] = article_text
 
-    time.sleep(1)  # Prevent excessive requests from being blocked
-
 # 4️⃣ Step 4: Save the articles to `C:\rutgers\Data mining\project\nfl_news_articles.txt`
 with open(save_path, "w", encoding="utf-8") as f:
     for url, content in all_articles.items():